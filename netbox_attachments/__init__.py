@@ -29,10 +29,23 @@ class NetBoxAttachmentsConfig(PluginConfig):
         "display_default": "additional_tab",
         "create_add_button": True,
         "display_setting": {},
+        "upload_layout": "flat",  # options: 'flat', 'sharded'
+        "deduplicate_files": False,
+        "compression": "",  # options: '', 'gzip', 'zstd'
+        "compression_min_savings": 0.2,
+        "checksum_algorithm": "sha256",
+        "download_mode": "stream",  # options: 'stream', 'x_accel_redirect', 'x_sendfile'
+        "download_internal_prefix": "/protected-media/",
+        "changes_lookback": 60,  # seconds
+        "tombstone_retention_days": 90,
     }
     required_settings = []
     min_version = "4.5.0"
     max_version = "4.5.99"
 
+    def ready(self):
+        super().ready()
+        from netbox_attachments import jobs  # noqa: F401 -- registers the system jobs
+
 
 config = NetBoxAttachmentsConfig
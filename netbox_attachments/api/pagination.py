@@ -0,0 +1,72 @@
+from netbox.api.pagination import OptionalLimitOffsetPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from netbox_attachments.utils import clean_cursor_values, decode_cursor, encode_cursor, keyset_filter
+
+
+class CursorOptionalPagination(OptionalLimitOffsetPagination):
+    """
+    NetBox's limit/offset pagination, with an opt-in keyset mode selected by ?cursor.
+
+    Passing ?cursor= (empty for the first page) orders the results by the view's
+    cursor_ordering and returns the rows after the cursor, so every page costs one index
+    range scan however deep it is, and rows inserted or deleted meanwhile do not shift later
+    pages. The response has the usual shape, but count and previous are always null.
+    """
+
+    cursor_query_param = "cursor"
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.cursor = None
+        self.ordering = tuple(getattr(view, "cursor_ordering", ("pk",)))
+        self.limit = self.get_limit(request) or self.default_limit
+        try:
+            values = decode_cursor(request.query_params[self.cursor_query_param], len(self.ordering))
+            if values is not None:
+                values = clean_cursor_values(queryset.model, self.ordering, values)
+        except ValueError:
+            raise NotFound("Invalid cursor.") from None
+
+        queryset = queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, values))
+        # Fetch one extra row to learn whether there is a next page, without counting
+        page = list(queryset[: self.limit + 1])
+        if len(page) > self.limit:
+            page = page[: self.limit]
+            self.cursor = encode_cursor(getattr(page[-1], field) for field in self.ordering)
+        self.count = None
+        return page
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.cursor)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return None
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "count": None,
+                "next": self.get_next_link(),
+                "previous": None,
+                "results": data,
+            }
+        )
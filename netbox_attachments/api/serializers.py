@@ -1,13 +1,19 @@
+from collections import defaultdict
+
 from core.models.object_types import ObjectType
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from netbox.api.fields import ContentTypeField
 from netbox.api.serializers import NetBoxModelSerializer
 from rest_framework import serializers
 from utilities.api import get_serializer_for_model
 
-from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentAssignment
+from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentAssignment, NetBoxAttachmentUploadSession
 from netbox_attachments.utils import validate_object_type
 
+# Most files or objects accepted by one bulk upload or bulk link request
+BULK_MAX_ITEMS = 1000
+
 
 class ObjectTypeField(ContentTypeField):
     """
@@ -52,6 +58,13 @@ class NetBoxAttachmentAssignmentSerializer(NetBoxModelSerializer):
         if request and hasattr(request, "user"):
             self.fields["attachment"].queryset = NetBoxAttachment.objects.restrict(request.user, "view")
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # ?include_parent=false: omit the parent entirely so it is never resolved
+        if not self.context.get("include_parent", True):
+            fields.pop("parent", None)
+        return fields
+
     def validate(self, data):
         # Validate that the parent object exists.
         # Fall back to instance values so PATCH requests that only supply one
@@ -86,6 +99,9 @@ class NetBoxAttachmentAssignmentSerializer(NetBoxModelSerializer):
 
 class NetBoxAttachmentSerializer(NetBoxModelSerializer):
     url = serializers.HyperlinkedIdentityField(view_name="plugins-api:netbox_attachments-api:netboxattachment-detail")
+    download_url = serializers.HyperlinkedIdentityField(
+        view_name="plugins:netbox_attachments:netboxattachment_download"
+    )
     assignments = NetBoxAttachmentAssignmentSerializer(
         source="attachment_assignments",
         many=True,
@@ -101,11 +117,136 @@ class NetBoxAttachmentSerializer(NetBoxModelSerializer):
             "name",
             "description",
             "file",
+            "download_url",
             "size",
+            "stored_size",
+            "encoding",
+            "checksum",
+            "checksum_algorithm",
+            "assignment_count",
             "assignments",
             "created",
             "last_updated",
             "comments",
             "tags",
         ]
-        brief_fields = ("id", "url", "display", "name", "description", "file")
+        brief_fields = ("id", "url", "display", "name", "description", "file", "download_url")
+
+
+class NetBoxAttachmentUploadSessionSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(
+        view_name="plugins-api:netbox_attachments-api:netboxattachmentuploadsession-detail"
+    )
+
+    class Meta:
+        model = NetBoxAttachmentUploadSession
+        fields = [
+            "id",
+            "url",
+            "filename",
+            "name",
+            "description",
+            "size",
+            "offset",
+            "created",
+            "last_updated",
+        ]
+
+    def validate_filename(self, value):
+        # Only the final path component is kept, as for regular uploads
+        filename = value.replace("\\", "/").rsplit("/", 1)[-1].strip()
+        if not filename:
+            raise serializers.ValidationError("A filename is required.")
+        return filename
+
+
+class NetBoxAttachmentBulkUploadSerializer(serializers.Serializer):
+    """Input of the bulk upload endpoint: several files, optionally linked to one object."""
+
+    files = serializers.ListField(child=serializers.FileField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+    description = serializers.CharField(max_length=200, required=False, allow_blank=True, default="")
+    object_type = ObjectTypeField(queryset=ObjectType.objects.all(), required=False)
+    object_id = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        object_type = data.get("object_type")
+        object_id = data.get("object_id")
+        if (object_type is None) != (object_id is None):
+            raise serializers.ValidationError("object_type and object_id must be given together.")
+        if object_type is not None:
+            model_class = object_type.model_class()
+            if model_class is None or not validate_object_type(model_class):
+                raise serializers.ValidationError({"object_type": "This object type is not permitted for attachments."})
+            queryset = model_class.objects.all()
+            request = self.context.get("request")
+            if request and hasattr(request, "user"):
+                queryset = queryset.restrict(request.user, "view")
+            if not queryset.filter(pk=object_id).exists():
+                raise serializers.ValidationError("Invalid parent object: {} ID {}".format(object_type, object_id))
+        return data
+
+
+class NetBoxAttachmentBulkLinkSerializer(serializers.Serializer):
+    """
+    Input of the bulk link endpoint: one attachment and the objects to assign it to.
+
+    Each distinct object type is resolved once and the existence of its objects is checked
+    with a single query, so validation does not grow with one query per object.
+    """
+
+    attachment = serializers.PrimaryKeyRelatedField(queryset=NetBoxAttachment.objects.all())
+    objects = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request and hasattr(request, "user"):
+            self.fields["attachment"].queryset = NetBoxAttachment.objects.restrict(request.user, "view")
+
+    @staticmethod
+    def get_object_type(value):
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return ContentType.objects.get_for_id(int(value))
+        app_label, _, model = str(value).lower().partition(".")
+        return ContentType.objects.get_by_natural_key(app_label, model)
+
+    def validate_objects(self, value):
+        """Return the object IDs grouped by object type."""
+        object_types = {}
+        targets = defaultdict(set)
+        for item in value:
+            try:
+                type_value, object_id = item["object_type"], int(item["object_id"])
+                if not isinstance(type_value, (str, int)):
+                    raise TypeError(type_value)
+            except (KeyError, TypeError, ValueError):
+                raise serializers.ValidationError(
+                    "Each object needs an object_type (a name or ID) and an integer object_id."
+                ) from None
+            if object_id < 1:
+                raise serializers.ValidationError(f"Invalid object_id: {object_id}")
+            if type_value not in object_types:
+                try:
+                    object_types[type_value] = self.get_object_type(type_value)
+                except ContentType.DoesNotExist:
+                    raise serializers.ValidationError(f"Unknown object type: {type_value}") from None
+            targets[object_types[type_value]].add(object_id)
+        return targets
+
+    def validate(self, data):
+        request = self.context.get("request")
+        for object_type, object_ids in data["objects"].items():
+            model_class = object_type.model_class()
+            label = f"{object_type.app_label}.{object_type.model}"
+            if model_class is None or not validate_object_type(model_class):
+                raise serializers.ValidationError({"objects": f"Object type {label} is not permitted for attachments."})
+            queryset = model_class.objects.all()
+            if request and hasattr(request, "user"):
+                queryset = queryset.restrict(request.user, "view")
+            missing = object_ids - set(queryset.filter(pk__in=object_ids).values_list("pk", flat=True))
+            if missing:
+                raise serializers.ValidationError(
+                    {"objects": f"Invalid {label} IDs: {', '.join(map(str, sorted(missing)[:20]))}"}
+                )
+        data["objects"] = {object_type.pk: object_ids for object_type, object_ids in data["objects"].items()}
+        return data
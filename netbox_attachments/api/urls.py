@@ -6,5 +6,6 @@ app_name = "netbox_attachments"
 router = NetBoxRouter()
 router.register("netbox-attachments", views.NetBoxAttachmentViewSet)
 router.register("netbox-attachment-assignments", views.NetBoxAttachmentAssignmentViewSet)
+router.register("netbox-attachment-uploads", views.NetBoxAttachmentUploadSessionViewSet)
 
 urlpatterns = router.urls
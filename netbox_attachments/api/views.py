@@ -1,14 +1,171 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from netbox.api.metadata import ContentTypeMetadata
 from netbox.api.viewsets import NetBoxModelViewSet
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.viewsets import GenericViewSet
 
 from netbox_attachments import filtersets, models
+from netbox_attachments.api.pagination import CursorOptionalPagination
 from netbox_attachments.api.serializers import (
     NetBoxAttachmentAssignmentSerializer,
+    NetBoxAttachmentBulkLinkSerializer,
+    NetBoxAttachmentBulkUploadSerializer,
     NetBoxAttachmentSerializer,
+    NetBoxAttachmentUploadSessionSerializer,
 )
+from netbox_attachments.storage import CountingReader
+from netbox_attachments.utils import (
+    clean_cursor_values,
+    decode_cursor,
+    encode_cursor,
+    get_changes_lookback,
+    has_unconstrained_permission,
+    keyset_filter,
+    prefetch_assignment_parents,
+)
+
+
+def include_parent(request):
+    """
+    Return False when the client opted out of parent resolution with ?include_parent=false.
+    """
+    value = request.query_params.get("include_parent", "")
+    return value.strip().lower() not in ("false", "0", "no", "off")
+
+
+class ParentPrefetchMixin:
+    """
+    Resolves the parents of every assignment in a response in bulk before serialization,
+    issuing one query per distinct object type instead of one per assignment.
+    """
+
+    def get_response_assignments(self, objects):
+        return objects
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["include_parent"] = include_parent(self.request)
+        return context
+
+    def prefetch_parents(self, objects):
+        if self.request.method not in SAFE_METHODS or getattr(self, "brief", False):
+            return
+        if not include_parent(self.request):
+            return
+        prefetch_assignment_parents(self.get_response_assignments(objects), user=self.request.user)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.prefetch_parents(page)
+        else:
+            # Unpaginated, list() serializes the queryset itself; evaluating it here fills its
+            # result cache, so the parents are attached to the instances that get serialized
+            self.prefetch_parents(list(queryset))
+        return page
+
+    def get_object(self):
+        instance = super().get_object()
+        self.prefetch_parents([instance])
+        return instance
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp, assuming the current time zone if it has none."""
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    timestamp = parse_datetime(value)
+    if timestamp is None:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
 
 
-class NetBoxAttachmentViewSet(NetBoxModelViewSet):
+class ChangesFeedMixin:
+    """
+    Adds GET changes/?since=<timestamp>, listing the rows created or modified since then and the
+    IDs of the rows deleted since then.
+
+    The feed reaches back changes_lookback seconds before since, so rows whose transaction
+    committed after a previous sync had read past their last_updated are still delivered; clients
+    must treat repeated rows as updates. Both lists are paged by keyset over (timestamp, id), and
+    the next link carries an opaque cursor that fixes the end of the window. Once next is null,
+    until is the since of the following sync.
+
+    Tombstones keep no data to evaluate permission constraints against, so deleted is null for
+    users whose view permission is constrained.
+    """
+
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        limit = self.paginator.get_limit(request) or self.paginator.default_limit
+        try:
+            if cursor := request.query_params.get("cursor"):
+                until, changed_at, changed_id, deleted_at, deleted_id = decode_cursor(cursor, 5)
+                (changed_id,) = clean_cursor_values(self.queryset.model, ("pk",), (changed_id,))
+                (deleted_id,) = clean_cursor_values(models.NetBoxAttachmentTombstone, ("pk",), (deleted_id,))
+                until, changed_at, deleted_at = map(parse_timestamp, (until, changed_at, deleted_at))
+            else:
+                start = parse_timestamp(request.query_params.get("since")) - get_changes_lookback()
+                until, changed_at, changed_id, deleted_at, deleted_id = timezone.now(), start, 0, start, 0
+        except ValueError:
+            if cursor:
+                raise NotFound("Invalid cursor.") from None
+            raise ValidationError({"since": "An ISO 8601 timestamp is required."}) from None
+
+        changed, changed_position, more_changed = self.get_changes_page(
+            self.get_queryset().filter(last_updated__lte=until), "last_updated", (changed_at, changed_id), limit
+        )
+        model = self.queryset.model
+        deleted, deleted_position, more_deleted = None, (deleted_at, deleted_id), False
+        if has_unconstrained_permission(request.user, f"{model._meta.app_label}.view_{model._meta.model_name}"):
+            deleted, deleted_position, more_deleted = self.get_changes_page(
+                models.NetBoxAttachmentTombstone.objects.filter(model=model._meta.model_name, deleted__lte=until),
+                "deleted",
+                deleted_position,
+                limit,
+            )
+            deleted = [{"id": tombstone.object_id, "deleted": tombstone.deleted} for tombstone in deleted]
+
+        next_link = None
+        if more_changed or more_deleted:
+            values = (until, *changed_position, *deleted_position)
+            cursor = encode_cursor(value.isoformat() if hasattr(value, "isoformat") else value for value in values)
+            next_link = replace_query_param(request.build_absolute_uri(), "cursor", cursor)
+
+        self.prefetch_parents(changed)
+        return Response(
+            {
+                "until": until,
+                "next": next_link,
+                "changed": self.get_serializer(changed, many=True).data,
+                "deleted": deleted,
+            }
+        )
+
+    @staticmethod
+    def get_changes_page(queryset, field, position, limit):
+        """Return up to limit rows after position, the position of the last one and whether more follow."""
+        rows = list(queryset.filter(keyset_filter((field, "pk"), position)).order_by(field, "pk")[: limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            position = (getattr(rows[-1], field), rows[-1].pk)
+        return rows, position, more
+
+
+class NetBoxAttachmentViewSet(ChangesFeedMixin, ParentPrefetchMixin, NetBoxModelViewSet):
     metadata_class = ContentTypeMetadata
     queryset = models.NetBoxAttachment.objects.prefetch_related(
         "attachment_assignments",
@@ -16,9 +173,43 @@ class NetBoxAttachmentViewSet(NetBoxModelViewSet):
     )
     serializer_class = NetBoxAttachmentSerializer
     filterset_class = filtersets.NetBoxAttachmentFilterSet
+    pagination_class = CursorOptionalPagination
+    cursor_ordering = ("pk",)
+
+    def get_response_assignments(self, objects):
+        return [assignment for attachment in objects for assignment in attachment.attachment_assignments.all()]
+
+    @action(detail=False, methods=["post"], url_path="bulk-upload", parser_classes=[MultiPartParser])
+    def bulk_upload(self, request):
+        """
+        Create one attachment per file in the multipart field "files", optionally linking each
+        to the object given by object_type and object_id.
+        """
+        serializer = NetBoxAttachmentBulkUploadSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        attachments = [
+            models.NetBoxAttachment(file=upload, description=data["description"]) for upload in data["files"]
+        ]
+        models.bulk_create_attachments(
+            attachments,
+            object_type=data.get("object_type"),
+            object_id=data.get("object_id"),
+            user=request.user,
+            request_id=getattr(request, "id", None),
+        )
 
+        prefetch_related_objects(
+            attachments, "tags", "attachment_assignments__object_type", "attachment_assignments__tags"
+        )
+        if include_parent(request):
+            prefetch_assignment_parents(self.get_response_assignments(attachments), user=request.user)
+        serializer = NetBoxAttachmentSerializer(attachments, many=True, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class NetBoxAttachmentAssignmentViewSet(NetBoxModelViewSet):
+
+class NetBoxAttachmentAssignmentViewSet(ChangesFeedMixin, ParentPrefetchMixin, NetBoxModelViewSet):
     metadata_class = ContentTypeMetadata
     queryset = models.NetBoxAttachmentAssignment.objects.select_related(
         "attachment",
@@ -26,3 +217,143 @@ class NetBoxAttachmentAssignmentViewSet(NetBoxModelViewSet):
     )
     serializer_class = NetBoxAttachmentAssignmentSerializer
     filterset_class = filtersets.NetBoxAttachmentAssignmentFilterSet
+    pagination_class = CursorOptionalPagination
+    # Meta.ordering by column; "attachment" alone would sort by the attachment's name
+    cursor_ordering = ("attachment_id", "object_type_id", "object_id")
+
+    @action(detail=False, methods=["post"], url_path="bulk-link")
+    def bulk_link(self, request):
+        """
+        Assign one attachment to many objects. Objects it is already assigned to are skipped.
+        """
+        serializer = NetBoxAttachmentBulkLinkSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        attachment = serializer.validated_data["attachment"]
+
+        created, existing = models.bulk_link_attachment(
+            attachment,
+            serializer.validated_data["objects"],
+            user=request.user,
+            request_id=getattr(request, "id", None),
+        )
+        return Response(
+            {
+                "attachment": attachment.pk,
+                "created": len(created),
+                "existing": existing,
+                "assignments": sorted(assignment.pk for assignment in created),
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class UploadSessionPermission(BasePermission):
+    """
+    Upload sessions create attachments, so they require the attachment add permission.
+    Tokens without write access may only query sessions.
+    """
+
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        token = request.auth
+        if request.method not in SAFE_METHODS and token is not None and not getattr(token, "write_enabled", True):
+            return False
+        return request.user.has_perm("netbox_attachments.add_netboxattachment")
+
+
+class NetBoxAttachmentUploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    """
+    Resumable chunked uploads.
+
+    POST a filename (and optionally the expected size) to open a session, PUT the file in
+    consecutive chunks to <id>/chunk/ with an Upload-Offset header, and POST to <id>/finalize/
+    to create the attachment. GET or HEAD on a session reports the offset to resume from.
+    """
+
+    queryset = models.NetBoxAttachmentUploadSession.objects.all()
+    serializer_class = NetBoxAttachmentUploadSessionSerializer
+    permission_classes = [UploadSessionPermission]
+
+    # Upper bound on the body of a single chunk request
+    max_chunk_size = 100 * 1024 * 1024
+
+    def get_queryset(self):
+        # Sessions are private to the user who opened them
+        return super().get_queryset().filter(user=self.request.user)
+
+    def get_locked_object(self):
+        return get_object_or_404(self.get_queryset().select_for_update(), pk=self.kwargs["pk"])
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.discard()
+
+    @staticmethod
+    def offset_response(data, status_code=status.HTTP_200_OK):
+        response = Response(data, status=status_code)
+        response["Upload-Offset"] = str(data["offset"])
+        return response
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return self.offset_response(serializer.data, status_code=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.offset_response(self.get_serializer(self.get_object()).data)
+
+    @action(detail=True, methods=["put"])
+    def chunk(self, request, pk=None):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            raise ValidationError("Upload-Offset and Content-Length headers are required.")
+        if not 0 < length <= self.max_chunk_size:
+            raise ValidationError(f"Chunks must contain between 1 and {self.max_chunk_size} bytes.")
+
+        with transaction.atomic():
+            session = self.get_locked_object()
+            if offset != session.offset:
+                return self.offset_response(
+                    {"detail": "Upload-Offset does not match the session offset.", "offset": session.offset},
+                    status_code=status.HTTP_409_CONFLICT,
+                )
+            if session.size is not None and session.offset + length > session.size:
+                raise ValidationError("Chunk exceeds the declared upload size.")
+            # Stream the request body to storage without reading it into memory
+            try:
+                received = session.append_chunk(CountingReader(request.stream, limit=length))
+            except ValueError:
+                received = None
+            if received != length:
+                # Rolls back the offset; the stored chunk is replaced by the next append
+                raise ValidationError("The request body does not match its Content-Length.")
+
+        return self.offset_response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, pk=None):
+        # Refuse before assembling the file; constraints are checked on the assembled attachment
+        if not request.user.has_perm("netbox_attachments.add_netboxattachment"):
+            raise PermissionDenied("You are not permitted to create attachments.")
+        with transaction.atomic():
+            session = self.get_locked_object()
+            if session.offset == 0:
+                raise ValidationError("No data has been uploaded.")
+            if session.size is not None and session.offset != session.size:
+                raise ValidationError(f"Upload incomplete: received {session.offset} of {session.size} bytes.")
+            attachment = session.finalize(user=request.user)
+
+        serializer = NetBoxAttachmentSerializer(attachment, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
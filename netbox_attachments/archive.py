@@ -0,0 +1,75 @@
+"""Streaming ZIP archives of attachment files."""
+
+import logging
+import zipfile
+from pathlib import Path
+
+from netbox_attachments.compression import is_compressible_name
+from netbox_attachments.downloads import DOWNLOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class _ZipBuffer:
+    """Write-only sink for ZipFile; what has been written is handed out with pop() instead of kept."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def unique_archive_name(name, used):
+    """Return name, or "name (2).ext" etc. if an earlier archive member already uses it."""
+    path = Path(name)
+    candidate, counter = name, 1
+    while candidate.lower() in used:
+        counter += 1
+        candidate = f"{path.stem} ({counter}){path.suffix}"
+    used.add(candidate.lower())
+    return candidate
+
+
+def iter_zip_archive(entries, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Yield a ZIP archive of entries piece by piece, without a temporary file.
+
+    entries yields (name, date_time, size, open_file) tuples; open_file() returns a readable
+    binary file, which is opened when its member is written and copied chunk_size bytes at a
+    time. Only one chunk of content and the member list are held in memory. Members whose file
+    cannot be opened are left out. Already compressed formats are stored, the rest deflated.
+    """
+    buffer = _ZipBuffer()
+    used = set()
+    # ZipFile falls back to data descriptors because the buffer cannot seek
+    with zipfile.ZipFile(buffer, mode="w", allowZip64=True) as archive:
+        for name, date_time, size, open_file in entries:
+            try:
+                source = open_file()
+            except (OSError, ValueError) as exc:
+                logger.warning("Leaving %s out of the archive: %s", name, exc)
+                continue
+
+            info = zipfile.ZipInfo(unique_archive_name(name, used), date_time=max(date_time, (1980, 1, 1, 0, 0, 0)))
+            info.compress_type = zipfile.ZIP_DEFLATED if is_compressible_name(name) else zipfile.ZIP_STORED
+            info.file_size = size or 0
+            info.external_attr = 0o644 << 16  # -rw-r--r-- when extracted
+            with source, archive.open(info, mode="w", force_zip64=size is None) as member:
+                while chunk := source.read(chunk_size):
+                    member.write(chunk)
+                    if data := buffer.pop():
+                        yield data
+            if data := buffer.pop():
+                yield data
+    if data := buffer.pop():
+        yield data
@@ -0,0 +1,122 @@
+"""At-rest compression of attachment files."""
+
+import gzip
+import logging
+import tempfile
+from pathlib import Path
+
+from netbox_attachments.utils import _get_plugin_settings
+
+try:
+    import zstandard
+except ImportError:  # optional, see the "zstd" extra
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+COMPRESSION_ENCODINGS = ("gzip", "zstd")
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# Extensions of formats that are compressed already; compressing them again only costs CPU
+INCOMPRESSIBLE_EXTENSIONS = frozenset(
+    {
+        ".7z", ".avif", ".br", ".bz2", ".docx", ".gif", ".gz", ".heic", ".jpeg", ".jpg", ".mkv", ".mov",
+        ".mp3", ".mp4", ".odp", ".ods", ".odt", ".png", ".pptx", ".rar", ".tgz", ".webm", ".webp",
+        ".xlsx", ".xz", ".zip", ".zst",
+    }
+)  # fmt: skip
+
+
+def get_compression():
+    """Return the configured at-rest compression encoding, or "" when compression is off."""
+    value = _get_plugin_settings().get("compression") or ""
+    if value and value not in COMPRESSION_ENCODINGS:
+        logger.warning("Invalid compression value %r, disabling compression", value)
+        return ""
+    if value == "zstd" and zstandard is None:
+        logger.warning("compression is set to zstd but the zstandard package is not installed, using gzip")
+        return "gzip"
+    return value
+
+
+def get_compression_min_savings():
+    value = _get_plugin_settings().get("compression_min_savings", 0.2)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < 1:
+        logger.warning("Invalid compression_min_savings value %r, defaulting to 0.2", value)
+        return 0.2
+    return value
+
+
+def is_compressible_name(name):
+    return Path(name).suffix.lower() not in INCOMPRESSIBLE_EXTENSIONS
+
+
+def compress_file(file, encoding):
+    """
+    Compress a Django File chunk by chunk into an anonymous temporary file and return it rewound.
+
+    The source is rewound as well, so it can still be stored uncompressed.
+    """
+    output = tempfile.TemporaryFile()
+    if encoding == "gzip":
+        # mtime=0 makes the output depend on the content only
+        compressor = gzip.GzipFile(fileobj=output, mode="wb", mtime=0)
+    else:
+        compressor = zstandard.ZstdCompressor().stream_writer(output, closefd=False)
+    with compressor:
+        for chunk in file.chunks():
+            compressor.write(chunk)
+    file.seek(0)
+    output.seek(0)
+    return output
+
+
+class _GzipReader(gzip.GzipFile):
+    """A GzipFile that also closes the stored file it reads from."""
+
+    def close(self):
+        fileobj = self.fileobj
+        try:
+            super().close()
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+
+
+def open_decompressed(file, encoding):
+    """
+    Wrap a stored file in a reader returning its original content.
+
+    The reader decompresses as it is read and supports forward seeks, so iter_file_range() can
+    serve byte ranges of the original content. Closing it closes the stored file.
+    """
+    if not encoding:
+        return file
+    if encoding == "gzip":
+        return _GzipReader(fileobj=file, mode="rb")
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(file, closefd=True)
+    file.close()
+    raise ValueError(f"Cannot decompress {encoding!r} content")
+
+
+def accepts_encoding(header, encoding):
+    """True when an Accept-Encoding header allows the given content coding."""
+    wildcard = False
+    for item in (header or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding == encoding:
+            return quality > 0
+        if coding == "*":
+            wildcard = quality > 0
+    return wildcard
@@ -0,0 +1,99 @@
+"""Helpers for serving attachment files: offloading, byte ranges and streaming."""
+
+import logging
+from urllib.parse import quote
+
+from netbox_attachments.utils import _get_plugin_settings
+
+logger = logging.getLogger(__name__)
+
+# Block size used when streaming attachment files to the client
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+DOWNLOAD_MODES = ("stream", "x_accel_redirect", "x_sendfile")
+
+
+def get_download_mode():
+    value = _get_plugin_settings().get("download_mode", "stream")
+    if value not in DOWNLOAD_MODES:
+        logger.warning("Invalid download_mode value %r, defaulting to stream", value)
+        return "stream"
+    return value
+
+
+def get_download_internal_prefix():
+    value = _get_plugin_settings().get("download_internal_prefix", "/protected-media/")
+    if not isinstance(value, str) or not value.startswith("/"):
+        logger.warning("Invalid download_internal_prefix value %r, defaulting to /protected-media/", value)
+        return "/protected-media/"
+    return value
+
+
+def get_offload_header(mode, storage, name, internal_prefix="/protected-media/"):
+    """
+    Return the (header, value) pair asking the front-end web server to send a stored file.
+
+    Returns None when the file must be streamed by Django: in "stream" mode, or in
+    "x_sendfile" mode when the storage backend has no local filesystem path.
+    """
+    if mode == "x_accel_redirect":
+        # nginx: an "internal" location aliasing MEDIA_ROOT
+        return "X-Accel-Redirect", f"{internal_prefix.rstrip('/')}/{quote(name)}"
+    if mode == "x_sendfile":
+        # Apache mod_xsendfile / lighttpd: an absolute filesystem path
+        try:
+            return "X-Sendfile", storage.path(name)
+        except NotImplementedError:
+            return None
+    return None
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range "Range: bytes=..." header against a file of the given size.
+
+    Returns:
+        An inclusive (start, end) byte range, or None when the whole file should be served:
+        no header, a malformed header, a non-bytes unit or multiple ranges.
+
+    Raises:
+        ValueError: When the range cannot be satisfied (HTTP 416).
+    """
+    if not header:
+        return None
+    unit, sep, spec = header.partition("=")
+    if not sep or unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = (part.strip() for part in spec.partition("-"))
+    if not sep or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def iter_file_range(file, start, end, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Yield the inclusive byte range [start, end] of an open file in chunks of at most chunk_size, then close it."""
+    try:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = file.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
@@ -1,11 +1,13 @@
 import django_filters
-from core.models.object_types import ObjectType
-from django.db.models import Q
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Exists, OuterRef, Q
 from extras.filters import TagFilter
 from netbox.filtersets import NetBoxModelFilterSet
+from utilities.filters import MultiValueCharFilter
 from utilities.filtersets import register_filterset
 
 from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentAssignment
+from netbox_attachments.utils import get_broken_object_type_ids, parse_object_reference
 
 
 @register_filterset
@@ -25,6 +27,10 @@ class NetBoxAttachmentFilterSet(NetBoxModelFilterSet):
         method="filter_object_id",
         label="Object ID",
     )
+    assigned_to = MultiValueCharFilter(
+        method="filter_assigned_to",
+        label="Assigned to (<object type>:<object ID>)",
+    )
     has_assignments = django_filters.BooleanFilter(
         method="filter_has_assignments",
         label="Has Assignments",
@@ -36,7 +42,7 @@ class NetBoxAttachmentFilterSet(NetBoxModelFilterSet):
 
     class Meta:
         model = NetBoxAttachment
-        fields = ["id", "name", "description"]
+        fields = ["id", "name", "description", "checksum", "checksum_algorithm", "encoding"]
 
     def search(self, queryset, name, value):
         if not value.strip():
@@ -45,25 +51,53 @@ class NetBoxAttachmentFilterSet(NetBoxModelFilterSet):
         filters = Q(name__icontains=value) | Q(description__icontains=value)
         return queryset.filter(filters)
 
+    @staticmethod
+    def _has_assignment(*args, **kwargs):
+        return Exists(NetBoxAttachmentAssignment.objects.filter(*args, attachment=OuterRef("pk"), **kwargs))
+
     def filter_object_type_id(self, queryset, name, value):
-        return queryset.filter(attachment_assignments__object_type_id=value).distinct()
+        conditions = {"object_type_id": value}
+        object_id = self.form.cleaned_data.get("object_id")
+        if object_id is not None:
+            # Both conditions must hold on the same assignment
+            conditions["object_id"] = object_id
+        return queryset.filter(self._has_assignment(**conditions))
 
     def filter_object_id(self, queryset, name, value):
-        return queryset.filter(attachment_assignments__object_id=value).distinct()
+        if self.form.cleaned_data.get("object_type_id") is not None:
+            return queryset  # applied together with object_type_id
+        return queryset.filter(self._has_assignment(object_id=value))
+
+    def filter_assigned_to(self, queryset, name, value):
+        condition = Q()
+        for reference in value:
+            parsed = parse_object_reference(reference)
+            if parsed is None:
+                continue
+            object_type, object_id = parsed
+            if isinstance(object_type, tuple):
+                try:
+                    object_type = ContentType.objects.get_by_natural_key(*object_type).pk
+                except ContentType.DoesNotExist:
+                    continue
+            condition |= Q(object_type_id=object_type, object_id=object_id)
+        if not condition:
+            return queryset.none()
+        return queryset.filter(self._has_assignment(condition))
 
     def filter_has_assignments(self, queryset, name, value):
         if value:
-            return queryset.filter(attachment_assignments__isnull=False).distinct()
-        else:
-            return queryset.filter(attachment_assignments__isnull=True).distinct()
+            return queryset.filter(assignment_count__gt=0)
+        return queryset.filter(assignment_count=0)
 
     def filter_has_broken_assignments(self, queryset, name, value):
-        broken_ids = [
-            ot.id for ot in ObjectType.objects.only("id", "app_label", "model").iterator() if ot.model_class() is None
-        ]
-        if value:
-            return queryset.filter(attachment_assignments__object_type_id__in=broken_ids).distinct()
-        return queryset.exclude(attachment_assignments__object_type_id__in=broken_ids).distinct()
+        broken_ids = get_broken_object_type_ids()
+        if not broken_ids:
+            return queryset.none() if value else queryset
+        has_broken = Exists(
+            NetBoxAttachmentAssignment.objects.filter(attachment=OuterRef("pk"), object_type_id__in=broken_ids)
+        )
+        return queryset.filter(has_broken if value else ~has_broken)
 
 
 @register_filterset
@@ -91,6 +91,31 @@ class NetBoxAttachmentForm(NetBoxModelForm):
         return obj
 
 
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """A FileField accepting several files; cleans to a list of uploads."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        uploads = data if isinstance(data, (list, tuple)) else [data] if data else []
+        if not uploads and self.required:
+            raise forms.ValidationError(self.error_messages["required"], code="required")
+        return [super(MultipleFileField, self).clean(upload, initial) for upload in uploads]
+
+
+class NetBoxAttachmentBulkUploadForm(forms.Form):
+    """Creates one attachment per uploaded file; all of them share the description."""
+
+    files = MultipleFileField(label=_("Files"))
+    description = forms.CharField(label=_("Description"), max_length=200, required=False)
+
+
 class NetBoxAttachmentLinkForm(NetBoxModelForm):
     """Form for linking an existing attachment to a NetBox object."""
 
@@ -204,6 +229,7 @@ class NetBoxAttachmentFilterForm(NetBoxModelFilterSetForm):
     model = NetBoxAttachment
     name = forms.CharField(required=False)
     description = forms.CharField(required=False)
+    checksum = forms.CharField(required=False)
     object_type_id = DynamicModelChoiceField(
         queryset=ObjectType.objects.all(),
         required=False,
@@ -0,0 +1,82 @@
+import logging
+from datetime import timedelta
+
+from core.choices import JobIntervalChoices
+from netbox.jobs import JobRunner, system_job
+
+from netbox_attachments.models import (
+    UPLOAD_SESSION_MAX_AGE,
+    delete_orphaned_files,
+    expire_upload_sessions,
+    process_file_deletions,
+    prune_tombstones,
+)
+from netbox_attachments.utils import get_tombstone_retention
+
+logger = logging.getLogger(__name__)
+
+
+@system_job(interval=JobIntervalChoices.INTERVAL_HOURLY)
+class UploadSessionCleanupJob(JobRunner):
+    """Discards resumable upload sessions that have stopped receiving data."""
+
+    class Meta:
+        name = "Attachment upload session cleanup"
+
+    def run(self, *args, **kwargs):
+        count = expire_upload_sessions(UPLOAD_SESSION_MAX_AGE)
+        logger.info("Discarded %d stale upload session(s)", count)
+
+
+@system_job(interval=JobIntervalChoices.INTERVAL_DAILY)
+class TombstoneCleanupJob(JobRunner):
+    """Removes deletion records of the changes feed once they are older than the retention."""
+
+    class Meta:
+        name = "Attachment tombstone cleanup"
+
+    def run(self, *args, **kwargs):
+        count = prune_tombstones(get_tombstone_retention())
+        logger.info("Removed %d expired tombstone(s)", count)
+
+
+class FileDeletionJob(JobRunner):
+    """Removes the files of deleted attachments from storage; enqueued when a deleting transaction commits."""
+
+    class Meta:
+        name = "Attachment file deletion"
+
+    def run(self, *args, **kwargs):
+        stats = process_file_deletions()
+        self.job.data = stats
+        logger.info(
+            "Deleted %d attachment file(s), kept %d still referenced, %d failed and will be retried",
+            stats["deleted"],
+            stats["kept"],
+            stats["failed"],
+        )
+
+
+@system_job(interval=JobIntervalChoices.INTERVAL_HOURLY)
+class FileDeletionSweepJob(FileDeletionJob):
+    """Retries failed file deletions and catches up on deletions whose job could not be enqueued."""
+
+    class Meta:
+        name = "Attachment file deletion sweep"
+
+
+class OrphanedFileCleanupJob(JobRunner):
+    """Deletes stored attachment files that no attachment references; enqueued by cleanup_orphaned_files."""
+
+    class Meta:
+        name = "Attachment orphaned file cleanup"
+
+    def run(self, grace_hours=24, dry_run=False, max_per_second=None, *args, **kwargs):
+        stats = delete_orphaned_files(timedelta(hours=grace_hours), dry_run=dry_run, max_per_second=max_per_second)
+        self.job.data = stats
+        logger.info(
+            "Found %d orphaned attachment file(s), deleted %d, %d failed",
+            stats["orphaned"],
+            stats["deleted"],
+            stats["failed"],
+        )
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from netbox_attachments.models import delete_orphaned_files
+
+
+class Command(BaseCommand):
+    help = "Delete files below netbox-attachments/ in storage that no attachment references"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-period",
+            type=float,
+            default=24,
+            help="Only consider files last modified more than this many hours ago (default: 24)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report orphaned files without deleting them",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=None,
+            help="Delete at most this many files per second (default: unlimited)",
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Enqueue the cleanup as a NetBox background job instead of running it here",
+        )
+
+    def handle(self, *args, grace_period=24, dry_run=False, rate=None, background=False, **options):
+        if background:
+            from netbox_attachments.jobs import OrphanedFileCleanupJob
+
+            job = OrphanedFileCleanupJob.enqueue(grace_hours=grace_period, dry_run=dry_run, max_per_second=rate)
+            self.stdout.write(self.style.SUCCESS(f"Enqueued job {job.pk}"))
+            return
+
+        report = self.stdout.write if dry_run or options["verbosity"] >= 2 else None
+        stats = delete_orphaned_files(
+            timedelta(hours=grace_period),
+            dry_run=dry_run,
+            max_per_second=rate,
+            report=report,
+        )
+
+        if dry_run:
+            self.stdout.write(f"{stats['orphaned']} orphaned file(s) found")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Deleted {stats['deleted']} of {stats['orphaned']} orphaned file(s), {stats['failed']} failed"
+                )
+            )
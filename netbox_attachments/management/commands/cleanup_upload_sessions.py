@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from netbox_attachments.models import UPLOAD_SESSION_MAX_AGE, NetBoxAttachmentUploadSession, expire_upload_sessions
+
+
+class Command(BaseCommand):
+    help = "Discard resumable upload sessions that have stopped receiving data, along with their staged chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=float,
+            default=UPLOAD_SESSION_MAX_AGE.total_seconds() / 3600,
+            help="Discard sessions idle for more than this many hours (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report stale sessions without discarding them",
+        )
+
+    def handle(self, *args, max_age, dry_run=False, **options):
+        max_age = timedelta(hours=max_age)
+
+        if dry_run:
+            stale = NetBoxAttachmentUploadSession.objects.filter(last_updated__lt=timezone.now() - max_age)
+            for session in stale:
+                if options["verbosity"] >= 2:
+                    self.stdout.write(f"Session {session.pk}: {session}, idle since {session.last_updated}")
+            self.stdout.write(f"{stale.count()} upload session(s) are stale")
+            return
+
+        count = expire_upload_sessions(max_age)
+        self.stdout.write(self.style.SUCCESS(f"Discarded {count} stale upload session(s)"))
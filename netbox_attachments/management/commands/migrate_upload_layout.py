@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentFileDeletion, schedule_file_deletion_job
+from netbox_attachments.storage import STORAGE_ERRORS, copy_stored_file
+from netbox_attachments.utils import buffer_until_commit, get_upload_layout, is_flat_upload_name, sharded_upload_path
+
+
+class Command(BaseCommand):
+    help = "Move attachment files stored directly in netbox-attachments/ into the sharded upload layout"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=16,
+            help="Number of files copied in parallel (default: 16)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of attachments moved per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the number of files to move without moving them",
+        )
+
+    def handle(self, *args, workers=16, batch_size=500, dry_run=False, **options):
+        self.verbosity = options["verbosity"]
+        field = NetBoxAttachment._meta.get_field("file")
+        self.storage, self.max_length = field.storage, field.max_length
+
+        if get_upload_layout() != "sharded":
+            self.stderr.write(
+                self.style.WARNING('upload_layout is not "sharded"; new uploads will still be stored flat')
+            )
+
+        queryset = (
+            NetBoxAttachment.objects.filter(file__regex=r"^netbox-attachments/[^/]+$")
+            .order_by("pk")
+            .values_list("pk", "file")
+        )
+
+        last_pk = 0
+        found = moved = failed = 0
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while batch := list(queryset.filter(pk__gt=last_pk)[:batch_size]):
+                last_pk = batch[-1][0]
+                names = sorted({name for _, name in batch if is_flat_upload_name(name)})
+                found += len(names)
+                if dry_run:
+                    continue
+
+                copies = dict(zip(names, executor.map(self.copy_file, names)))
+                failed += sum(isinstance(new_name, Exception) for new_name in copies.values())
+                moved += self.record_moves(
+                    {name: new_name for name, new_name in copies.items() if isinstance(new_name, str)}
+                )
+
+        if dry_run:
+            self.stdout.write(f"{found} file(s) stored in the flat layout")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} of {found} file(s), {failed} failed"))
+
+    def copy_file(self, name):
+        """Runs in a worker thread, so it must not touch the database."""
+        try:
+            return copy_stored_file(self.storage, name, sharded_upload_path(name.rsplit("/", 1)[-1]), self.max_length)
+        except STORAGE_ERRORS as exc:
+            self.stderr.write(f"Cannot copy {name}: {exc}")
+            return exc
+
+    @transaction.atomic
+    def record_moves(self, copies):
+        """
+        Points the attachments at the copies and queues the originals for deletion.
+
+        Rows are locked and matched by their current file name, so attachments whose file was
+        replaced since the batch was read keep it; the unused copies are queued instead. The
+        deletion queue keeps any name that is still referenced.
+        """
+        attachments = list(NetBoxAttachment.objects.select_for_update().filter(file__in=list(copies)).order_by("pk"))
+        moved = {attachment.file.name for attachment in attachments}
+        now = timezone.now()
+        for attachment in attachments:
+            if self.verbosity >= 2:
+                self.stdout.write(
+                    f"Attachment #{attachment.pk}: {attachment.file.name} -> {copies[attachment.file.name]}"
+                )
+            attachment.file.name = copies[attachment.file.name]
+            # bulk_update() skips auto_now; set it so the changes feed reports the move
+            attachment.last_updated = now
+        NetBoxAttachment.objects.bulk_update(attachments, ["file", "last_updated"])
+
+        unused = [copies[name] for name in copies if name not in moved]
+        NetBoxAttachmentFileDeletion.objects.bulk_create(
+            [NetBoxAttachmentFileDeletion(name=name) for name in [*moved, *unused]]
+        )
+        buffer_until_commit("file_deletion_job", None, schedule_file_deletion_job)
+        return len(moved)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from netbox_attachments.models import FILE_DELETION_BATCH_SIZE, NetBoxAttachmentFileDeletion, process_file_deletions
+
+
+class Command(BaseCommand):
+    help = "Remove the queued files of deleted attachments from storage, as the background deletion job does"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=FILE_DELETION_BATCH_SIZE,
+            help=f"Number of queued files handled per transaction (default: {FILE_DELETION_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, batch_size=FILE_DELETION_BATCH_SIZE, **options):
+        stats = process_file_deletions(batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {stats['deleted']} file(s), kept {stats['kept']} still referenced, "
+                f"{stats['failed']} failed in {stats['batches']} batch(es)"
+            )
+        )
+        pending = NetBoxAttachmentFileDeletion.objects.count()
+        if pending:
+            self.stdout.write(f"{pending} file deletion(s) remain queued for retry")
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentAssignment, recount_assignments
+
+
+class Command(BaseCommand):
+    help = "Recompute NetBoxAttachment.assignment_count for attachments whose stored value has drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted attachments without updating them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of attachments recounted per UPDATE (default: 1000)",
+        )
+
+    def handle(self, *args, dry_run=False, batch_size=1000, **options):
+        actual_counts = (
+            NetBoxAttachmentAssignment.objects.filter(attachment=OuterRef("pk"))
+            .order_by()
+            .values("attachment")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        drifted = (
+            NetBoxAttachment.objects.annotate(actual_count=Coalesce(Subquery(actual_counts), 0))
+            .exclude(assignment_count=F("actual_count"))
+            .order_by("pk")
+            .values_list("pk", "assignment_count", "actual_count")
+        )
+
+        batch = []
+        total = 0
+        for pk, stored, actual in drifted.iterator(chunk_size=batch_size):
+            total += 1
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"Attachment #{pk}: stored {stored}, actual {actual}")
+            if dry_run:
+                continue
+            batch.append(pk)
+            if len(batch) >= batch_size:
+                recount_assignments(batch)
+                batch = []
+        if batch:
+            recount_assignments(batch)
+
+        if dry_run:
+            self.stdout.write(f"{total} attachment(s) have a drifted assignment count")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Reconciled assignment count of {total} attachment(s)"))
@@ -0,0 +1,171 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from netbox_attachments.models import NetBoxAttachment
+from netbox_attachments.storage import STORAGE_ERRORS, read_file_metadata
+from netbox_attachments.utils import get_checksum_algorithm
+
+DEFAULT_CHECKPOINT = os.path.join(tempfile.gettempdir(), "netbox_attachments_refresh_metadata.json")
+
+
+class Command(BaseCommand):
+    help = "Fill in missing file sizes (and optionally checksums) of attachments by reading them from storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            dest="refresh_all",
+            help="Check every attachment and correct stale values, not only missing ones",
+        )
+        parser.add_argument(
+            "--checksums",
+            action="store_true",
+            help="Also compute missing checksums; this reads the whole file",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=16,
+            help="Number of files read from storage in parallel (default: 16)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of attachments read and updated per batch (default: 1000)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=DEFAULT_CHECKPOINT,
+            help=f"File recording the progress of an interrupted run (default: {DEFAULT_CHECKPOINT})",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint and start from the first attachment",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report attachments with missing or stale metadata without updating them",
+        )
+
+    def handle(
+        self,
+        *args,
+        refresh_all=False,
+        checksums=False,
+        workers=16,
+        batch_size=1000,
+        checkpoint=DEFAULT_CHECKPOINT,
+        restart=False,
+        dry_run=False,
+        **options,
+    ):
+        self.verbosity = options["verbosity"]
+        self.storage = NetBoxAttachment._meta.get_field("file").storage
+        self.algorithm = get_checksum_algorithm() if checksums else None
+        self.refresh_all = refresh_all
+
+        queryset = NetBoxAttachment.objects.exclude(file="")
+        if not refresh_all:
+            missing = Q(size__isnull=True) | Q(stored_size__isnull=True)
+            if checksums:
+                missing |= Q(checksum="")
+            queryset = queryset.filter(missing)
+        queryset = queryset.only(
+            "pk", "file", "size", "stored_size", "encoding", "checksum", "checksum_algorithm"
+        ).order_by("pk")
+
+        run_options = {"all": refresh_all, "checksums": checksums}
+        last_pk = 0 if restart or dry_run else self.read_checkpoint(checkpoint, run_options)
+        if last_pk:
+            self.stdout.write(f"Resuming after attachment #{last_pk}")
+
+        fields = ["size", "stored_size", "checksum", "checksum_algorithm", "last_updated"]
+        checked = updated = failed = 0
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while batch := list(queryset.filter(pk__gt=last_pk)[:batch_size]):
+                changed = []
+                for attachment, result in zip(batch, executor.map(self.read_metadata, batch)):
+                    checked += 1
+                    if isinstance(result, Exception):
+                        failed += 1
+                        self.stderr.write(f"Attachment #{attachment.pk}: cannot read {attachment.file.name}: {result}")
+                    elif self.apply_metadata(attachment, *result):
+                        changed.append(attachment)
+
+                updated += len(changed)
+                if not dry_run:
+                    if changed:
+                        NetBoxAttachment.objects.bulk_update(changed, fields)
+                    self.write_checkpoint(checkpoint, run_options, batch[-1].pk)
+                last_pk = batch[-1].pk
+                if self.verbosity >= 2:
+                    self.stdout.write(f"Checked {checked} attachment(s), up to #{last_pk}")
+
+        if not dry_run and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        if dry_run:
+            self.stdout.write(
+                f"{updated} of {checked} attachment(s) have missing or stale metadata, {failed} unreadable"
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Updated {updated} of {checked} attachment(s), {failed} could not be read")
+            )
+
+    def read_metadata(self, attachment):
+        """Runs in a worker thread, so it must not touch the database."""
+        algorithm = self.algorithm if self.refresh_all or not attachment.checksum else None
+        # Measuring the content of a compressed file means decompressing all of it
+        decompress = bool(attachment.encoding) and bool(algorithm or self.refresh_all or attachment.size is None)
+        try:
+            size, stored_size, checksum = read_file_metadata(
+                self.storage, attachment.file.name, algorithm, attachment.encoding if decompress else ""
+            )
+        except STORAGE_ERRORS as exc:
+            return exc
+        if attachment.encoding and not decompress:
+            size = attachment.size
+        return size, stored_size, checksum
+
+    def apply_metadata(self, attachment, size, stored_size, checksum):
+        changed = (attachment.size, attachment.stored_size) != (size, stored_size)
+        attachment.size, attachment.stored_size = size, stored_size
+        if checksum is not None and (checksum, self.algorithm) != (attachment.checksum, attachment.checksum_algorithm):
+            attachment.checksum = checksum
+            attachment.checksum_algorithm = self.algorithm
+            changed = True
+        if changed:
+            if self.verbosity >= 2:
+                self.stdout.write(f"Attachment #{attachment.pk}: {attachment.file.name}, {size} bytes")
+            attachment.last_updated = timezone.now()
+        return changed
+
+    @staticmethod
+    def read_checkpoint(path, run_options):
+        try:
+            with open(path) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        if not isinstance(state, dict) or state.get("options") != run_options:
+            return 0  # written by a run with other options
+        return int(state.get("last_pk") or 0)
+
+    @staticmethod
+    def write_checkpoint(path, run_options, last_pk):
+        # Replace atomically, so an interruption never leaves a truncated checkpoint behind
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({"options": run_options, "last_pk": last_pk}, file)
+        os.replace(temporary, path)
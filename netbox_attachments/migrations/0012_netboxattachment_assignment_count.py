@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_assignment_count(apps, schema_editor):
+    NetBoxAttachment = apps.get_model("netbox_attachments", "NetBoxAttachment")
+    NetBoxAttachmentAssignment = apps.get_model("netbox_attachments", "NetBoxAttachmentAssignment")
+
+    counts = (
+        NetBoxAttachmentAssignment.objects.filter(attachment=OuterRef("pk"))
+        .order_by()
+        .values("attachment")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    NetBoxAttachment.objects.update(assignment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+    """Store the number of assignments on NetBoxAttachment instead of annotating it per query."""
+
+    dependencies = [
+        ("netbox_attachments", "0011_netboxattachmentassignment_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="netboxattachment",
+            name="assignment_count",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, editable=False, help_text="Number of objects this attachment is assigned to"
+            ),
+        ),
+        migrations.RunPython(
+            populate_assignment_count,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
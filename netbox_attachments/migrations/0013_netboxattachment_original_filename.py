@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+import netbox_attachments.utils
+
+
+class Migration(migrations.Migration):
+    """Support content-addressed storage: index file names for blob reference counting and keep the upload name."""
+
+    dependencies = [
+        ("netbox_attachments", "0012_netboxattachment_assignment_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="netboxattachment",
+            name="original_filename",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Filename presented on download when the file is stored under its content digest",
+                max_length=255,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="netboxattachment",
+            name="file",
+            field=models.FileField(db_index=True, upload_to=netbox_attachments.utils.attachment_upload),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Record a digest of each upload, computed while it is received."""
+
+    dependencies = [
+        ("netbox_attachments", "0013_netboxattachment_original_filename"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="netboxattachment",
+            name="checksum",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, help_text="Hex digest of the file content", max_length=128
+            ),
+        ),
+        migrations.AddField(
+            model_name="netboxattachment",
+            name="checksum_algorithm",
+            field=models.CharField(
+                blank=True, editable=False, help_text="Hash algorithm of the checksum", max_length=16
+            ),
+        ),
+    ]
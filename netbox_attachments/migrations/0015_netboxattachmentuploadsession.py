@@ -0,0 +1,53 @@
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Track resumable chunked uploads until they are assembled into an attachment."""
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("netbox_attachments", "0014_netboxattachment_checksum"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NetBoxAttachmentUploadSession",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("filename", models.CharField(max_length=255)),
+                ("name", models.CharField(blank=True, max_length=254)),
+                ("description", models.CharField(blank=True, max_length=200)),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        blank=True, help_text="Expected total size in bytes, if known", null=True
+                    ),
+                ),
+                (
+                    "offset",
+                    models.PositiveBigIntegerField(
+                        default=0, editable=False, help_text="Number of bytes received so far"
+                    ),
+                ),
+                ("chunk_count", models.PositiveIntegerField(default=0, editable=False)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("last_updated", models.DateTimeField(auto_now=True, db_index=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "NetBox Attachment Upload Session",
+                "ordering": ("created",),
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Queue file deletions in the deleting transaction and remove the files after commit."""
+
+    dependencies = [
+        ("netbox_attachments", "0015_netboxattachmentuploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NetBoxAttachmentFileDeletion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=255)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("next_attempt", models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "verbose_name": "NetBox Attachment File Deletion",
+                "ordering": ("pk",),
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+import netbox_attachments.utils
+
+
+class Migration(migrations.Migration):
+    """Make room for the sharded upload layout, whose directories take 58 of the default 100 characters."""
+
+    dependencies = [
+        ("netbox_attachments", "0016_netboxattachmentfiledeletion"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="netboxattachment",
+            name="file",
+            field=models.FileField(db_index=True, max_length=255, upload_to=netbox_attachments.utils.attachment_upload),
+        ),
+    ]
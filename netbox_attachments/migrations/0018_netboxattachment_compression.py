@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_stored_size(apps, schema_editor):
+    # Every existing file is stored uncompressed
+    NetBoxAttachment = apps.get_model("netbox_attachments", "NetBoxAttachment")
+    NetBoxAttachment.objects.update(stored_size=F("size"))
+
+
+class Migration(migrations.Migration):
+    """Record the size in storage and the compression of each file for at-rest compression."""
+
+    dependencies = [
+        ("netbox_attachments", "0017_alter_netboxattachment_file_max_length"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="netboxattachment",
+            name="stored_size",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Size of the file in storage in bytes, after compression",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="netboxattachment",
+            name="encoding",
+            field=models.CharField(
+                blank=True, editable=False, help_text="Compression applied to the stored file", max_length=16
+            ),
+        ),
+        migrations.RunPython(
+            populate_stored_size,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,37 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index last_updated for the changes feed and record deletions as tombstones."""
+
+    dependencies = [
+        ("netbox_attachments", "0018_netboxattachment_compression"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="netboxattachment",
+            index=models.Index(fields=["last_updated", "id"], name="nba_attachment_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="netboxattachmentassignment",
+            index=models.Index(fields=["last_updated", "id"], name="nba_assign_updated_idx"),
+        ),
+        migrations.CreateModel(
+            name="NetBoxAttachmentTombstone",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("model", models.CharField(max_length=50)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("deleted", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "NetBox Attachment Tombstone",
+                "ordering": ("deleted", "pk"),
+                "indexes": [
+                    models.Index(fields=["model", "deleted", "id"], name="nba_tombstone_deleted_idx"),
+                ],
+            },
+        ),
+    ]
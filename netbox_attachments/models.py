@@ -1,20 +1,74 @@
 import logging
 import os
-
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from core.choices import ObjectChangeActionChoices
+from core.models import ObjectChange
 from core.models.object_types import ObjectType
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
-from django.db.models.signals import pre_delete
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.files import File
+from django.db import models, router, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from extras.models import Tag
 from netbox.models import NetBoxModel
 from utilities.querysets import RestrictedQuerySet
 
-from netbox_attachments.utils import attachment_upload
+from netbox_attachments.compression import (
+    COMPRESSED_SUFFIXES,
+    compress_file,
+    get_compression,
+    get_compression_min_savings,
+    is_compressible_name,
+)
+from netbox_attachments.storage import (
+    STORAGE_ERRORS,
+    ConcatenatedFile,
+    delete_stored_file,
+    hash_file,
+    iter_storage_files,
+    remove_empty_directory,
+)
+from netbox_attachments.utils import (
+    AssignedObjectTypeRegistry,
+    attachment_upload,
+    buffer_until_commit,
+    chunked,
+    clear_scope_cache,
+    content_addressed_name,
+    custom_object_types_changed,
+    deduplicate_files_enabled,
+    get_cached_parent,
+    get_checksum_algorithm,
+    invalidate_attachment_counts,
+    set_cached_parent,
+    validate_object_type,
+)
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on IDs per "... WHERE id IN (...)" query issued by bulk cleanup and recount helpers
+BULK_QUERY_CHUNK_SIZE = 1000
+
+# Upload sessions without new data for this long are discarded by the cleanup job
+UPLOAD_SESSION_MAX_AGE = timedelta(hours=24)
+
+# Pending file deletions handled per transaction by the deletion job; failed ones are retried with backoff
+FILE_DELETION_BATCH_SIZE = 500
+FILE_DELETION_MAX_BACKOFF = timedelta(hours=24)
+
 
 class NetBoxAttachment(NetBoxModel):
     """
@@ -23,6 +77,14 @@ class NetBoxAttachment(NetBoxModel):
 
     file = models.FileField(
         upload_to=attachment_upload,
+        max_length=255,
+        db_index=True,
+    )
+    original_filename = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text="Filename presented on download when the file is stored under its content digest",
     )
     size = models.PositiveBigIntegerField(
         editable=False,
@@ -30,9 +92,40 @@ class NetBoxAttachment(NetBoxModel):
         blank=True,
         help_text="Size of the file in bytes",
     )
+    stored_size = models.PositiveBigIntegerField(
+        editable=False,
+        null=True,
+        blank=True,
+        help_text="Size of the file in storage in bytes, after compression",
+    )
+    encoding = models.CharField(
+        max_length=16,
+        blank=True,
+        editable=False,
+        help_text="Compression applied to the stored file",
+    )
+    checksum = models.CharField(
+        max_length=128,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Hex digest of the file content",
+    )
+    checksum_algorithm = models.CharField(
+        max_length=16,
+        blank=True,
+        editable=False,
+        help_text="Hash algorithm of the checksum",
+    )
     name = models.CharField(max_length=254, blank=True)
     description = models.CharField(verbose_name=_("description"), max_length=200, blank=True)
     comments = models.TextField(blank=True)
+    assignment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text="Number of objects this attachment is assigned to",
+    )
 
     objects = RestrictedQuerySet.as_manager()
 
@@ -42,6 +135,10 @@ class NetBoxAttachment(NetBoxModel):
         ordering = ("name", "pk")  # name may be non-unique
         verbose_name_plural = "NetBox Attachments"
         verbose_name = "NetBox Attachment"
+        indexes = [
+            # Serves the changes feed, which pages by (last_updated, id)
+            models.Index(fields=["last_updated", "id"], name="nba_attachment_updated_idx"),
+        ]
 
     def __str__(self):
         label = self.name or self.filename
@@ -51,37 +148,64 @@ class NetBoxAttachment(NetBoxModel):
 
     @property
     def filename(self):
-        return os.path.basename(self.file.name)
+        return self.original_filename or os.path.basename(self.file.name)
 
     def get_absolute_url(self):
         return reverse("plugins:netbox_attachments:netboxattachment", args=[self.pk])
 
-    def delete(self, *args, **kwargs):
+    def _store_deduplicated(self, digest):
         """
-        Deletes the instance and its associated file while preserving the original filename.
+        Stores a new upload under the SHA-256 digest of its content, reusing the blob if identical content exists.
         """
-        _name = self.file.name
-
-        super().delete(*args, **kwargs)
-
-        # Delete file from disk
-        self.file.delete(save=False)
-
-        # Restore the filename for any post-deletion references
-        self.file.name = _name
-
-    def save(self, *args, **kwargs):
+        upload = self.file.file
+        self.original_filename = Path(attachment_upload(self, self.file.name)).name
+
+        # Compressed blobs get a suffix, so a blob is never read back with the wrong encoding
+        blob_name = content_addressed_name(digest) + COMPRESSED_SUFFIXES.get(self.encoding, "")
+        storage = self.file.storage
+        # Serialize with the deletion of the blob until this transaction commits: locking the
+        # attachments that share it makes a concurrent delete of one wait for us, and taking over
+        # its queued deletions waits for a running process_file_deletions() batch to finish
+        list(NetBoxAttachment.objects.select_for_update().filter(file=blob_name).values_list("pk", flat=True))
+        queued = NetBoxAttachmentFileDeletion.objects.select_for_update().filter(name=blob_name)
+        NetBoxAttachmentFileDeletion.objects.filter(pk__in=[entry.pk for entry in queued]).delete()
+        if not storage.exists(blob_name):
+            blob_name = storage.save(blob_name, upload, max_length=self.file.field.max_length)
+
+        # Mark the file as committed so FileField.pre_save() does not write it again
+        self.file.name = blob_name
+        self.file._committed = True
+
+    def _compress(self):
         """
-        Saves the attachment after updating file attributes.
+        Replaces the upload with a compressed copy if that saves enough space.
         """
-        if not self.file:
-            return super().save(*args, **kwargs)
+        self.encoding = ""
+        encoding = get_compression()
+        if not (encoding and self.size and is_compressible_name(self.file.name)):
+            return
+
+        compressed = File(compress_file(self.file.file, encoding), name=self.file.file.name)
+        if compressed.size > self.size * (1 - get_compression_min_savings()):
+            compressed.close()
+            return
+        self.file.file.close()
+        self.file.file = compressed
+        self.encoding = encoding
+
+    def prepare_file(self):
+        """
+        Updates the file attributes and, for a new upload, its checksum and stored form.
 
-        try:
-            self.size = self.file.size
-        except (OSError, ValueError) as exc:
-            logger.warning("Could not determine file size for attachment pk=%s: %s", self.pk, exc)
-            self.size = None
+        Called by save(); bulk_create_attachments() calls it directly.
+        """
+        if not (self.file._committed and self.encoding):
+            # The size of a compressed file in storage is not the size of its content
+            try:
+                self.size = self.file.size
+            except (OSError, ValueError) as exc:
+                logger.warning("Could not determine file size for attachment pk=%s: %s", self.pk, exc)
+                self.size = None
 
         if not self.name:
             if self._state.adding:
@@ -89,7 +213,40 @@ class NetBoxAttachment(NetBoxModel):
             else:
                 self.name = self.filename
 
-        super().save(*args, **kwargs)
+        if not self.file._committed:
+            # Hash the received upload before it is written, so storage is never read back
+            self.checksum_algorithm = get_checksum_algorithm()
+            self.checksum = hash_file(self.file.file, self.checksum_algorithm)
+            digest = None
+            if deduplicate_files_enabled():
+                digest = self.checksum if self.checksum_algorithm == "sha256" else hash_file(self.file.file, "sha256")
+
+            self._compress()
+            self.stored_size = self.file.file.size if self.encoding else self.size
+
+            if digest:
+                self._store_deduplicated(digest)
+            else:
+                self.original_filename = ""
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the attachment after updating file attributes.
+
+        assignment_count is maintained by recount_assignments() alone, so updating an existing
+        attachment never writes back the possibly outdated count it was loaded with.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "assignment_count"
+            ]
+        # A reused deduplicated blob stays locked against deletion until the row is committed
+        with transaction.atomic(using=kwargs.get("using")):
+            if self.file:
+                self.prepare_file()
+            super().save(*args, **kwargs)
 
 
 class NetBoxAttachmentAssignment(NetBoxModel):
@@ -122,6 +279,7 @@ class NetBoxAttachmentAssignment(NetBoxModel):
         ]
         indexes = [
             models.Index(fields=["object_type", "object_id"], name="nba_assign_obj_type_id_idx"),
+            models.Index(fields=["last_updated", "id"], name="nba_assign_updated_idx"),
         ]
 
     def __str__(self):
@@ -137,6 +295,21 @@ class NetBoxAttachmentAssignment(NetBoxModel):
 
     @property
     def parent(self):
+        """
+        The linked NetBox object, or None when it cannot be resolved.
+
+        The result is cached on the instance; use prefetch_assignment_parents() to resolve
+        the parents of many assignments in bulk.
+        """
+        found, parent = get_cached_parent(self)
+        if found:
+            return parent
+
+        parent = self._resolve_parent()
+        set_cached_parent(self, parent)
+        return parent
+
+    def _resolve_parent(self):
         if not (self.object_type_id and self.object_id):
             return None
 
@@ -153,11 +326,566 @@ class NetBoxAttachmentAssignment(NetBoxModel):
         return reverse("plugins:netbox_attachments:netboxattachmentassignment", args=[self.pk])
 
 
+class NetBoxAttachmentUploadSession(models.Model):
+    """
+    A resumable upload in progress.
+
+    Each appended chunk is written straight to storage as a separate staging file; finalize()
+    streams the chunks in order into a new NetBoxAttachment and removes the staging files.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    filename = models.CharField(max_length=255)
+    name = models.CharField(max_length=254, blank=True)
+    description = models.CharField(max_length=200, blank=True)
+    size = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Expected total size in bytes, if known",
+    )
+    offset = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of bytes received so far",
+    )
+    chunk_count = models.PositiveIntegerField(default=0, editable=False)
+    created = models.DateTimeField(auto_now_add=True)
+    last_updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Staging files live below this storage prefix, one directory per session
+    STAGING_PREFIX = "netbox-attachments/uploads/"
+
+    class Meta:
+        ordering = ("created",)
+        verbose_name = "NetBox Attachment Upload Session"
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset} bytes received)"
+
+    @property
+    def storage(self):
+        return NetBoxAttachment._meta.get_field("file").storage
+
+    def get_chunk_name(self, index):
+        return f"{self.STAGING_PREFIX}{self.pk}/{index:06d}"
+
+    def append_chunk(self, stream):
+        """
+        Writes the next chunk from a readable stream and advances the offset.
+
+        The caller must hold a row lock on the session (select_for_update) so concurrent
+        appends cannot claim the same chunk index. Returns the number of bytes written.
+        """
+        name = self.get_chunk_name(self.chunk_count)
+        storage = self.storage
+        # Left over from an earlier append whose session update did not commit
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, File(stream))
+
+        self.offset += stream.count
+        self.chunk_count += 1
+        self.save(update_fields=("offset", "chunk_count", "last_updated"))
+        return stream.count
+
+    def finalize(self, user=None):
+        """
+        Assembles the received chunks into a new NetBoxAttachment and discards the session.
+
+        With a user, constrained add permissions are enforced on the new attachment (raising
+        PermissionDenied). If that or the save fails, the assembled file is removed again.
+        """
+        names = [self.get_chunk_name(index) for index in range(self.chunk_count)]
+        attachment = NetBoxAttachment(name=self.name, description=self.description)
+        attachment.file = File(ConcatenatedFile(self.storage, names, size=self.offset), name=self.filename)
+        try:
+            with transaction.atomic():
+                attachment.save()
+                if user is not None:
+                    _check_add_permission(user, NetBoxAttachment, [attachment])
+                self.discard()
+        except Exception:
+            if attachment.file._committed:
+                _delete_unreferenced_files([attachment.file.name])
+            raise
+        return attachment
+
+    def discard(self):
+        """
+        Deletes the session and, once the transaction commits, its staging files.
+        """
+        # One past the last recorded chunk, in case an append stored its file but not the session
+        names = [self.get_chunk_name(index) for index in range(self.chunk_count + 1)]
+        storage = self.storage
+        self.delete()
+        transaction.on_commit(lambda: _delete_staging_files(storage, names))
+
+
+def _delete_staging_files(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError as exc:
+            logger.warning("Could not delete upload staging file %s: %s", name, exc)
+    if names:
+        remove_empty_directory(storage, names[0].rpartition("/")[0])
+
+
+def expire_upload_sessions(max_age):
+    """
+    Discards upload sessions that have not received data for longer than max_age (a timedelta).
+
+    Returns the number of sessions discarded.
+    """
+    cutoff = timezone.now() - max_age
+    count = 0
+    for session in list(NetBoxAttachmentUploadSession.objects.filter(last_updated__lt=cutoff)):
+        with transaction.atomic():
+            session.discard()
+        count += 1
+    return count
+
+
+class NetBoxAttachmentFileDeletion(models.Model):
+    """
+    A stored file waiting to be removed from storage.
+
+    Rows are inserted in the transaction that deletes the attachment, so a rollback also
+    cancels the file deletion. process_file_deletions() removes the files after commit.
+    """
+
+    name = models.CharField(max_length=255)
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ("pk",)
+        verbose_name = "NetBox Attachment File Deletion"
+
+    def __str__(self):
+        return self.name
+
+
+class NetBoxAttachmentTombstone(models.Model):
+    """
+    Records the deletion of an attachment or assignment for the changes feed.
+
+    Rows are inserted in the deleting transaction and removed by prune_tombstones() once
+    they are older than the configured retention.
+    """
+
+    model = models.CharField(max_length=50)
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ("deleted", "pk")
+        verbose_name = "NetBox Attachment Tombstone"
+        indexes = [
+            models.Index(fields=["model", "deleted", "id"], name="nba_tombstone_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+
+def prune_tombstones(max_age):
+    """Deletes the tombstones older than max_age (a timedelta) and returns how many were removed."""
+    count, _ = NetBoxAttachmentTombstone.objects.filter(deleted__lt=timezone.now() - max_age).delete()
+    return count
+
+
+def schedule_file_deletion_job(_queued=None):
+    """Enqueues a background job draining the deletion queue; if that fails, the periodic sweep catches up."""
+    from netbox_attachments.jobs import FileDeletionJob
+
+    try:
+        FileDeletionJob.enqueue()
+    except Exception as exc:  # e.g. Redis unavailable; the files stay queued
+        logger.warning("Could not enqueue the attachment file deletion job: %s", exc)
+
+
+def process_file_deletions(batch_size=FILE_DELETION_BATCH_SIZE):
+    """
+    Deletes the files of all due NetBoxAttachmentFileDeletion rows, batch_size rows per transaction.
+
+    Files still referenced by an attachment (deduplicated blobs uploaded again) are kept. Failed
+    deletions are rescheduled with exponential backoff. Returns counters for the run.
+    """
+    storage = NetBoxAttachment._meta.get_field("file").storage
+    now = timezone.now()
+    stats = {"deleted": 0, "kept": 0, "failed": 0, "batches": 0}
+    # Skip rows locked by a concurrent run, so several workers can drain the queue together
+    due = NetBoxAttachmentFileDeletion.objects.select_for_update(skip_locked=True).filter(next_attempt__lte=now)
+
+    while True:
+        with transaction.atomic():
+            batch = list(due[:batch_size])
+            if not batch:
+                break
+            stats["batches"] += 1
+            referenced = set(
+                NetBoxAttachment.objects.filter(file__in={entry.name for entry in batch}).values_list("file", flat=True)
+            )
+
+            done, failed = [], []
+            for entry in batch:
+                # Checked again right before deleting: an upload may have reused the blob meanwhile
+                if entry.name in referenced or NetBoxAttachment.objects.filter(file=entry.name).exists():
+                    stats["kept"] += 1
+                    done.append(entry.pk)
+                    continue
+                try:
+                    delete_stored_file(storage, entry.name)
+                except STORAGE_ERRORS as exc:
+                    entry.attempts += 1
+                    backoff = timedelta(minutes=2 ** min(entry.attempts, 11))
+                    entry.next_attempt = now + min(backoff, FILE_DELETION_MAX_BACKOFF)
+                    entry.last_error = str(exc)
+                    failed.append(entry)
+                    stats["failed"] += 1
+                else:
+                    stats["deleted"] += 1
+                    done.append(entry.pk)
+
+            NetBoxAttachmentFileDeletion.objects.filter(pk__in=done).delete()
+            NetBoxAttachmentFileDeletion.objects.bulk_update(failed, ("attempts", "next_attempt", "last_error"))
+
+    return stats
+
+
+def find_orphaned_files(grace_period, chunk_size=BULK_QUERY_CHUNK_SIZE):
+    """
+    Yield the names of stored files below netbox-attachments/ that no attachment references.
+
+    Storage is scanned as a stream and compared against the database one sorted chunk of
+    names at a time, so memory use does not grow with the number of files. Files modified
+    within grace_period (a timedelta), or whose age cannot be determined, are left alone, as
+    are the staging files of resumable uploads.
+    """
+    storage = NetBoxAttachment._meta.get_field("file").storage
+    cutoff = timezone.now() - grace_period
+
+    for chunk in chunked(iter_storage_files(storage, "netbox-attachments"), chunk_size):
+        modified = dict(chunk)
+        names = sorted(name for name in modified if not name.startswith(NetBoxAttachmentUploadSession.STAGING_PREFIX))
+        referenced = set(NetBoxAttachment.objects.filter(file__in=names).values_list("file", flat=True))
+        for name in names:
+            if name in referenced:
+                continue
+            mtime = modified[name]
+            if mtime is None:
+                try:
+                    mtime = storage.get_modified_time(name)
+                except (NotImplementedError, OSError):
+                    continue
+            if mtime < cutoff:
+                yield name
+
+
+def delete_orphaned_files(grace_period, dry_run=False, max_per_second=None, report=None):
+    """
+    Deletes (or with dry_run only reports) the files found by find_orphaned_files().
+
+    max_per_second throttles deletions to spare the storage backend. report, if given, is
+    called with the name of every orphaned file. Returns counters for the run.
+    """
+    storage = NetBoxAttachment._meta.get_field("file").storage
+    interval = 1 / max_per_second if max_per_second else 0
+    stats = {"orphaned": 0, "deleted": 0, "failed": 0}
+    next_delete = time.monotonic()
+
+    for name in find_orphaned_files(grace_period):
+        stats["orphaned"] += 1
+        if report is not None:
+            report(name)
+        if dry_run:
+            continue
+        if interval:
+            time.sleep(max(0, next_delete - time.monotonic()))
+            next_delete = time.monotonic() + interval
+        try:
+            delete_stored_file(storage, name)
+        except STORAGE_ERRORS as exc:
+            logger.warning("Could not delete orphaned file %s: %s", name, exc)
+            stats["failed"] += 1
+        else:
+            stats["deleted"] += 1
+
+    return stats
+
+
+@receiver(post_delete, sender=NetBoxAttachment)
+def attachment_post_delete_receiver(sender, instance, using=None, **kwargs):
+    NetBoxAttachmentTombstone.objects.using(using).create(model=sender._meta.model_name, object_id=instance.pk)
+    if not instance.file.name:
+        return
+    # Queued in the deleting transaction; the file is only removed once that commits
+    NetBoxAttachmentFileDeletion.objects.using(using).create(name=instance.file.name)
+    buffer_until_commit("file_deletion_job", None, schedule_file_deletion_job, using=using)
+
+
+def recount_assignments(attachment_ids):
+    """
+    Recompute NetBoxAttachment.assignment_count for the given attachments.
+
+    Issues one UPDATE with a correlated COUNT subquery, so the stored value is exact
+    regardless of how the assignments were created or removed.
+    """
+    attachment_ids = [pk for pk in attachment_ids if pk is not None]
+    if not attachment_ids:
+        return
+
+    counts = (
+        NetBoxAttachmentAssignment.objects.filter(attachment=OuterRef("pk"))
+        .order_by()
+        .values("attachment")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    for start in range(0, len(attachment_ids), BULK_QUERY_CHUNK_SIZE):
+        # last_updated lets the changes feed pick up the new count
+        NetBoxAttachment.objects.filter(pk__in=attachment_ids[start : start + BULK_QUERY_CHUNK_SIZE]).update(
+            assignment_count=Coalesce(Subquery(counts), 0), last_updated=timezone.now()
+        )
+
+
+def queue_assignment_recount(attachment_ids, using=None):
+    """Recount the given attachments once, when the current transaction commits."""
+    for attachment_id in attachment_ids:
+        buffer_until_commit("assignment_count", attachment_id, recount_assignments, using=using)
+
+
+def _load_assigned_object_type_ids():
+    return NetBoxAttachmentAssignment.objects.order_by().values_list("object_type_id", flat=True).distinct()
+
+
+# Object types that currently have assignments; lets pre_delete_receiver ignore every other sender
+assigned_object_types = AssignedObjectTypeRegistry(_load_assigned_object_type_ids)
+
+
+def queue_attachment_count_invalidation(pairs, using=None):
+    """Drop the cached attachment counts of the given (object_type_id, object_id) pairs on commit."""
+    for pair in pairs:
+        buffer_until_commit("attachment_count_cache", pair, invalidate_attachment_counts, using=using)
+
+
+def bulk_create_attachments(attachments, object_type=None, object_id=None, user=None, request_id=None):
+    """
+    Creates new attachments, each optionally assigned to the same object, in bulk.
+
+    Every file is prepared and written to storage in turn, then all rows are inserted with
+    bulk_create() in one transaction. bulk_create() sends no signals, so what they would do
+    is done here in bulk: change records, search cache, assignment counters and caches.
+    Event rules are not triggered. With a user, constrained add permissions are enforced on
+    the new objects (raising PermissionDenied). If the transaction fails, the files written
+    for it are removed again. Returns the attachments.
+    """
+    from netbox.search.backends import search_backend
+
+    stored = []
+    try:
+        with transaction.atomic():
+            for attachment in attachments:
+                attachment.prepare_file()
+                if not attachment.file._committed:
+                    attachment.file.save(attachment.file.name, attachment.file.file, save=False)
+                stored.append(attachment.file.name)
+                if object_type is not None:
+                    attachment.assignment_count = 1
+            NetBoxAttachment.objects.bulk_create(attachments)
+
+            assignments = []
+            if object_type is not None:
+                assignments = NetBoxAttachmentAssignment.objects.bulk_create(
+                    [
+                        NetBoxAttachmentAssignment(attachment=attachment, object_type=object_type, object_id=object_id)
+                        for attachment in attachments
+                    ]
+                )
+                assigned_object_types.add(object_type.pk)
+                queue_attachment_count_invalidation([(object_type.pk, object_id)])
+
+            if user is not None:
+                _check_add_permission(user, NetBoxAttachment, attachments)
+                _check_add_permission(user, NetBoxAttachmentAssignment, assignments)
+
+            _record_bulk_creation([*attachments, *assignments], user, request_id or uuid.uuid4())
+            search_backend.cache(attachments, remove_existing=False)
+    except Exception:
+        _delete_unreferenced_files(stored)
+        raise
+
+    return attachments
+
+
+def bulk_link_attachment(attachment, targets, user=None, request_id=None):
+    """
+    Assigns an attachment to many objects at once; targets maps object type IDs to object IDs.
+
+    Objects the attachment is already assigned to are skipped, and bulk_create(ignore_conflicts=True)
+    skips assignments created concurrently, so repeating a call is harmless. As in
+    bulk_create_attachments(), change records, counters and caches are written in bulk and a
+    user's constrained add permissions are enforced. Returns the new assignments and the number
+    of objects that were already linked.
+    """
+    with transaction.atomic():
+        new_ids = {}
+        existing = 0
+        for object_type_id, object_ids in targets.items():
+            linked = set(
+                NetBoxAttachmentAssignment.objects.filter(
+                    attachment=attachment, object_type_id=object_type_id, object_id__in=object_ids
+                ).values_list("object_id", flat=True)
+            )
+            existing += len(linked)
+            if unlinked := set(object_ids) - linked:
+                new_ids[object_type_id] = sorted(unlinked)
+
+        NetBoxAttachmentAssignment.objects.bulk_create(
+            [
+                NetBoxAttachmentAssignment(attachment=attachment, object_type_id=object_type_id, object_id=object_id)
+                for object_type_id, object_ids in new_ids.items()
+                for object_id in object_ids
+            ],
+            batch_size=BULK_QUERY_CHUNK_SIZE,
+            ignore_conflicts=True,
+        )
+
+        # ignore_conflicts leaves the primary keys unset, so read the new rows back
+        created = []
+        for object_type_id, object_ids in new_ids.items():
+            created.extend(
+                NetBoxAttachmentAssignment.objects.filter(
+                    attachment=attachment, object_type_id=object_type_id, object_id__in=object_ids
+                ).select_related("object_type")
+            )
+            assigned_object_types.add(object_type_id)
+        if not created:
+            return [], existing
+
+        for assignment in created:
+            assignment.attachment = attachment  # used by str() in the change records
+        if user is not None:
+            _check_add_permission(user, NetBoxAttachmentAssignment, created)
+        queue_assignment_recount([attachment.pk])
+        queue_attachment_count_invalidation(
+            [(assignment.object_type_id, assignment.object_id) for assignment in created]
+        )
+        _record_bulk_creation(created, user, request_id or uuid.uuid4())
+
+    return created, existing
+
+
+def _check_add_permission(user, model, instances):
+    pks = [instance.pk for instance in instances]
+    if model.objects.restrict(user, "add").filter(pk__in=pks).count() != len(pks):
+        raise PermissionDenied(f"You are not permitted to create these {model._meta.verbose_name_plural}.")
+
+
+def _record_bulk_creation(instances, user, request_id):
+    """Writes the change records that post_save would have written for each instance."""
+    changes = []
+    for instance in instances:
+        # New objects have no tags; spare serialize_object() a query per object
+        instance._prefetched_objects_cache = {"tags": Tag.objects.none()}
+        change = instance.to_objectchange(ObjectChangeActionChoices.ACTION_CREATE)
+        change.user = user
+        change.user_name = getattr(user, "username", "")
+        change.request_id = request_id
+        changes.append(change)
+    ObjectChange.objects.bulk_create(changes, batch_size=BULK_QUERY_CHUNK_SIZE)
+
+
+def _delete_unreferenced_files(names):
+    """Removes files written for attachments that were never created, unless another attachment uses them."""
+    storage = NetBoxAttachment._meta.get_field("file").storage
+    referenced = set(NetBoxAttachment.objects.filter(file__in=names).values_list("file", flat=True))
+    for name in set(names) - referenced:
+        try:
+            delete_stored_file(storage, name)
+        except STORAGE_ERRORS as exc:
+            logger.warning("Could not delete file %s of a failed upload: %s", name, exc)
+
+
+@receiver(pre_save, sender=NetBoxAttachmentAssignment)
+def assignment_pre_save_receiver(sender, instance, using=None, **kwargs):
+    if instance._state.adding or instance.pk is None:
+        return
+    # An assignment moved to another attachment or object must also be removed from the old one
+    previous = sender.objects.filter(pk=instance.pk).values_list("attachment_id", "object_type_id", "object_id").first()
+    if previous is None:
+        return
+    previous_attachment_id, previous_object_type_id, previous_object_id = previous
+    if previous_attachment_id != instance.attachment_id:
+        queue_assignment_recount([previous_attachment_id], using=using)
+    if (previous_object_type_id, previous_object_id) != (instance.object_type_id, instance.object_id):
+        queue_attachment_count_invalidation([(previous_object_type_id, previous_object_id)], using=using)
+
+
+@receiver(post_save, sender=NetBoxAttachmentAssignment)
+def assignment_post_save_receiver(sender, instance, using=None, **kwargs):
+    assigned_object_types.add(instance.object_type_id, using=using)
+    queue_assignment_recount([instance.attachment_id], using=using)
+    queue_attachment_count_invalidation([(instance.object_type_id, instance.object_id)], using=using)
+
+
+@receiver(post_delete, sender=NetBoxAttachmentAssignment)
+def assignment_post_delete_receiver(sender, instance, using=None, **kwargs):
+    NetBoxAttachmentTombstone.objects.using(using).create(model=sender._meta.model_name, object_id=instance.pk)
+    assigned_object_types.discard_hint(using=using)
+    queue_assignment_recount([instance.attachment_id], using=using)
+    queue_attachment_count_invalidation([(instance.object_type_id, instance.object_id)], using=using)
+
+
+@receiver(post_migrate)
+def post_migrate_receiver(sender, **kwargs):
+    # Migrations may add object types; recompute the enabled set on next use
+    clear_scope_cache()
+
+
+if apps.is_installed("netbox_custom_objects"):
+    # Creating, renaming or deleting a custom object type changes model-scope decisions
+    post_save.connect(custom_object_types_changed, sender="netbox_custom_objects.CustomObjectType")
+    post_delete.connect(custom_object_types_changed, sender="netbox_custom_objects.CustomObjectType")
+
+
+def delete_assignments_for_objects(pairs):
+    """
+    Delete the assignments of many deleted objects with one query per object type.
+
+    Args:
+        pairs: An iterable of (object_type_id, object_id) tuples.
+    """
+    object_ids_by_type = defaultdict(list)
+    for object_type_id, object_id in pairs:
+        object_ids_by_type[object_type_id].append(object_id)
+
+    with transaction.atomic(using=router.db_for_write(NetBoxAttachmentAssignment)):
+        for object_type_id, object_ids in object_ids_by_type.items():
+            for start in range(0, len(object_ids), BULK_QUERY_CHUNK_SIZE):
+                NetBoxAttachmentAssignment.objects.filter(
+                    object_type_id=object_type_id,
+                    object_id__in=object_ids[start : start + BULK_QUERY_CHUNK_SIZE],
+                ).delete()
+
+
 @receiver(pre_delete)
-def pre_delete_receiver(sender, instance, **kwargs):
+def pre_delete_receiver(sender, instance, using=None, **kwargs):
     """
     When a NetBox object is deleted, remove all of its attachment assignments.
     Attachments themselves are not deleted; they persist until explicitly removed.
+
+    Deleted objects are buffered per transaction and their assignments are removed
+    with one DELETE per object type once the transaction commits, so cascading bulk
+    deletions do not pay for an extra query per deleted row.
     """
     # Skip if the sender is one of our own models (avoid recursion)
     if sender in (NetBoxAttachment, NetBoxAttachmentAssignment):
@@ -165,16 +893,21 @@ def pre_delete_receiver(sender, instance, **kwargs):
     # Skip high-frequency Django internal models
     if sender._meta.app_label in ("sessions", "admin", "contenttypes", "auth", "taggit", "users"):
         return
-
-    try:
-        object_type = ObjectType.objects.get_for_model(instance)
-    except ObjectType.DoesNotExist:
+    # Assignments store integer object IDs only
+    if not isinstance(instance.pk, int):
         return
 
-    try:
-        # Delete the assignments for this object; attachments are left intact
-        # (QuerySet.delete() is a no-op on an empty queryset — no need for .exists() guard)
-        NetBoxAttachmentAssignment.objects.filter(object_type_id=object_type.id, object_id=instance.pk).delete()
-    except (TypeError, ValueError):
-        # instance.pk is not an integer type — no assignments can exist for it
+    # ContentType lookups are served from Django's in-process cache; the ID is shared with ObjectType
+    object_type_id = ContentType.objects.get_for_model(sender).pk
+    # Types that never had an assignment, and models outside the configured scope, need no cleanup
+    if not assigned_object_types.may_have_assignments(object_type_id):
+        return
+    if not validate_object_type(sender):
         return
+
+    buffer_until_commit(
+        "assignment_cleanup",
+        (object_type_id, instance.pk),
+        delete_assignments_for_objects,
+        using=using,
+    )
@@ -0,0 +1,231 @@
+"""Helpers for reading, writing and walking files in a Django storage backend."""
+
+import hashlib
+import io
+import logging
+import os
+from datetime import datetime, timezone
+
+from netbox_attachments.compression import open_decompressed
+from netbox_attachments.downloads import DOWNLOAD_CHUNK_SIZE
+from netbox_attachments.utils import sharded_upload_directory
+
+logger = logging.getLogger(__name__)
+
+# Storage backends raise their own error types (OSError, botocore's ClientError, ...), so code
+# that must survive a failing backend catches all of them
+STORAGE_ERRORS = (Exception,)
+
+
+def remove_empty_directory(storage, directory):
+    """Remove a directory of a local storage if it is empty; other backends have no directories."""
+    try:
+        path = storage.path(directory)
+    except NotImplementedError:
+        return
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass  # not empty, or already gone
+
+
+def delete_stored_file(storage, name):
+    """
+    Delete a stored file, and the directory of a sharded upload along with it once that is empty.
+
+    Every sharded upload has a directory of its own, which local storage would otherwise keep
+    behind empty.
+    """
+    storage.delete(name)
+    if directory := sharded_upload_directory(name):
+        remove_empty_directory(storage, directory)
+
+
+def copy_stored_file(storage, name, new_name, max_length=None):
+    """
+    Copy a stored file to new_name and return the name it was stored under.
+
+    Local storage creates a hard link, which is instant and needs no extra space; other
+    backends (or a failing link) stream the content through storage.save(). The original
+    is left in place so callers can remove it once the new name is recorded.
+    """
+    try:
+        source, target = storage.path(name), storage.path(new_name)
+    except NotImplementedError:
+        pass
+    else:
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.link(source, target)
+            return new_name
+        except FileExistsError:
+            pass  # let storage.save() pick a free name
+        except OSError as exc:
+            logger.debug("Could not hard link %s, copying instead: %s", name, exc)
+
+    with storage.open(name, "rb") as file:
+        return storage.save(new_name, file, max_length=max_length)
+
+
+def hash_file(file, algorithm="sha256"):
+    """
+    Return the hex digest of a Django File, read chunk by chunk.
+
+    Intended for uploads that have not been written to storage yet: the chunks come from the
+    request's temporary file or memory buffer, and the file is rewound for the storage write.
+    """
+    hasher = hashlib.new(algorithm)
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def read_file_metadata(storage, name, algorithm=None, encoding=""):
+    """
+    Return (size, stored_size, checksum) of a stored file; checksum is None unless algorithm is given.
+
+    size is the size of the original content. Compressed files, and files being hashed, are read
+    completely, so only pass algorithm when the checksum is needed.
+    """
+    stored_size = storage.size(name)
+    if not (algorithm or encoding):
+        return stored_size, stored_size, None
+
+    hasher = hashlib.new(algorithm) if algorithm else None
+    size = 0
+    with open_decompressed(storage.open(name, "rb"), encoding) as file:
+        while chunk := file.read(DOWNLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if hasher:
+                hasher.update(chunk)
+    return size, stored_size, hasher.hexdigest() if hasher else None
+
+
+class CountingReader(io.RawIOBase):
+    """
+    Wraps a readable stream, counting the bytes read and refusing to read more than limit bytes.
+
+    Used to write a request body straight to storage without buffering it. The stream cannot
+    be rewound; its size is the limit, i.e. the Content-Length the body was announced with.
+    """
+
+    def __init__(self, stream, limit=None):
+        self.stream = stream
+        self.limit = limit
+        self.size = limit
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self.count
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        self.count += len(data)
+        if self.limit is not None and self.count > self.limit:
+            raise ValueError(f"Stream exceeds the limit of {self.limit} bytes")
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class ConcatenatedFile(io.RawIOBase):
+    """
+    A read-only stream over several storage files in sequence, opening one file at a time.
+
+    Only rewinding to the start is supported, which is all Django's File.chunks() and
+    storage backends need.
+    """
+
+    def __init__(self, storage, names, size=None):
+        self.storage = storage
+        self.names = list(names)
+        self.size = size
+        self._index = 0
+        self._current = None
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("ConcatenatedFile can only be rewound to the start")
+        self._close_current()
+        self._index = 0
+        self._position = 0
+        return 0
+
+    def readinto(self, buffer):
+        while self._index < len(self.names):
+            if self._current is None:
+                self._current = self.storage.open(self.names[self._index], "rb")
+            data = self._current.read(len(buffer))
+            if data:
+                buffer[: len(data)] = data
+                self._position += len(data)
+                return len(data)
+            self._close_current()
+            self._index += 1
+        return 0
+
+    def _close_current(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        self._close_current()
+        super().close()
+
+
+def iter_storage_files(storage, directory):
+    """
+    Yield (name, modified) for every file below directory in a storage backend.
+
+    Local storage is walked with os.scandir(), one directory at a time, and modified is an
+    aware datetime. Other backends are walked with storage.listdir() and modified is None.
+    Names are storage names, e.g. "netbox-attachments/manual.pdf".
+    """
+    directory = directory.rstrip("/")
+    try:
+        root = storage.path(directory)
+    except NotImplementedError:
+        yield from _iter_listdir_files(storage, directory)
+    else:
+        yield from _iter_scandir_files(root, directory)
+
+
+def _iter_scandir_files(path, directory):
+    try:
+        with os.scandir(path) as entries:
+            subdirectories = []
+            for entry in entries:
+                name = f"{directory}/{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append((entry.path, name))
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, datetime.fromtimestamp(entry.stat().st_mtime, tz=timezone.utc)
+    except FileNotFoundError:
+        return
+    for subdirectory in subdirectories:
+        yield from _iter_scandir_files(*subdirectory)
+
+
+def _iter_listdir_files(storage, directory):
+    subdirectories, files = storage.listdir(directory)
+    for filename in files:
+        yield f"{directory}/{filename}", None
+    for subdirectory in subdirectories:
+        yield from _iter_listdir_files(storage, f"{directory}/{subdirectory}")
@@ -1,15 +1,18 @@
-import logging
-
 import django_tables2 as tables
 from netbox.tables import NetBoxTable, columns
 
 from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentAssignment
-
-logger = logging.getLogger(__name__)
+from netbox_attachments.utils import prefetch_assignment_parents
 
 FILE_SIZE = "{{ record.size|filesizeformat }}"
+STORED_SIZE = """
+{% if record.stored_size is not None %}{{ record.stored_size|filesizeformat }}{% if record.encoding %} <span class="text-muted">({{ record.encoding }})</span>{% endif %}{% endif %}
+"""
+FILE_LINK = """
+<a href="{% url 'plugins:netbox_attachments:netboxattachment_download' pk=record.pk %}">{{ record.filename }}</a>
+"""
 DOWNLOAD_BUTTON = """
-<a href="{{record.file.url}}" target="_blank" rel="noopener noreferrer" class="btn btn-sm btn-primary download-attachment" title="Download">
+<a href="{% url 'plugins:netbox_attachments:netboxattachment_download' pk=record.pk %}" class="btn btn-sm btn-primary download-attachment" title="Download">
   <i class="mdi mdi-download"></i>
 </a>
 {% if perms.netbox_attachments.add_netboxattachmentassignment %}
@@ -61,12 +64,16 @@ ASSIGNMENT_ATTACHMENT_LINK = """
 
 ATTACHMENT_ASSIGNMENT_SIZE = "{{ record.attachment.size|filesizeformat }}"
 
+ATTACHMENT_ASSIGNMENT_FILE_LINK = """
+<a href="{% url 'plugins:netbox_attachments:netboxattachment_download' pk=record.attachment_id %}">{{ record.attachment.filename }}</a>
+"""
+
 OBJECT_ATTACHMENT_LINKS_COUNT = """
-<a href="{{ record.attachment.get_absolute_url }}">{{ record.attachment_link_count }}</a>
+<a href="{{ record.attachment.get_absolute_url }}">{{ record.attachment.assignment_count }}</a>
 """
 
 OBJECT_ATTACHMENT_ACTIONS = """
-<a href="{{ record.attachment.file.url }}" target="_blank" rel="noopener noreferrer"
+<a href="{% url 'plugins:netbox_attachments:netboxattachment_download' pk=record.attachment_id %}"
    class="btn btn-sm btn-primary" title="Download">
     <i class="mdi mdi-download"></i>
 </a>
@@ -74,26 +81,39 @@ OBJECT_ATTACHMENT_ACTIONS = """
 
 
 def get_missing_parent_row_class(record):
-    count = getattr(record, "assignment_count", None)
-    if count is not None:
-        return "table-danger" if count == 0 else ""
-    # Fallback for views without annotation
-    logger.warning(
-        "assignment_count annotation missing for %r; falling back to exists() query", record
-    )
-    return "table-danger" if not record.attachment_assignments.exists() else ""
+    return "table-danger" if record.assignment_count == 0 else ""
 
 
-class NetBoxAttachmentTable(NetBoxTable):
+class ParentPrefetchMixin:
+    """
+    Resolves the parents of all assignments shown on the current page in bulk.
+
+    Runs after configure() has paginated the table, so a page costs one query per
+    distinct object type instead of one query per row.
+    """
+
+    def get_page_assignments(self, records):
+        return records
+
+    def configure(self, request):
+        super().configure(request)
+        records = [row.record for row in self.paginated_rows()]
+        prefetch_assignment_parents(self.get_page_assignments(records), user=request.user)
+
+
+class NetBoxAttachmentTable(ParentPrefetchMixin, NetBoxTable):
     name = tables.Column(accessor="name", verbose_name="Name", orderable=True, linkify=True)
     parent = tables.TemplateColumn(
         template_code=PARENT_COLUMN,
         verbose_name="Assigned To",
         orderable=False,
     )
+    assignment_count = tables.Column(verbose_name="Assignments")
     tags = columns.TagColumn()
-    file = tables.FileColumn()
+    file = tables.TemplateColumn(template_code=FILE_LINK, verbose_name="File", order_by=("file",))
     size = tables.TemplateColumn(template_code=FILE_SIZE)
+    stored_size = tables.TemplateColumn(template_code=STORED_SIZE, verbose_name="Stored Size")
+    checksum = tables.Column(verbose_name="Checksum")
     actions = columns.ActionsColumn(extra_buttons=DOWNLOAD_BUTTON)
 
     class Meta(NetBoxTable.Meta):
@@ -104,8 +124,13 @@ class NetBoxAttachmentTable(NetBoxTable):
             "name",
             "description",
             "parent",
+            "assignment_count",
             "file",
             "size",
+            "stored_size",
+            "encoding",
+            "checksum",
+            "checksum_algorithm",
             "comments",
             "actions",
             "created",
@@ -123,8 +148,11 @@ class NetBoxAttachmentTable(NetBoxTable):
             "class": get_missing_parent_row_class,
         }
 
+    def get_page_assignments(self, records):
+        return [assignment for record in records for assignment in record.attachment_assignments.all()]
+
 
-class NetBoxAttachmentAssignmentTable(NetBoxTable):
+class NetBoxAttachmentAssignmentTable(ParentPrefetchMixin, NetBoxTable):
     attachment = tables.TemplateColumn(
         template_code=ASSIGNMENT_ATTACHMENT_LINK,
         verbose_name="Attachment",
@@ -137,7 +165,7 @@ class NetBoxAttachmentAssignmentTable(NetBoxTable):
         orderable=False,
     )
     description = tables.Column(accessor="attachment.description", verbose_name="Description", orderable=False)
-    file = tables.FileColumn(accessor="attachment.file", verbose_name="File", orderable=False)
+    file = tables.TemplateColumn(template_code=ATTACHMENT_ASSIGNMENT_FILE_LINK, verbose_name="File", orderable=False)
     size = tables.TemplateColumn(template_code=ATTACHMENT_ASSIGNMENT_SIZE, verbose_name="Size", orderable=False)
     tags = columns.TagColumn(url_name="plugins:netbox_attachments:netboxattachmentassignment_list")
     actions = columns.ActionsColumn(extra_buttons=OBJECT_ATTACHMENT_ACTIONS)
@@ -181,8 +209,8 @@ class NetBoxAttachmentForObjectTable(NetBoxTable):
         verbose_name="Description",
         orderable=False,
     )
-    file = tables.FileColumn(
-        accessor="attachment.file",
+    file = tables.TemplateColumn(
+        template_code=ATTACHMENT_ASSIGNMENT_FILE_LINK,
         verbose_name="File",
         orderable=False,
     )
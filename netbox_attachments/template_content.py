@@ -1,10 +1,15 @@
 import logging
 from typing import List, Type
 
-from django.db.models import Count
 from django.db.utils import OperationalError
 
-from netbox_attachments.utils import _get_plugin_settings, is_custom_object_model, validate_object_type
+from netbox_attachments.utils import (
+    _get_plugin_settings,
+    get_cached_attachment_count,
+    has_unconstrained_permission,
+    is_custom_object_model,
+    validate_object_type,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +74,36 @@ def create_add_attachment_button(model_name: str, url_pattern_name: str):
     return AddAttachmentButton
 
 
+def get_attachment_badge_count(obj, user) -> int:
+    """
+    Return the number of attachments of obj visible to user.
+
+    Users whose view permission is unconstrained see every assignment, so their count comes
+    from the shared per-object cache. Anyone else gets a permission-restricted query.
+    """
+    from core.models.object_types import ObjectType
+
+    from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentAssignment
+
+    object_type = ObjectType.objects.get_for_model(obj)
+    if has_unconstrained_permission(user, "netbox_attachments.view_netboxattachment"):
+        # An assignment is unique per (attachment, object), so it counts one attachment
+        return get_cached_attachment_count(
+            object_type.pk,
+            obj.pk,
+            lambda: NetBoxAttachmentAssignment.objects.filter(object_type=object_type, object_id=obj.pk).count(),
+        )
+    return (
+        NetBoxAttachment.objects.filter(
+            attachment_assignments__object_type=object_type,
+            attachment_assignments__object_id=obj.pk,
+        )
+        .restrict(user, "view")
+        .distinct()
+        .count()
+    )
+
+
 def register_attachment_tab_view(model) -> str:
     from core.models.object_types import ObjectType
     from netbox.context import current_request
@@ -76,7 +111,7 @@ def register_attachment_tab_view(model) -> str:
     from utilities.views import ViewTab, register_model_view
 
     from netbox_attachments import filtersets, tables
-    from netbox_attachments.models import NetBoxAttachment, NetBoxAttachmentAssignment
+    from netbox_attachments.models import NetBoxAttachmentAssignment
 
     model_name = model._meta.model_name
     view_name = f"{model_name}-attachment_list"
@@ -92,15 +127,7 @@ def register_attachment_tab_view(model) -> str:
 
         tab = ViewTab(
             label="Attachments",
-            badge=lambda obj: (
-                NetBoxAttachment.objects.filter(
-                    attachment_assignments__object_type=ObjectType.objects.get_for_model(obj),
-                    attachment_assignments__object_id=obj.id,
-                )
-                .restrict(current_request.get().user, "view")
-                .distinct()
-                .count()
-            ),
+            badge=lambda obj: get_attachment_badge_count(obj, current_request.get().user),
             hide_if_empty=False,
             permission="netbox_attachments.view_netboxattachment",
         )
@@ -114,7 +141,6 @@ def register_attachment_tab_view(model) -> str:
                 .restrict(request.user, "view")
                 .select_related("attachment")
                 .prefetch_related("tags", "attachment__tags")
-                .annotate(attachment_link_count=Count("attachment__attachment_assignments", distinct=True))
             )
 
     register_model_view(model, name=view_name, path=view_path)(AttachmentTabView)
@@ -0,0 +1,17 @@
+"""
+Standalone pytest runs configure a minimal Django project with an in-memory SQLite database,
+so tests can exercise real transactions and queries. Under NetBox, its own settings are used.
+"""
+
+import os
+
+import django
+from django.conf import settings
+
+if not settings.configured and "DJANGO_SETTINGS_MODULE" not in os.environ:
+    settings.configure(
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        INSTALLED_APPS=["django.contrib.contenttypes"],
+        USE_TZ=True,
+    )
+    django.setup()
@@ -0,0 +1,125 @@
+"""Unit tests for the cached attachment tab badge counts.
+
+The cache helpers only touch utils.cache, which is replaced with an in-memory
+fake, and duck-typed user objects — no Django settings are needed.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from netbox_attachments import utils
+
+PERMISSION = "netbox_attachments.view_netboxattachment"
+
+
+class FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+
+    def add(self, key, value, timeout=None):
+        return self.data.setdefault(key, value) is value
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class BrokenCache:
+    def get(self, key):
+        raise ConnectionError("cache down")
+
+    def delete_many(self, keys):
+        raise ConnectionError("cache down")
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    cache = FakeCache()
+    monkeypatch.setattr(utils, "cache", cache)
+    return cache
+
+
+def _make_user(constraints=None, is_superuser=False, is_authenticated=True):
+    perm_cache = {} if constraints is None else {PERMISSION: constraints}
+    return SimpleNamespace(
+        is_authenticated=is_authenticated,
+        is_superuser=is_superuser,
+        _object_perm_cache=perm_cache,
+        get_all_permissions=lambda: set(perm_cache),
+    )
+
+
+def test_cached_count_calls_counter_only_on_miss(fake_cache):
+    calls = []
+
+    def counter():
+        calls.append(1)
+        return 3
+
+    assert utils.get_cached_attachment_count(1, 10, counter) == 3
+    assert utils.get_cached_attachment_count(1, 10, counter) == 3
+    assert len(calls) == 1
+
+
+def test_cached_zero_count_is_not_a_miss(fake_cache):
+    calls = []
+
+    def counter():
+        calls.append(1)
+        return 0
+
+    utils.get_cached_attachment_count(1, 10, counter)
+    utils.get_cached_attachment_count(1, 10, counter)
+
+    assert len(calls) == 1
+
+
+def test_invalidate_drops_only_given_objects(fake_cache):
+    utils.get_cached_attachment_count(1, 10, lambda: 2)
+    utils.get_cached_attachment_count(1, 11, lambda: 5)
+
+    utils.invalidate_attachment_counts([(1, 10)])
+
+    assert utils.get_cached_attachment_count(1, 10, lambda: 4) == 4
+    assert utils.get_cached_attachment_count(1, 11, lambda: 0) == 5
+
+
+def test_count_racing_an_invalidation_is_not_served(fake_cache):
+    def stale_counter():
+        # The assignment commits and invalidates while this count is still running
+        utils.invalidate_attachment_counts([(1, 10)])
+        return 2
+
+    assert utils.get_cached_attachment_count(1, 10, stale_counter) == 2
+    assert utils.get_cached_attachment_count(1, 10, lambda: 3) == 3
+    assert utils.get_cached_attachment_count(1, 10, lambda: 4) == 3
+
+
+def test_unavailable_cache_falls_back_to_counter(monkeypatch):
+    monkeypatch.setattr(utils, "cache", BrokenCache())
+
+    assert utils.get_cached_attachment_count(1, 10, lambda: 7) == 7
+    utils.invalidate_attachment_counts([(1, 10)])  # must not raise
+
+
+@pytest.mark.parametrize(
+    "user, expected",
+    [
+        (None, False),
+        (_make_user(is_authenticated=False), False),
+        (_make_user(is_superuser=True), True),
+        (_make_user(), False),
+        (_make_user(constraints=[None]), True),
+        (_make_user(constraints=[{"name__startswith": "public"}]), False),
+        (_make_user(constraints=[{"name__startswith": "public"}, {}]), True),
+    ],
+)
+def test_has_unconstrained_permission(user, expected):
+    assert utils.has_unconstrained_permission(user, PERMISSION) is expected
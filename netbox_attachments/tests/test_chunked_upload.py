@@ -0,0 +1,132 @@
+"""Unit tests for the streaming helpers behind chunked uploads and ranged downloads.
+
+ConcatenatedFile and CountingReader only need a storage-like object with
+open(), so they are exercised against an in-memory fake — no Django
+settings or storage backend is needed.
+"""
+
+import hashlib
+import io
+
+import pytest
+from django.core.files import File
+
+from netbox_attachments import downloads
+from netbox_attachments.storage import ConcatenatedFile, CountingReader, hash_file
+
+
+class FakeStorage:
+    def __init__(self, files):
+        self.files = files
+        self.opened = []
+
+    def open(self, name, mode="rb"):
+        self.opened.append(name)
+        return io.BytesIO(self.files[name])
+
+
+def _make_concatenated(chunks):
+    names = [f"uploads/session/{index:06d}" for index in range(len(chunks))]
+    storage = FakeStorage(dict(zip(names, chunks)))
+    return ConcatenatedFile(storage, names, size=sum(map(len, chunks))), storage
+
+
+def test_concatenated_file_reads_chunks_in_order():
+    stream, storage = _make_concatenated([b"abc", b"", b"defgh", b"ij"])
+
+    assert stream.read() == b"abcdefghij"
+    assert stream.tell() == 10
+    assert storage.opened == [f"uploads/session/{index:06d}" for index in range(4)]
+
+
+def test_concatenated_file_reads_are_bounded_by_requested_size():
+    stream, _ = _make_concatenated([b"abcdef", b"gh"])
+
+    assert [stream.read(4), stream.read(4), stream.read(4), stream.read(4)] == [b"abcd", b"ef", b"gh", b""]
+
+
+def test_concatenated_file_can_be_rewound_only_to_start():
+    stream, _ = _make_concatenated([b"abc", b"def"])
+    stream.read(5)
+
+    assert stream.seek(0) == 0
+    assert stream.read() == b"abcdef"
+    with pytest.raises(io.UnsupportedOperation):
+        stream.seek(2)
+
+
+def test_concatenated_file_works_as_django_file():
+    chunks = [b"x" * 70000, b"y" * 10, b"z" * 65536]
+    stream, _ = _make_concatenated(chunks)
+    upload = File(stream, name="firmware.bin")
+
+    assert upload.size == sum(map(len, chunks))
+    assert hash_file(upload) == hashlib.sha256(b"".join(chunks)).hexdigest()
+    # hash_file() rewinds, so the storage write sees the whole content again
+    assert b"".join(upload.chunks()) == b"".join(chunks)
+
+
+def test_counting_reader_counts_and_enforces_limit():
+    reader = CountingReader(io.BytesIO(b"0123456789"), limit=10)
+    assert reader.read(4) + reader.read() == b"0123456789"
+    assert reader.count == 10
+
+    reader = CountingReader(io.BytesIO(b"0123456789"), limit=5)
+    with pytest.raises(ValueError):
+        reader.read()
+
+
+def test_counting_reader_streams_through_django_file():
+    reader = CountingReader(io.BytesIO(b"a" * 100000))
+
+    assert sum(len(chunk) for chunk in File(reader).chunks(chunk_size=4096)) == 100000
+    assert reader.count == 100000
+
+
+def test_counting_reader_is_a_non_seekable_file_of_the_limit_size():
+    file = File(CountingReader(io.BytesIO(b"0123456789"), limit=10))
+
+    assert not file.closed
+    assert not file.seekable()
+    assert file.size == 10
+    assert b"".join(file.chunks()) == b"0123456789"
+    file.close()
+    assert file.closed
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=900-5000", (900, 999)),
+        ("bytes=-200", (800, 999)),
+        ("bytes=-5000", (0, 999)),
+        (" bytes = 10 - 19 ", (10, 19)),
+        ("bytes=0-1,5-9", None),  # multiple ranges: serve the whole file
+        ("items=0-9", None),
+        ("bytes=9-0", None),
+        ("bytes=a-9", None),
+        ("bytes=-", None),
+    ],
+)
+def test_parse_range_header(header, expected):
+    assert downloads.parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_parse_range_header_rejects_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        downloads.parse_range_header(header, 1000)
+
+
+def test_iter_file_range_streams_inclusive_range_and_closes():
+    file = io.BytesIO(bytes(range(256)) * 4)
+
+    chunks = list(downloads.iter_file_range(file, 10, 209, chunk_size=64))
+
+    assert [len(chunk) for chunk in chunks] == [64, 64, 64, 8]
+    assert b"".join(chunks) == (bytes(range(256)) * 4)[10:210]
+    assert file.closed
@@ -0,0 +1,128 @@
+"""Unit tests for at-rest compression of attachment files.
+
+The helpers work on Django File objects and plain streams, so they run
+without Django settings. zstd tests are skipped unless zstandard is installed.
+"""
+
+import gzip
+import hashlib
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+
+from netbox_attachments import compression, downloads
+from netbox_attachments.storage import read_file_metadata
+
+CONTENT = b"interface GigabitEthernet0/1\n description uplink\n" * 2000
+
+
+class FakeStorage:
+    def __init__(self, files):
+        self.files = files
+
+    def size(self, name):
+        return len(self.files[name])
+
+    def open(self, name, mode="rb"):
+        return ContentFile(self.files[name], name=name)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_compress_file_round_trips_and_rewinds(encoding):
+    if encoding == "zstd":
+        pytest.importorskip("zstandard")
+    upload = ContentFile(CONTENT, name="switch.cfg")
+
+    compressed = compression.compress_file(upload, encoding)
+    stored = compressed.read()
+
+    assert upload.tell() == 0
+    assert len(stored) < len(CONTENT) / 10
+    with compression.open_decompressed(io.BytesIO(stored), encoding) as reader:
+        assert reader.read() == CONTENT
+
+
+def test_gzip_output_is_deterministic():
+    first = compression.compress_file(ContentFile(CONTENT), "gzip").read()
+    second = compression.compress_file(ContentFile(CONTENT), "gzip").read()
+
+    assert first == second
+    assert gzip.decompress(first) == CONTENT
+
+
+def test_decompressed_reader_serves_ranges_and_closes_stored_file():
+    stored = io.BytesIO(gzip.compress(CONTENT))
+
+    chunks = downloads.iter_file_range(compression.open_decompressed(stored, "gzip"), 1000, 70999, chunk_size=4096)
+
+    assert b"".join(chunks) == CONTENT[1000:71000]
+    assert stored.closed
+
+
+def test_open_decompressed_passes_plain_files_through_and_rejects_unknown_encodings():
+    file = io.BytesIO(b"plain")
+    assert compression.open_decompressed(file, "") is file
+
+    with pytest.raises(ValueError):
+        compression.open_decompressed(io.BytesIO(b""), "brotli")
+
+
+def test_read_file_metadata_measures_compressed_content():
+    storage = FakeStorage({"netbox-attachments/switch.cfg": gzip.compress(CONTENT)})
+
+    size, stored_size, checksum = read_file_metadata(storage, "netbox-attachments/switch.cfg", "md5", "gzip")
+
+    assert size == len(CONTENT)
+    assert stored_size == len(gzip.compress(CONTENT))
+    assert checksum == hashlib.md5(CONTENT).hexdigest()
+
+
+@pytest.mark.parametrize(
+    "header, encoding, expected",
+    [
+        (None, "gzip", False),
+        ("gzip, deflate, br", "gzip", True),
+        ("GZIP", "gzip", True),
+        ("deflate, br", "gzip", False),
+        ("gzip;q=0", "gzip", False),
+        ("gzip; q=0.5, zstd", "zstd", True),
+        ("*", "zstd", True),
+        ("*;q=0", "gzip", False),
+        ("*, gzip;q=0", "gzip", False),
+        ("gzip;q=abc", "gzip", False),
+    ],
+)
+def test_accepts_encoding(header, encoding, expected):
+    assert compression.accepts_encoding(header, encoding) is expected
+
+
+def test_is_compressible_name():
+    assert compression.is_compressible_name("netbox-attachments/export.csv")
+    assert compression.is_compressible_name("netbox-attachments/router.conf")
+    assert not compression.is_compressible_name("netbox-attachments/photo.JPG")
+    assert not compression.is_compressible_name("netbox-attachments/backup.tar.gz")
+
+
+def test_compression_settings_fall_back_on_invalid_values(monkeypatch):
+    monkeypatch.setattr(
+        compression, "_get_plugin_settings", lambda: {"compression": "lz4", "compression_min_savings": 1}
+    )
+    assert compression.get_compression() == ""
+    assert compression.get_compression_min_savings() == 0.2
+
+    monkeypatch.setattr(
+        compression, "_get_plugin_settings", lambda: {"compression": "gzip", "compression_min_savings": 0.5}
+    )
+    assert compression.get_compression() == "gzip"
+    assert compression.get_compression_min_savings() == 0.5
+
+    monkeypatch.setattr(compression, "_get_plugin_settings", lambda: {})
+    assert compression.get_compression() == ""
+
+
+def test_zstd_falls_back_to_gzip_without_zstandard(monkeypatch):
+    monkeypatch.setattr(compression, "_get_plugin_settings", lambda: {"compression": "zstd"})
+    monkeypatch.setattr(compression, "zstandard", None)
+
+    assert compression.get_compression() == "gzip"
@@ -1,8 +1,11 @@
 """Unit tests for standalone pytest execution."""
 
-from types import SimpleNamespace
+import hashlib
+import sys
+from types import ModuleType, SimpleNamespace
+from unittest.mock import MagicMock
 
-from netbox_attachments import utils
+from netbox_attachments import storage, utils
 
 
 class FakeModel:
@@ -92,3 +95,241 @@ def test_validate_object_type_empty_scope_disables_all(monkeypatch):
 
     assert utils.validate_object_type(FakeModel("dcim", "device")) is False
     assert utils.validate_object_type(FakeModel("ipam", "ipaddress")) is False
+
+
+def test_validate_object_type_memoizes_decisions_per_settings(monkeypatch):
+    settings_data = {"applied_scope": "model", "scope_filter": ["dcim.device"]}
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: settings_data)
+    calls = []
+    resolve = utils._resolve_object_type
+    monkeypatch.setattr(
+        utils,
+        "_resolve_object_type",
+        lambda model, *key: calls.append(model._meta.model_name) or resolve(model, *key),
+    )
+
+    for _ in range(3):
+        assert utils.validate_object_type(FakeModel("dcim", "device")) is True
+        assert utils.validate_object_type(FakeModel("dcim", "site")) is False
+
+    assert calls == ["device", "site"]
+
+
+def test_validate_object_type_recomputes_when_settings_change(monkeypatch):
+    settings_data = {"applied_scope": "app", "scope_filter": ["dcim"]}
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: settings_data)
+    assert utils.validate_object_type(FakeModel("dcim", "device")) is True
+
+    settings_data = {"applied_scope": "app", "scope_filter": ["ipam"]}
+
+    assert utils.validate_object_type(FakeModel("dcim", "device")) is False
+
+
+def test_clear_scope_cache_forgets_decisions(monkeypatch):
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"applied_scope": "app", "scope_filter": ["dcim"]})
+    utils.validate_object_type(FakeModel("dcim", "device"))
+
+    utils.clear_scope_cache()
+
+    assert utils._scope_state.decisions == {}
+
+
+def _install_fake_custom_objects(monkeypatch, names):
+    """Register a fake netbox_custom_objects.models module and return its CustomObjectType mock."""
+
+    class CustomObject:
+        pass
+
+    CustomObjectType = MagicMock(name="CustomObjectType")
+    CustomObjectType.objects.values_list.side_effect = lambda *fields: list(names.items())
+
+    package = ModuleType("netbox_custom_objects")
+    models_module = ModuleType("netbox_custom_objects.models")
+    models_module.CustomObject = CustomObject
+    models_module.CustomObjectType = CustomObjectType
+    package.models = models_module
+    monkeypatch.setitem(sys.modules, "netbox_custom_objects", package)
+    monkeypatch.setitem(sys.modules, "netbox_custom_objects.models", models_module)
+    monkeypatch.setattr(utils, "custom_object_type_names", utils.CustomObjectTypeNames())
+
+    def make_model(custom_object_type_id):
+        return type(
+            f"Table{custom_object_type_id}Model",
+            (CustomObject,),
+            {
+                "_meta": SimpleNamespace(
+                    app_label="netbox_custom_objects",
+                    model_name=f"table{custom_object_type_id}model",
+                    abstract=False,
+                ),
+                "custom_object_type_id": custom_object_type_id,
+            },
+        )
+
+    return CustomObjectType, make_model
+
+
+def test_model_scope_resolves_custom_object_names_with_one_query(monkeypatch):
+    CustomObjectType, make_model = _install_fake_custom_objects(monkeypatch, {1: "rack_docs", 2: "cable", 3: "sla"})
+    scope_filter = ["netbox_custom_objects.rack_docs", "netbox_custom_objects.sla"]
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"applied_scope": "model", "scope_filter": scope_filter})
+
+    decisions = [utils.validate_object_type(make_model(type_id)) for type_id in (1, 2, 3, 4)]
+
+    assert decisions == [True, False, True, False]
+    CustomObjectType.objects.values_list.assert_called_once_with("id", "name")
+
+
+def test_custom_object_type_change_reloads_names(monkeypatch):
+    names = {1: "rack_docs"}
+    CustomObjectType, make_model = _install_fake_custom_objects(monkeypatch, names)
+    monkeypatch.setattr(utils, "transaction", SimpleNamespace(on_commit=lambda func: None))
+    monkeypatch.setattr(
+        utils,
+        "_get_plugin_settings",
+        lambda: {"applied_scope": "model", "scope_filter": ["netbox_custom_objects.renamed"]},
+    )
+    assert utils.validate_object_type(make_model(1)) is False
+
+    names[1] = "renamed"
+    utils.custom_object_types_changed()
+
+    assert utils.validate_object_type(make_model(1)) is True
+    assert CustomObjectType.objects.values_list.call_count == 2
+
+
+def _install_fake_object_types(monkeypatch, rows):
+    """Register a fake core.models.object_types module whose ObjectType yields the given rows."""
+    ObjectType = MagicMock(name="ObjectType")
+    ObjectType.objects.only.return_value.iterator.side_effect = lambda: iter(rows)
+
+    module = ModuleType("core.models.object_types")
+    module.ObjectType = ObjectType
+    monkeypatch.setitem(sys.modules, "core", ModuleType("core"))
+    monkeypatch.setitem(sys.modules, "core.models", ModuleType("core.models"))
+    monkeypatch.setitem(sys.modules, "core.models.object_types", module)
+    return ObjectType
+
+
+def _make_object_type_row(pk, app_label, model, model_class=None):
+    row = SimpleNamespace(pk=pk, app_label=app_label, model=model)
+    row.model_class = MagicMock(return_value=model_class)
+    return row
+
+
+def test_broken_object_type_ids_are_computed_once(monkeypatch):
+    installed = _make_object_type_row(1, "dcim", "device")
+    lazy = _make_object_type_row(2, "netbox_custom_objects", "table9model", model_class=object)
+    removed = _make_object_type_row(3, "oldplugin", "widget")
+    ObjectType = _install_fake_object_types(monkeypatch, [installed, lazy, removed])
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {})
+    monkeypatch.setattr(utils, "_iter_candidate_models", lambda: iter([FakeModel("dcim", "device")]))
+
+    assert utils.get_broken_object_type_ids() == {3}
+    assert utils.get_broken_object_type_ids() == {3}
+
+    ObjectType.objects.only.assert_called_once()
+    installed.model_class.assert_not_called()
+    lazy.model_class.assert_called_once()
+
+
+def test_broken_object_type_ids_recomputed_after_scope_cache_clear(monkeypatch):
+    rows = [_make_object_type_row(3, "oldplugin", "widget")]
+    _install_fake_object_types(monkeypatch, rows)
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {})
+    monkeypatch.setattr(utils, "_iter_candidate_models", lambda: iter([]))
+    assert utils.get_broken_object_type_ids() == {3}
+
+    rows.append(_make_object_type_row(4, "oldplugin", "gadget"))
+    utils.clear_scope_cache()
+
+    assert utils.get_broken_object_type_ids() == {3, 4}
+
+
+def test_parse_object_reference_accepts_id_and_natural_key():
+    assert utils.parse_object_reference("12:345") == (12, 345)
+    assert utils.parse_object_reference(" dcim.Device:7 ") == (("dcim", "device"), 7)
+
+
+def test_parse_object_reference_rejects_malformed_values():
+    for value in ("", "12", "12:", ":5", "dcim:5", "dcim.device:x", "dcim.:5", "12:-1"):
+        assert utils.parse_object_reference(value) is None
+
+
+def test_hash_file_reads_chunks_and_rewinds():
+    from django.core.files.base import ContentFile
+
+    upload = ContentFile(b"rack diagram" * 10000, name="rack.pdf")
+
+    digest = storage.hash_file(upload)
+
+    assert digest == hashlib.sha256(b"rack diagram" * 10000).hexdigest()
+    assert upload.tell() == 0
+
+
+def test_read_file_metadata_hashes_only_when_asked():
+    from django.core.files.base import ContentFile
+
+    opened = []
+
+    class FakeStorage:
+        def size(self, name):
+            return 12
+
+        def open(self, name, mode="rb"):
+            opened.append(name)
+            return ContentFile(b"rack diagram", name=name)
+
+    assert storage.read_file_metadata(FakeStorage(), "netbox-attachments/rack.pdf") == (12, 12, None)
+    assert opened == []
+
+    size, stored_size, checksum = storage.read_file_metadata(FakeStorage(), "netbox-attachments/rack.pdf", "md5")
+
+    assert (size, stored_size, checksum) == (12, 12, hashlib.md5(b"rack diagram").hexdigest())
+    assert opened == ["netbox-attachments/rack.pdf"]
+
+
+def test_content_addressed_name_fans_out_by_digest_prefix():
+    name = utils.content_addressed_name("ab" + "0" * 62)
+
+    assert name == "netbox-attachments/cas/ab/ab" + "0" * 62
+    assert len(name) <= 100  # FileField default max_length
+    assert utils.is_content_addressed_name(name)
+    assert not utils.is_content_addressed_name("netbox-attachments/rack.pdf")
+
+
+def test_deduplicate_files_defaults_to_false_for_invalid_values(monkeypatch):
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"deduplicate_files": "yes"})
+    assert utils.deduplicate_files_enabled() is False
+
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"deduplicate_files": True})
+    assert utils.deduplicate_files_enabled() is True
+
+
+def test_checksum_algorithm_setting(monkeypatch):
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {})
+    assert utils.get_checksum_algorithm() == "sha256"
+
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"checksum_algorithm": "blake2b"})
+    assert utils.get_checksum_algorithm() == "blake2b"
+
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"checksum_algorithm": "shake_128"})
+    assert utils.get_checksum_algorithm() == "sha256"
+
+
+def test_checksum_algorithms_fit_the_checksum_column():
+    for algorithm in utils.CHECKSUM_ALGORITHMS:
+        assert len(hashlib.new(algorithm).hexdigest()) <= 128
+        assert len(algorithm) <= 16
+
+
+def test_changes_feed_settings_fall_back_on_invalid_values(monkeypatch):
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"changes_lookback": 300, "tombstone_retention_days": 7})
+
+    assert utils.get_changes_lookback().total_seconds() == 300
+    assert utils.get_tombstone_retention().days == 7
+
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"changes_lookback": -1, "tombstone_retention_days": 0})
+
+    assert utils.get_changes_lookback().total_seconds() == 60
+    assert utils.get_tombstone_retention().days == 90
@@ -0,0 +1,71 @@
+"""Unit tests for download offloading to the front-end web server.
+
+get_offload_header() only talks to a storage backend, so it is checked
+against stubs for a local and a remote storage backend — no web server or
+Django settings are needed.
+"""
+
+import os
+
+import pytest
+from django.core.files.storage import Storage
+
+from netbox_attachments import downloads
+
+NAME = "netbox-attachments/cas/ab/rack diagram.pdf"
+
+
+class LocalStorage(Storage):
+    """Like FileSystemStorage, which needs MEDIA_ROOT from settings, it maps names below a root directory."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    return LocalStorage(str(tmp_path))
+
+
+def test_stream_mode_never_offloads(local_storage):
+    assert downloads.get_offload_header("stream", local_storage, NAME) is None
+
+
+def test_x_accel_redirect_points_at_internal_location(local_storage):
+    header = downloads.get_offload_header("x_accel_redirect", local_storage, NAME, "/protected-media/")
+
+    assert header == ("X-Accel-Redirect", "/protected-media/netbox-attachments/cas/ab/rack%20diagram.pdf")
+
+
+def test_x_accel_redirect_works_for_remote_storage():
+    header = downloads.get_offload_header("x_accel_redirect", Storage(), NAME, "/internal")
+
+    assert header == ("X-Accel-Redirect", "/internal/netbox-attachments/cas/ab/rack%20diagram.pdf")
+
+
+def test_x_sendfile_uses_absolute_storage_path(local_storage, tmp_path):
+    header = downloads.get_offload_header("x_sendfile", local_storage, NAME)
+
+    assert header == ("X-Sendfile", str(tmp_path / NAME))
+
+
+def test_x_sendfile_falls_back_to_streaming_without_local_path():
+    assert downloads.get_offload_header("x_sendfile", Storage(), NAME) is None
+
+
+def test_download_settings_fall_back_on_invalid_values(monkeypatch):
+    monkeypatch.setattr(
+        downloads,
+        "_get_plugin_settings",
+        lambda: {"download_mode": "sendfile", "download_internal_prefix": "protected"},
+    )
+
+    assert downloads.get_download_mode() == "stream"
+    assert downloads.get_download_internal_prefix() == "/protected-media/"
+
+    monkeypatch.setattr(downloads, "_get_plugin_settings", lambda: {"download_mode": "x_accel_redirect"})
+
+    assert downloads.get_download_mode() == "x_accel_redirect"
@@ -0,0 +1,884 @@
+"""Integration tests against the NetBox runtime and its test database.
+
+Run them from a NetBox installation with the plugin enabled:
+
+    python manage.py test netbox_attachments.tests.test_integration
+
+The standalone pytest run has no NetBox, so the whole module is skipped there.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from django.apps import apps
+
+if not apps.is_installed("netbox_attachments"):
+    raise unittest.SkipTest("requires a NetBox installation with netbox_attachments enabled")
+
+from core.models import ObjectType  # noqa: E402
+from dcim.models import Site  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.exceptions import PermissionDenied  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from tenancy.models import Tenant  # noqa: E402
+from users.models import ObjectPermission  # noqa: E402
+from utilities.testing import APITestCase, TestCase  # noqa: E402
+
+from netbox_attachments.api.serializers import BULK_MAX_ITEMS  # noqa: E402
+from netbox_attachments.api.views import NetBoxAttachmentAssignmentViewSet  # noqa: E402
+from netbox_attachments.management.commands.migrate_upload_layout import (  # noqa: E402
+    Command as MigrateUploadLayoutCommand,
+)
+from netbox_attachments.models import (  # noqa: E402
+    NetBoxAttachment,
+    NetBoxAttachmentAssignment,
+    NetBoxAttachmentFileDeletion,
+    NetBoxAttachmentUploadSession,
+    delete_orphaned_files,
+    find_orphaned_files,
+    process_file_deletions,
+    recount_assignments,
+)
+from netbox_attachments.tables import NetBoxAttachmentForObjectTable, NetBoxAttachmentTable  # noqa: E402
+from netbox_attachments.storage import CountingReader, iter_storage_files  # noqa: E402
+from netbox_attachments.template_content import get_attachment_badge_count  # noqa: E402
+from netbox_attachments.utils import (  # noqa: E402
+    content_addressed_name,
+    encode_cursor,
+    invalidate_attachment_counts,
+    sharded_upload_directory,
+)
+
+
+class TemporaryMediaMixin:
+    """Stores the files written by a test case in a temporary MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        media_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media_root.cleanup)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root.name))
+
+
+def plugin_settings(**options):
+    """Overrides the given plugin settings, keeping the others."""
+    plugins_config = dict(settings.PLUGINS_CONFIG)
+    plugins_config["netbox_attachments"] = {**plugins_config.get("netbox_attachments", {}), **options}
+    return override_settings(PLUGINS_CONFIG=plugins_config)
+
+
+def create_attachment(name="manual", content=b"manual", filename="manual.txt", **kwargs):
+    return NetBoxAttachment.objects.create(name=name, file=SimpleUploadedFile(filename, content), **kwargs)
+
+
+def assign(attachment, obj):
+    return NetBoxAttachmentAssignment.objects.create(
+        attachment=attachment, object_type=ObjectType.objects.get_for_model(obj), object_id=obj.pk
+    )
+
+
+def grant(user, model, actions, constraints=None):
+    """Gives the user an object permission, constrained if constraints are given."""
+    permission = ObjectPermission.objects.create(
+        name=f"{model._meta.model_name} {' '.join(actions)}", actions=actions, constraints=constraints
+    )
+    permission.object_types.add(ObjectType.objects.get_for_model(model))
+    permission.users.add(user)
+
+
+class AssignmentCountTestCase(TemporaryMediaMixin, TestCase):
+    def test_saving_an_attachment_keeps_a_concurrent_recount(self):
+        site = Site.objects.create(name="Site 1", slug="site-1")
+        attachment = create_attachment()
+        stale = NetBoxAttachment.objects.get(pk=attachment.pk)
+
+        assign(attachment, site)
+        # on_commit hooks do not run inside a TestCase transaction
+        recount_assignments([attachment.pk])
+        stale.description = "edited"
+        stale.save()
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.assignment_count, 1)
+        self.assertEqual(attachment.description, "edited")
+
+    def test_recount_bumps_last_updated(self):
+        attachment = create_attachment()
+        NetBoxAttachment.objects.filter(pk=attachment.pk).update(last_updated=None)
+
+        recount_assignments([attachment.pk])
+
+        attachment.refresh_from_db()
+        self.assertIsNotNone(attachment.last_updated)
+
+    def test_links_column_renders_the_stored_counter(self):
+        site = Site.objects.create(name="Site 1", slug="site-1")
+        attachment = create_attachment()
+        assign(attachment, site)
+        NetBoxAttachment.objects.filter(pk=attachment.pk).update(assignment_count=7)
+        assignments = list(NetBoxAttachmentAssignment.objects.select_related("attachment"))
+        table = NetBoxAttachmentForObjectTable(assignments)
+
+        with self.assertNumQueries(0):
+            cell = table.rows[0].get_cell("links")
+
+        self.assertIn(f'href="{attachment.get_absolute_url()}">7</a>', cell)
+
+    def test_reconcile_command_fixes_drifted_counters(self):
+        site = Site.objects.create(name="Site 1", slug="site-1")
+        drifted, exact = create_attachment(name="drifted"), create_attachment(name="exact")
+        assign(drifted, site)
+        recount_assignments([drifted.pk, exact.pk])
+        NetBoxAttachment.objects.filter(pk=drifted.pk).update(assignment_count=5)
+
+        call_command("reconcile_assignment_counts", dry_run=True, stdout=io.StringIO())
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.assignment_count, 5)
+
+        output = io.StringIO()
+        call_command("reconcile_assignment_counts", stdout=output)
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.assignment_count, 1)
+        self.assertIn("Reconciled assignment count of 1 attachment(s)", output.getvalue())
+
+
+class AttachmentBadgeCountTestCase(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.site = Site.objects.create(name="Site 1", slug="site-1")
+        # Counts cached by an earlier run for an object with the same primary key
+        invalidate_attachment_counts([(ObjectType.objects.get_for_model(Site).pk, self.site.pk)])
+
+    def test_unconstrained_count_is_cached_until_an_assignment_commits(self):
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        assign(create_attachment(name="first"), self.site)
+        self.assertEqual(get_attachment_badge_count(self.site, self.user), 1)
+
+        # on_commit hooks do not run inside a TestCase transaction, so the count is not invalidated
+        assign(create_attachment(name="second"), self.site)
+        self.assertEqual(get_attachment_badge_count(self.site, self.user), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assign(create_attachment(name="third"), self.site)
+        self.assertEqual(get_attachment_badge_count(self.site, self.user), 3)
+
+    def test_constrained_count_only_includes_viewable_attachments(self):
+        grant(self.user, NetBoxAttachment, ["view"], {"name__startswith": "visible"})
+        for name in ("visible-1", "hidden"):
+            assign(create_attachment(name=name), self.site)
+        self.assertEqual(get_attachment_badge_count(self.site, self.user), 1)
+
+        # Counted live, without waiting for an invalidation
+        assign(create_attachment(name="visible-2"), self.site)
+        self.assertEqual(get_attachment_badge_count(self.site, self.user), 2)
+
+
+@plugin_settings(deduplicate_files=True, compression="")
+class DeduplicationTestCase(TemporaryMediaMixin, TestCase):
+    def test_reusing_a_blob_takes_over_its_queued_deletion(self):
+        first = create_attachment(content=b"shared")
+        blob = first.file.name
+        first.delete()
+        self.assertTrue(NetBoxAttachmentFileDeletion.objects.filter(name=blob).exists())
+
+        second = create_attachment(content=b"shared")
+
+        self.assertEqual(second.file.name, blob)
+        self.assertFalse(NetBoxAttachmentFileDeletion.objects.filter(name=blob).exists())
+        self.assertTrue(second.file.storage.exists(blob))
+
+    def test_file_deletion_keeps_referenced_blobs(self):
+        first = create_attachment(content=b"shared")
+        second = create_attachment(content=b"shared")
+        first.delete()
+
+        stats = process_file_deletions()
+
+        self.assertEqual(stats["kept"], 1)
+        self.assertTrue(second.file.storage.exists(second.file.name))
+
+
+class FileDeletionTestCase(TemporaryMediaMixin, TestCase):
+    def test_deleting_an_attachment_queues_its_file(self):
+        attachment = create_attachment()
+        name, storage = attachment.file.name, attachment.file.storage
+
+        attachment.delete()
+
+        self.assertTrue(NetBoxAttachmentFileDeletion.objects.filter(name=name).exists())
+        self.assertTrue(storage.exists(name))
+
+        stats = process_file_deletions()
+
+        self.assertEqual(stats["deleted"], 1)
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(NetBoxAttachmentFileDeletion.objects.exists())
+
+
+class DownloadLinkTestCase(TemporaryMediaMixin, TestCase):
+    def test_file_links_point_at_the_download_view(self):
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        site = Site.objects.create(name="Site 1", slug="site-1")
+        attachment = create_attachment(filename="datasheet.pdf")
+        assignment = assign(attachment, site)
+        download_url = reverse("plugins:netbox_attachments:netboxattachment_download", kwargs={"pk": attachment.pk})
+
+        cells = [
+            NetBoxAttachmentTable([attachment]).rows[0].get_cell("file"),
+            NetBoxAttachmentForObjectTable([assignment]).rows[0].get_cell("file"),
+        ]
+        for cell in cells:
+            self.assertIn(f'href="{download_url}">datasheet.pdf</a>', cell)
+
+        response = self.client.get(attachment.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'href="{download_url}"')
+        self.assertNotContains(response, attachment.file.url)
+
+
+class AttachmentAPITestCase(TemporaryMediaMixin, APITestCase):
+    def test_download_url_points_at_the_download_view(self):
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        attachment = create_attachment()
+
+        response = self.client.get(
+            reverse("plugins-api:netbox_attachments-api:netboxattachment-detail", kwargs={"pk": attachment.pk}),
+            **self.header,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.data["download_url"].endswith(
+                reverse("plugins:netbox_attachments:netboxattachment_download", kwargs={"pk": attachment.pk})
+            )
+        )
+
+    @mock.patch.object(NetBoxAttachmentAssignmentViewSet, "pagination_class", None)
+    def test_unpaginated_list_resolves_parents_in_bulk(self):
+        self.add_permissions("dcim.view_site", "netbox_attachments.view_netboxattachmentassignment")
+        attachment = create_attachment()
+        url = reverse("plugins-api:netbox_attachments-api:netboxattachmentassignment-list")
+
+        query_counts = []
+        for index in range(1, 4):
+            assign(attachment, Site.objects.create(name=f"Site {index}", slug=f"site-{index}"))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, **self.header)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), index)
+            self.assertTrue(all(row["parent"] for row in response.data))
+            query_counts.append(len(queries))
+
+        self.assertEqual(len(set(query_counts)), 1, query_counts)
+
+
+class ChangesFeedTestCase(TemporaryMediaMixin, APITestCase):
+    url = "plugins-api:netbox_attachments-api:netboxattachment-changes"
+
+    def get_changes(self, **params):
+        return self.client.get(reverse(self.url), params, **self.header)
+
+    def test_feed_lists_updates_and_tombstones_since_the_last_sync(self):
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        kept, removed = create_attachment(name="kept"), create_attachment(name="removed")
+        first = self.get_changes(since="2000-01-01T00:00:00Z")
+        self.assertEqual([row["id"] for row in first.data["changed"]], [kept.pk, removed.pk])
+
+        kept.description = "edited"
+        kept.save()
+        removed_pk = removed.pk
+        removed.delete()
+
+        response = self.get_changes(since=first.data["until"].isoformat())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["changed"]], [kept.pk])
+        self.assertEqual(response.data["changed"][0]["description"], "edited")
+        self.assertEqual([row["id"] for row in response.data["deleted"]], [removed_pk])
+
+    @plugin_settings(changes_lookback=60)
+    def test_feed_reaches_back_by_the_lookback(self):
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        since = timezone.now() - timedelta(hours=1)
+        late, old = create_attachment(name="late"), create_attachment(name="old")
+        NetBoxAttachment.objects.filter(pk=late.pk).update(last_updated=since - timedelta(seconds=30))
+        NetBoxAttachment.objects.filter(pk=old.pk).update(last_updated=since - timedelta(seconds=90))
+
+        response = self.get_changes(since=since.isoformat())
+
+        self.assertEqual([row["id"] for row in response.data["changed"]], [late.pk])
+
+    def test_feed_pages_follow_the_next_link(self):
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        attachments = [create_attachment(name=f"attachment-{index}") for index in range(3)]
+        create_attachment(name="removed").delete()
+
+        response = self.get_changes(since="2000-01-01T00:00:00Z", limit=1)
+        changed, deleted, until = [], [], response.data["until"]
+        while True:
+            self.assertEqual(response.data["until"], until)
+            changed.extend(row["id"] for row in response.data["changed"])
+            deleted.extend(row["id"] for row in response.data["deleted"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"], **self.header)
+
+        self.assertEqual(changed, [attachment.pk for attachment in attachments])
+        self.assertEqual(len(deleted), 1)
+
+    def test_constrained_users_get_no_tombstones(self):
+        grant(self.user, NetBoxAttachment, ["view"], {"name": "visible"})
+        create_attachment(name="visible")
+        create_attachment(name="hidden").delete()
+
+        response = self.get_changes(since="2000-01-01T00:00:00Z")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.data["changed"]], ["visible"])
+        self.assertIsNone(response.data["deleted"])
+
+    def test_cursor_with_invalid_timestamps_is_rejected(self):
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        response = self.get_changes(cursor=encode_cursor([1, 2, 3, 4, 5]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class UploadSessionTestCase(TemporaryMediaMixin, APITestCase):
+    def test_finalize_denied_by_constraints_leaves_no_file_behind(self):
+        grant(self.user, NetBoxAttachment, ["add", "view"], {"name": "report"})
+        session = NetBoxAttachmentUploadSession.objects.create(user=self.user, filename="other.txt", name="other")
+        session.append_chunk(CountingReader(io.BytesIO(b"content")))
+        storage = session.storage
+
+        with self.assertRaises(PermissionDenied):
+            session.finalize(user=self.user)
+
+        self.assertFalse(NetBoxAttachment.objects.exists())
+        self.assertEqual(
+            [name for name, _ in iter_storage_files(storage, "netbox-attachments") if "/uploads/" not in name], []
+        )
+
+
+class ChunkedUploadAPITestCase(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_permissions("netbox_attachments.add_netboxattachment", "netbox_attachments.view_netboxattachment")
+        self.session = NetBoxAttachmentUploadSession.objects.create(user=self.user, filename="firmware.bin", size=10)
+
+    def put_chunk(self, content, offset, **extra):
+        return self.client.put(
+            reverse(
+                "plugins-api:netbox_attachments-api:netboxattachmentuploadsession-chunk", kwargs={"pk": self.session.pk}
+            ),
+            content,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+            **self.header,
+            **extra,
+        )
+
+    def finalize(self):
+        return self.client.post(
+            reverse(
+                "plugins-api:netbox_attachments-api:netboxattachmentuploadsession-finalize",
+                kwargs={"pk": self.session.pk},
+            ),
+            **self.header,
+        )
+
+    def test_chunks_are_appended_at_the_session_offset(self):
+        response = self.put_chunk(b"01234", offset=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Upload-Offset"], "5")
+
+        response = self.put_chunk(b"56789", offset=0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], "5")
+
+        self.assertEqual(self.put_chunk(b"56789", offset=5).status_code, 200)
+        response = self.finalize()
+        self.assertEqual(response.status_code, 201)
+        with NetBoxAttachment.objects.get(pk=response.data["id"]).file.open("rb") as file:
+            self.assertEqual(file.read(), b"0123456789")
+
+    def test_chunk_past_the_declared_size_is_rejected(self):
+        response = self.put_chunk(b"0123456789A", offset=0)
+
+        self.assertEqual(response.status_code, 400)
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.offset, self.session.chunk_count), (0, 0))
+
+    def test_chunk_stores_no_more_than_its_content_length(self):
+        response = self.put_chunk(b"0123456789", offset=0, CONTENT_LENGTH="4")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Upload-Offset"], "4")
+        with self.session.storage.open(self.session.get_chunk_name(0), "rb") as file:
+            self.assertEqual(file.read(), b"0123")
+
+    def test_finalize_requires_the_declared_size(self):
+        response = self.finalize()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("No data", str(response.data))
+
+        self.put_chunk(b"01234", offset=0)
+        response = self.finalize()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("received 5 of 10 bytes", str(response.data))
+        self.assertTrue(NetBoxAttachmentUploadSession.objects.filter(pk=self.session.pk).exists())
+        self.assertFalse(NetBoxAttachment.objects.exists())
+
+
+class DownloadViewTestCase(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        self.attachment = create_attachment(content=b"%PDF-1.7", filename="datasheet.pdf")
+        self.url = reverse("plugins:netbox_attachments:netboxattachment_download", kwargs={"pk": self.attachment.pk})
+
+    def test_offloaded_download(self):
+        for mode, header in (("x_accel_redirect", "X-Accel-Redirect"), ("x_sendfile", "X-Sendfile")):
+            with self.subTest(mode=mode), plugin_settings(download_mode=mode):
+                response = self.client.get(self.url)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(header, response)
+                self.assertEqual(response.content, b"")
+                self.assertIn('filename="datasheet.pdf"', response["Content-Disposition"])
+
+    def test_offloaded_download_is_revalidated_by_netbox(self):
+        with plugin_settings(download_mode="x_accel_redirect"):
+            etag = self.client.get(self.url)["ETag"]
+            response = self.client.get(self.url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertEqual(response.content, b"")
+
+    def test_compressed_download_varies_on_accept_encoding_and_is_never_offloaded(self):
+        content = b"interface eth0\n" * 1000
+        with plugin_settings(compression="gzip"):
+            attachment = create_attachment(content=content, filename="config.txt")
+        self.assertEqual(attachment.encoding, "gzip")
+        url = reverse("plugins:netbox_attachments:netboxattachment_download", kwargs={"pk": attachment.pk})
+
+        with plugin_settings(download_mode="x_accel_redirect"):
+            encoded = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+            decoded = self.client.get(url, headers={"Accept-Encoding": "identity"})
+
+        for response in (encoded, decoded):
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("X-Accel-Redirect", response)
+            self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(encoded["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(encoded.streaming_content)), content)
+        self.assertNotIn("Content-Encoding", decoded)
+        self.assertEqual(b"".join(decoded.streaming_content), content)
+
+
+class ZipDownloadTestCase(TemporaryMediaMixin, TestCase):
+    def test_download_all_archives_the_viewable_attachments_of_an_object(self):
+        site = Site.objects.create(name="Site 1", slug="site-1")
+        grant(self.user, Site, ["view"])
+        grant(self.user, NetBoxAttachment, ["view"], {"name__startswith": "visible"})
+        for name in ("visible-1", "hidden", "visible-2"):
+            assign(create_attachment(name=name, content=name.encode(), filename=f"{name}.txt"), site)
+        create_attachment(name="visible-unassigned")
+
+        response = self.client.get(
+            reverse("plugins:netbox_attachments:netboxattachment_bulk_download"),
+            {"object_type_id": ObjectType.objects.get_for_model(Site).pk, "object_id": site.pk},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), ["visible-1.txt", "visible-2.txt"])
+            self.assertEqual(archive.read("visible-2.txt"), b"visible-2")
+
+
+class BulkUploadTestCase(TemporaryMediaMixin, APITestCase):
+    def test_bulk_upload_creates_one_attachment_per_file(self):
+        site = Site.objects.create(name="Site 1", slug="site-1")
+        self.add_permissions(
+            "dcim.view_site",
+            "netbox_attachments.add_netboxattachment",
+            "netbox_attachments.view_netboxattachment",
+            "netbox_attachments.add_netboxattachmentassignment",
+        )
+        contents = {f"file-{index}.txt": f"content {index}".encode() for index in range(3)}
+
+        response = self.client.post(
+            reverse("plugins-api:netbox_attachments-api:netboxattachment-bulk-upload"),
+            {
+                "files": [SimpleUploadedFile(name, content) for name, content in contents.items()],
+                "object_type": "dcim.site",
+                "object_id": site.pk,
+            },
+            format="multipart",
+            **self.header,
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        attachments = NetBoxAttachment.objects.order_by("pk")
+        self.assertEqual([attachment.name for attachment in attachments], list(contents))
+        for attachment, content in zip(attachments, contents.values()):
+            self.assertEqual(attachment.checksum_algorithm, "sha256")
+            self.assertEqual(attachment.checksum, hashlib.sha256(content).hexdigest())
+            self.assertEqual(attachment.size, len(content))
+            self.assertEqual(attachment.assignment_count, 1)
+        self.assertEqual(
+            NetBoxAttachmentAssignment.objects.filter(object_type__model="site", object_id=site.pk).count(), 3
+        )
+
+
+class BulkLinkTestCase(TemporaryMediaMixin, APITestCase):
+    url = "plugins-api:netbox_attachments-api:netboxattachmentassignment-bulk-link"
+
+    def setUp(self):
+        super().setUp()
+        self.add_permissions(
+            "tenancy.view_tenant",
+            "netbox_attachments.view_netboxattachment",
+            "netbox_attachments.add_netboxattachmentassignment",
+        )
+        grant(self.user, Site, ["view"], {"slug__startswith": "site-"})
+        self.attachment = create_attachment()
+        self.sites = [Site.objects.create(name=f"Site {index}", slug=f"site-{index}") for index in range(3)]
+        self.tenant = Tenant.objects.create(name="Tenant 1", slug="tenant-1")
+
+    def bulk_link(self, objects):
+        return self.client.post(
+            reverse(self.url), {"attachment": self.attachment.pk, "objects": objects}, format="json", **self.header
+        )
+
+    def test_bulk_link_groups_objects_by_type_and_skips_existing_assignments(self):
+        assign(self.attachment, self.sites[0])
+        site_type = ObjectType.objects.get_for_model(Site)
+
+        # Runs the assignment recount queued for the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.bulk_link(
+                [
+                    *({"object_type": "dcim.site", "object_id": site.pk} for site in self.sites),
+                    # The same site again, by object type ID
+                    {"object_type": site_type.pk, "object_id": self.sites[1].pk},
+                    {"object_type": "tenancy.tenant", "object_id": self.tenant.pk},
+                ]
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(response.data["existing"], 1)
+        self.assertEqual(
+            set(self.attachment.attachment_assignments.values_list("object_type__model", "object_id")),
+            {*(("site", site.pk) for site in self.sites), ("tenant", self.tenant.pk)},
+        )
+        self.attachment.refresh_from_db()
+        self.assertEqual(self.attachment.assignment_count, 4)
+
+    def test_repeated_bulk_link_creates_nothing(self):
+        objects = [{"object_type": "dcim.site", "object_id": site.pk} for site in self.sites]
+        self.bulk_link(objects)
+
+        response = self.bulk_link(objects)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(response.data["existing"], 3)
+
+    def test_objects_the_user_cannot_view_are_rejected(self):
+        hidden = Site.objects.create(name="Hidden", slug="hidden")
+
+        response = self.bulk_link([{"object_type": "dcim.site", "object_id": hidden.pk}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.attachment.attachment_assignments.exists())
+
+    def test_malformed_object_types_are_rejected(self):
+        for object_type in ({"app_label": "dcim", "model": "site"}, ["dcim.site"], None, 1.5):
+            with self.subTest(object_type=object_type):
+                response = self.bulk_link([{"object_type": object_type, "object_id": self.sites[0].pk}])
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("objects", response.data)
+
+    def test_too_many_objects_are_rejected(self):
+        objects = [{"object_type": "dcim.site", "object_id": self.sites[0].pk}] * (BULK_MAX_ITEMS + 1)
+
+        response = self.bulk_link(objects)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.attachment.attachment_assignments.exists())
+
+
+class CursorPaginationTestCase(TemporaryMediaMixin, APITestCase):
+    url = "plugins-api:netbox_attachments-api:netboxattachment-list"
+
+    def setUp(self):
+        super().setUp()
+        self.add_permissions("netbox_attachments.view_netboxattachment")
+        self.attachments = [create_attachment(name=f"attachment-{index}") for index in range(5)]
+
+    def test_cursor_pages_are_stable_under_inserts_and_deletes(self):
+        response = self.client.get(reverse(self.url), {"cursor": "", "limit": 2}, **self.header)
+        seen = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.data["count"])
+            self.assertIsNone(response.data["previous"])
+            seen.extend(row["id"] for row in response.data["results"])
+            if not response.data["next"]:
+                break
+            # Rows added or removed before the cursor must not shift the following pages
+            create_attachment(name="late")
+            NetBoxAttachment.objects.filter(pk=seen[0]).delete()
+            response = self.client.get(response.data["next"], **self.header)
+
+        originals = [attachment.pk for attachment in self.attachments]
+        self.assertEqual(seen[: len(originals)], originals)
+        self.assertEqual(seen, sorted(set(seen)))
+
+    def test_tampered_cursors_are_rejected(self):
+        for cursor in ("not-a-cursor", encode_cursor(["1"]) + "x", encode_cursor(["one"]), encode_cursor([2**80])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse(self.url), {"cursor": cursor}, **self.header)
+
+                self.assertEqual(response.status_code, 404)
+
+
+class RefreshAttachmentMetadataTestCase(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, "checkpoint.json")
+
+    def refresh(self, **options):
+        call_command(
+            "refresh_attachment_metadata",
+            checkpoint=self.checkpoint,
+            stdout=io.StringIO(),
+            stderr=io.StringIO(),
+            **options,
+        )
+
+    def forget_metadata(self, *attachments, **values):
+        NetBoxAttachment.objects.filter(pk__in=[attachment.pk for attachment in attachments]).update(
+            **{"size": None, "stored_size": None, "checksum": "", **values}
+        )
+
+    def test_missing_metadata_is_read_from_storage(self):
+        attachment = create_attachment(content=b"datasheet")
+        self.forget_metadata(attachment)
+
+        self.refresh(checksums=True)
+
+        attachment.refresh_from_db()
+        self.assertEqual((attachment.size, attachment.stored_size), (9, 9))
+        self.assertEqual(attachment.checksum, hashlib.new(attachment.checksum_algorithm, b"datasheet").hexdigest())
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_run_resumes_after_the_checkpoint(self):
+        done, pending = create_attachment(name="done"), create_attachment(name="pending")
+        self.forget_metadata(done, pending)
+        with open(self.checkpoint, "w") as file:
+            json.dump({"options": {"all": False, "checksums": False}, "last_pk": done.pk}, file)
+
+        self.refresh()
+
+        done.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertIsNone(done.size)
+        self.assertEqual(pending.size, len(b"manual"))
+
+    def test_checkpoint_of_a_run_with_other_options_is_ignored(self):
+        first, second = create_attachment(name="first"), create_attachment(name="second")
+        self.forget_metadata(first, second)
+        with open(self.checkpoint, "w") as file:
+            json.dump({"options": {"all": True, "checksums": False}, "last_pk": first.pk}, file)
+
+        self.refresh()
+
+        self.assertFalse(NetBoxAttachment.objects.filter(size__isnull=True).exists())
+
+    @plugin_settings(compression="gzip")
+    def test_compressed_files_are_only_decompressed_when_needed(self):
+        content = b"interface eth0\n" * 1000
+        attachment = create_attachment(content=content, filename="config.txt")
+        self.assertEqual(attachment.encoding, "gzip")
+        stored_size = attachment.file.storage.size(attachment.file.name)
+        # A size that only decompressing the file could correct
+        self.forget_metadata(attachment, size=1)
+
+        self.refresh()
+        attachment.refresh_from_db()
+        self.assertEqual((attachment.size, attachment.stored_size), (1, stored_size))
+
+        self.refresh(refresh_all=True)
+        attachment.refresh_from_db()
+        self.assertEqual((attachment.size, attachment.stored_size), (len(content), stored_size))
+
+    @plugin_settings(deduplicate_files=True, compression="")
+    def test_attachments_sharing_a_blob_are_all_refreshed(self):
+        first, second = create_attachment(name="first"), create_attachment(name="second")
+        self.assertEqual(first.file.name, second.file.name)
+        self.forget_metadata(first, second)
+
+        self.refresh(checksums=True)
+
+        self.assertEqual(
+            set(NetBoxAttachment.objects.values_list("size", "stored_size", "checksum")),
+            {(6, 6, hashlib.sha256(b"manual").hexdigest())},
+        )
+
+
+class OrphanedFilesTestCase(TemporaryMediaMixin, TestCase):
+    grace_period = timedelta(hours=24)
+
+    def setUp(self):
+        super().setUp()
+        # Every test scans the whole media root, so it gets an empty one
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.storage = NetBoxAttachment._meta.get_field("file").storage
+
+    def store(self, name, age=timedelta(days=2)):
+        name = self.storage.save(name, io.BytesIO(b"orphan"))
+        self.age(name, age)
+        return name
+
+    def age(self, name, age):
+        modified = (timezone.now() - age).timestamp()
+        os.utime(self.storage.path(name), (modified, modified))
+
+    def test_only_unreferenced_files_older_than_the_grace_period_are_found(self):
+        attachment = create_attachment()
+        self.age(attachment.file.name, timedelta(days=2))
+        old = self.store("netbox-attachments/old.txt")
+        self.store("netbox-attachments/recent.txt", age=timedelta(hours=1))
+        self.store(f"{NetBoxAttachmentUploadSession.STAGING_PREFIX}1/0")
+
+        self.assertEqual(list(find_orphaned_files(self.grace_period)), [old])
+
+    @plugin_settings(deduplicate_files=True, compression="")
+    def test_referenced_content_addressed_blobs_are_kept(self):
+        attachment = create_attachment(content=b"shared")
+        self.assertEqual(attachment.file.name, content_addressed_name(hashlib.sha256(b"shared").hexdigest()))
+        self.age(attachment.file.name, timedelta(days=2))
+        unreferenced = self.store(content_addressed_name(hashlib.sha256(b"orphan").hexdigest()))
+
+        self.assertEqual(list(find_orphaned_files(self.grace_period)), [unreferenced])
+
+    def test_dry_run_reports_without_deleting(self):
+        names = [self.store(f"netbox-attachments/orphan-{index}.txt") for index in range(2)]
+        reported = []
+
+        stats = delete_orphaned_files(self.grace_period, dry_run=True, report=reported.append)
+
+        self.assertEqual(stats, {"orphaned": 2, "deleted": 0, "failed": 0})
+        self.assertEqual(sorted(reported), sorted(names))
+        self.assertTrue(all(self.storage.exists(name) for name in names))
+
+    def test_deletions_are_rate_limited(self):
+        names = [self.store(f"netbox-attachments/orphan-{index}.txt") for index in range(3)]
+
+        with mock.patch("time.sleep") as sleep:
+            stats = delete_orphaned_files(self.grace_period, max_per_second=2)
+
+        self.assertEqual(stats, {"orphaned": 3, "deleted": 3, "failed": 0})
+        self.assertFalse(any(self.storage.exists(name) for name in names))
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), 3)
+        for delay in delays[1:]:
+            self.assertAlmostEqual(delay, 0.5, delta=0.1)
+
+
+@plugin_settings(upload_layout="sharded")
+class MigrateUploadLayoutTestCase(TemporaryMediaMixin, TestCase):
+    def create_flat_attachment(self, **kwargs):
+        with plugin_settings(upload_layout="flat"):
+            attachment = create_attachment(**kwargs)
+        self.assertEqual(attachment.file.name.count("/"), 1)
+        return attachment
+
+    def migrate(self):
+        output = io.StringIO()
+        call_command("migrate_upload_layout", stdout=output, stderr=io.StringIO())
+        return output.getvalue()
+
+    def assertMoved(self, attachment, original, content=b"manual"):
+        attachment.refresh_from_db()
+        self.assertIsNotNone(sharded_upload_directory(attachment.file.name))
+        self.assertTrue(attachment.file.name.endswith("/" + original.rsplit("/", 1)[-1]))
+        with attachment.file.open("rb") as file:
+            self.assertEqual(file.read(), content)
+
+    def test_flat_files_are_copied_and_the_originals_queued_for_deletion(self):
+        attachment = self.create_flat_attachment()
+        original = attachment.file.name
+
+        self.assertIn("Moved 1 of 1 file(s)", self.migrate())
+
+        self.assertMoved(attachment, original)
+        self.assertTrue(NetBoxAttachmentFileDeletion.objects.filter(name=original).exists())
+        process_file_deletions()
+        self.assertFalse(attachment.file.storage.exists(original))
+        self.assertIn("Moved 0 of 0 file(s)", self.migrate())
+
+    def test_rerun_after_a_crash_moves_the_remaining_files(self):
+        attachment = self.create_flat_attachment()
+        original = attachment.file.name
+
+        with mock.patch.object(MigrateUploadLayoutCommand, "record_moves", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                self.migrate()
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.file.name, original)
+
+        self.assertIn("Moved 1 of 1 file(s)", self.migrate())
+        self.assertMoved(attachment, original)
+
+    def test_attachments_sharing_a_file_move_to_one_copy(self):
+        first = self.create_flat_attachment(name="first")
+        second = self.create_flat_attachment(name="second")
+        original = first.file.name
+        NetBoxAttachment.objects.filter(pk=second.pk).update(file=original)
+
+        self.assertIn("Moved 1 of 1 file(s)", self.migrate())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertMoved(first, original)
+        self.assertEqual(NetBoxAttachmentFileDeletion.objects.filter(name=original).count(), 1)
+
+    @plugin_settings(upload_layout="sharded", deduplicate_files=True, compression="")
+    def test_content_addressed_blobs_are_left_in_place(self):
+        first, second = create_attachment(name="first"), create_attachment(name="second")
+        blob = first.file.name
+
+        self.assertIn("Moved 0 of 0 file(s)", self.migrate())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.file.name, second.file.name), (blob, blob))
+        self.assertFalse(NetBoxAttachmentFileDeletion.objects.exists())
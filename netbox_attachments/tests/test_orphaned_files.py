@@ -0,0 +1,77 @@
+"""Unit tests for the streaming storage scan behind the orphaned file cleanup.
+
+iter_storage_files() only talks to a storage backend, so it is run against a
+temporary directory through stubs for a local and a remote storage backend —
+no Django settings are needed.
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+from django.core.files.storage import Storage
+
+from netbox_attachments import storage, utils
+
+
+class LocalStorage(Storage):
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+
+class RemoteStorage(Storage):
+    """Only offers listdir(), like object storage backends."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def listdir(self, path):
+        directories, files = [], []
+        for entry in os.scandir(os.path.join(self.root, path)):
+            (directories if entry.is_dir() else files).append(entry.name)
+        return directories, files
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    for name in ["netbox-attachments/manual.pdf", "netbox-attachments/cas/ab/abcd", "other/photo.png"]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    (tmp_path / "netbox-attachments/empty").mkdir()
+    return tmp_path
+
+
+def test_chunked_splits_lazily():
+    consumed = []
+
+    def numbers():
+        for number in range(7):
+            consumed.append(number)
+            yield number
+
+    chunks = utils.chunked(numbers(), 3)
+
+    assert next(chunks) == [0, 1, 2]
+    assert consumed == [0, 1, 2]
+    assert list(chunks) == [[3, 4, 5], [6]]
+
+
+def test_iter_storage_files_scans_local_storage(media_root):
+    files = dict(storage.iter_storage_files(LocalStorage(str(media_root)), "netbox-attachments/"))
+
+    assert sorted(files) == ["netbox-attachments/cas/ab/abcd", "netbox-attachments/manual.pdf"]
+    assert all(isinstance(modified, datetime) and modified.tzinfo for modified in files.values())
+
+
+def test_iter_storage_files_falls_back_to_listdir(media_root):
+    files = dict(storage.iter_storage_files(RemoteStorage(str(media_root)), "netbox-attachments"))
+
+    assert files == {"netbox-attachments/manual.pdf": None, "netbox-attachments/cas/ab/abcd": None}
+
+
+def test_iter_storage_files_tolerates_missing_directory(tmp_path):
+    assert list(storage.iter_storage_files(LocalStorage(str(tmp_path)), "netbox-attachments")) == []
@@ -0,0 +1,98 @@
+"""Unit tests for batched assignment parent resolution.
+
+prefetch_assignment_parents() only relies on duck-typed assignment and
+ObjectType objects, so it is exercised directly with SimpleNamespace and
+MagicMock fakes — no Django runtime is needed.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from netbox_attachments import utils
+
+
+def _make_object_type(type_id, parents):
+    """Return a fake ObjectType whose model resolves the given {pk: parent} mapping."""
+    queryset = MagicMock(name=f"queryset_{type_id}")
+    queryset.restrict.return_value = queryset
+    queryset.in_bulk.side_effect = lambda ids: {pk: parents[pk] for pk in ids if pk in parents}
+
+    model = MagicMock(name=f"model_{type_id}")
+    model._default_manager.all.return_value = queryset
+
+    object_type = SimpleNamespace(id=type_id, model_class=lambda: model)
+    return object_type, queryset
+
+
+def _make_assignment(object_type, object_id):
+    return SimpleNamespace(object_type=object_type, object_type_id=object_type.id, object_id=object_id)
+
+
+def test_prefetch_issues_one_query_per_object_type():
+    device_type, device_qs = _make_object_type(1, {10: "device-10", 11: "device-11"})
+    site_type, site_qs = _make_object_type(2, {5: "site-5"})
+    assignments = [
+        _make_assignment(device_type, 10),
+        _make_assignment(device_type, 11),
+        _make_assignment(site_type, 5),
+        _make_assignment(device_type, 10),
+    ]
+
+    utils.prefetch_assignment_parents(assignments)
+
+    device_qs.in_bulk.assert_called_once_with({10, 11})
+    site_qs.in_bulk.assert_called_once_with({5})
+    assert [utils.get_cached_parent(a) for a in assignments] == [
+        (True, "device-10"),
+        (True, "device-11"),
+        (True, "site-5"),
+        (True, "device-10"),
+    ]
+
+
+def test_prefetch_restricts_queryset_when_user_given():
+    device_type, device_qs = _make_object_type(1, {10: "device-10"})
+    user = object()
+
+    utils.prefetch_assignment_parents([_make_assignment(device_type, 10)], user=user)
+
+    device_qs.restrict.assert_called_once_with(user, "view")
+
+
+def test_prefetch_caches_none_for_missing_or_hidden_parents():
+    device_type, _ = _make_object_type(1, {})
+    assignment = _make_assignment(device_type, 99)
+
+    utils.prefetch_assignment_parents([assignment])
+
+    assert utils.get_cached_parent(assignment) == (True, None)
+
+
+def test_prefetch_handles_uninstalled_models_without_queries():
+    broken_type = SimpleNamespace(id=3, model_class=lambda: None)
+    assignment = _make_assignment(broken_type, 1)
+
+    utils.prefetch_assignment_parents([assignment])
+
+    assert utils.get_cached_parent(assignment) == (True, None)
+
+
+def test_prefetch_skips_already_cached_assignments():
+    device_type, device_qs = _make_object_type(1, {10: "device-10"})
+    assignment = _make_assignment(device_type, 10)
+    utils.set_cached_parent(assignment, "cached")
+
+    utils.prefetch_assignment_parents([assignment])
+
+    device_qs.in_bulk.assert_not_called()
+    assert utils.get_cached_parent(assignment) == (True, "cached")
+
+
+def test_cached_parent_is_ignored_after_retargeting():
+    device_type, _ = _make_object_type(1, {})
+    assignment = _make_assignment(device_type, 10)
+    utils.set_cached_parent(assignment, "device-10")
+
+    assignment.object_id = 11
+
+    assert utils.get_cached_parent(assignment) == (False, None)
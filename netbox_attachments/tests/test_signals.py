@@ -2,43 +2,75 @@
 
 These tests replicate the handler logic using mocks to avoid importing
 netbox_attachments.models (which requires a live NetBox/Django environment).
+The transaction-scoped buffer lives in utils and is tested directly, against a
+fake transaction module and against real savepoints on SQLite.
 """
 
+from contextlib import nullcontext, suppress
 from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from netbox_attachments import utils
+
 
 # ---------------------------------------------------------------------------
 # Inline replica of pre_delete_receiver — keeps tests runnable without Django
 # ---------------------------------------------------------------------------
 
 
-class _FakeDoesNotExist(Exception):
-    pass
-
-
-def _make_handler(ObjectType, NetBoxAttachmentAssignment, own_models):
+def _make_handler(ContentType, buffer_until_commit, own_models, is_in_scope=lambda sender: True, registry=None):
     """
     Returns a pre_delete_receiver function equivalent to the one in models.py,
     wired to the provided fakes.  Used so tests can verify the exact logic path
     without requiring a live Django/NetBox environment.
     """
 
-    def pre_delete_receiver(sender, instance, **kwargs):  # noqa: ARG001
+    def pre_delete_receiver(sender, instance, using=None, **kwargs):  # noqa: ARG001
         if sender in own_models:
             return
-        try:
-            object_type = ObjectType.objects.get_for_model(instance)
-        except ObjectType.DoesNotExist:
+        if not isinstance(instance.pk, int):
             return
-        try:
-            NetBoxAttachmentAssignment.objects.filter(object_type_id=object_type.id, object_id=instance.pk).delete()
-        except (TypeError, ValueError):
+        object_type_id = ContentType.objects.get_for_model(sender).pk
+        if registry is not None and not registry.may_have_assignments(object_type_id):
             return
+        if not is_in_scope(sender):
+            return
+        buffer_until_commit("assignment_cleanup", (object_type_id, instance.pk), "flush", using=using)
 
     return pre_delete_receiver
 
 
+class FakeTransaction:
+    """Minimal stand-in for django.db.transaction backed by one fake connection."""
+
+    def __init__(self, in_atomic_block=True):
+        self.connection = SimpleNamespace(run_on_commit=[], savepoint_ids=[], in_atomic_block=in_atomic_block)
+
+    def get_connection(self, using=None):  # noqa: ARG002
+        return self.connection
+
+    def on_commit(self, func, using=None):  # noqa: ARG002
+        if self.connection.in_atomic_block:
+            self.connection.run_on_commit.append((set(), func, False))
+        else:
+            func()
+
+    def atomic(self, using=None):  # noqa: ARG002
+        return nullcontext()
+
+    def commit(self):
+        hooks, self.connection.run_on_commit = self.connection.run_on_commit, []
+        for _, func, _ in hooks:
+            func()
+
+    def rollback(self):
+        self.connection.run_on_commit = []
+
+
 def make_fake_instance(pk=1):
     return SimpleNamespace(pk=pk)
 
@@ -48,85 +80,343 @@ def make_fake_instance(pk=1):
 # ---------------------------------------------------------------------------
 
 
-def test_pre_delete_receiver_handles_unregistered_model_gracefully():
-    """
-    When get_for_model() raises DoesNotExist the handler returns silently.
-    """
-    FakeObjectType = MagicMock()
-    FakeObjectType.DoesNotExist = _FakeDoesNotExist
-    FakeObjectType.objects.get_for_model.side_effect = _FakeDoesNotExist
-
-    FakeAssignment = MagicMock()
+def _make_content_type(type_id=99):
+    ContentType = MagicMock()
+    ContentType.objects.get_for_model.return_value = SimpleNamespace(pk=type_id)
+    return ContentType
 
-    handler = _make_handler(FakeObjectType, FakeAssignment, own_models=())
 
-    instance = make_fake_instance(pk=42)
-    handler(sender=object, instance=instance)  # must not raise
+def test_pre_delete_receiver_buffers_object_for_cleanup():
+    """The deleted object is buffered under its type instead of being deleted inline."""
+    buffer = MagicMock()
+    handler = _make_handler(_make_content_type(99), buffer, own_models=())
 
-    FakeAssignment.objects.filter.assert_not_called()
+    handler(sender=object, instance=make_fake_instance(pk=7), using="default")
 
+    buffer.assert_called_once_with("assignment_cleanup", (99, 7), "flush", using="default")
 
-def test_pre_delete_receiver_skips_exists_check_and_calls_delete_once():
-    """
-    delete() is called directly on the filtered queryset with no .exists() call.
-    """
-    fake_ot = MagicMock()
-    fake_ot.id = 99
 
-    FakeObjectType = MagicMock()
-    FakeObjectType.DoesNotExist = _FakeDoesNotExist
-    FakeObjectType.objects.get_for_model.return_value = fake_ot
+def test_pre_delete_receiver_skips_own_models():
+    """Handler is a no-op when sender is one of the plugin's own models."""
+    ContentType = _make_content_type()
+    buffer = MagicMock()
+    FakeAttachment = object()
 
-    mock_qs = MagicMock()
-    FakeAssignment = MagicMock()
-    FakeAssignment.objects.filter.return_value = mock_qs
+    handler = _make_handler(ContentType, buffer, own_models=(FakeAttachment,))
+    handler(sender=FakeAttachment, instance=make_fake_instance(pk=1))
 
-    handler = _make_handler(FakeObjectType, FakeAssignment, own_models=())
+    ContentType.objects.get_for_model.assert_not_called()
+    buffer.assert_not_called()
 
-    instance = make_fake_instance(pk=7)
-    handler(sender=object, instance=instance)
 
-    FakeAssignment.objects.filter.assert_called_once_with(object_type_id=99, object_id=7)
-    mock_qs.delete.assert_called_once()
-    mock_qs.exists.assert_not_called()
+def test_pre_delete_receiver_skips_out_of_scope_models():
+    buffer = MagicMock()
 
+    handler = _make_handler(_make_content_type(), buffer, own_models=(), is_in_scope=lambda sender: False)
+    handler(sender=object, instance=make_fake_instance(pk=1))
 
-def test_pre_delete_receiver_skips_own_models():
-    """Handler is a no-op when sender is one of the plugin's own models."""
-    FakeObjectType = MagicMock()
-    FakeObjectType.DoesNotExist = _FakeDoesNotExist
+    buffer.assert_not_called()
 
-    FakeAttachment = object()
-    FakeAssignment = MagicMock()
 
-    handler = _make_handler(FakeObjectType, FakeAssignment, own_models=(FakeAttachment,))
+def test_pre_delete_receiver_short_circuits_types_without_assignments(monkeypatch):
+    monkeypatch.setattr(utils, "get_shared_generation", lambda name: 0)
+    loader = MagicMock(return_value=[5])
+    registry = utils.AssignedObjectTypeRegistry(loader)
+    buffer = MagicMock()
+    is_in_scope = MagicMock(return_value=True)
 
-    instance = make_fake_instance(pk=1)
-    handler(sender=FakeAttachment, instance=instance)
+    handler = _make_handler(_make_content_type(99), buffer, own_models=(), is_in_scope=is_in_scope, registry=registry)
+    for pk in range(3):
+        handler(sender=object, instance=make_fake_instance(pk=pk))
 
-    FakeObjectType.objects.get_for_model.assert_not_called()
-    FakeAssignment.objects.filter.assert_not_called()
+    buffer.assert_not_called()
+    is_in_scope.assert_not_called()
+    loader.assert_called_once()
+    assert registry.stats()["short_circuited"] == 3
 
 
 def test_pre_delete_receiver_skips_non_integral_pk():
-    """Handler is a no-op when the instance PK is not an integer (TypeError/ValueError from filter)."""
-    fake_ot = MagicMock()
-    fake_ot.id = 5
+    """No assignment can reference an object whose PK is not an integer."""
+    ContentType = _make_content_type()
+    buffer = MagicMock()
+
+    handler = _make_handler(ContentType, buffer, own_models=())
+    handler(sender=object, instance=make_fake_instance(pk="not-an-int"))  # must not raise
+
+    buffer.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# buffer_until_commit() — exercised directly against a fake transaction module
+# ---------------------------------------------------------------------------
+
+
+def test_buffer_until_commit_flushes_once_per_transaction(monkeypatch):
+    fake_transaction = FakeTransaction()
+    monkeypatch.setattr(utils, "transaction", fake_transaction)
+    flush = MagicMock()
+
+    for pair in ((1, 10), (1, 11), (2, 5), (1, 10)):
+        utils.buffer_until_commit("cleanup", pair, flush)
+
+    flush.assert_not_called()
+    fake_transaction.commit()
+
+    flush.assert_called_once_with([(1, 10), (1, 11), (2, 5)])
+
+
+def test_buffer_until_commit_discards_items_on_rollback(monkeypatch):
+    fake_transaction = FakeTransaction()
+    monkeypatch.setattr(utils, "transaction", fake_transaction)
+    flush = MagicMock()
+
+    utils.buffer_until_commit("cleanup", (1, 10), flush)
+    fake_transaction.rollback()
+    utils.buffer_until_commit("cleanup", (1, 11), flush)
+    fake_transaction.commit()
+
+    flush.assert_called_once_with([(1, 11)])
+
+
+def test_buffer_until_commit_drops_items_of_rolled_back_savepoints():
+    """A failed nested atomic() block must not leave its items in the outer transaction's buffer."""
+    flushed = []
+
+    with transaction.atomic():
+        utils.buffer_until_commit("cleanup", (1, 10), flushed.append)
+        with suppress(RuntimeError), transaction.atomic():
+            utils.buffer_until_commit("cleanup", (1, 11), flushed.append)
+            raise RuntimeError("delete failed")
+        with transaction.atomic():
+            utils.buffer_until_commit("cleanup", (1, 12), flushed.append)
+        utils.buffer_until_commit("cleanup", (1, 13), flushed.append)
+        assert flushed == []
+
+    assert flushed == [[(1, 10), (1, 13)], [(1, 12)]]
+
+
+def test_buffer_until_commit_flushes_immediately_in_autocommit(monkeypatch):
+    fake_transaction = FakeTransaction(in_atomic_block=False)
+    monkeypatch.setattr(utils, "transaction", fake_transaction)
+    flush = MagicMock()
+
+    utils.buffer_until_commit("cleanup", (1, 10), flush)
+    utils.buffer_until_commit("cleanup", (1, 11), flush)
+
+    assert flush.call_args_list == [(([(1, 10)],),), (([(1, 11)],),)]
+
+
+def test_buffer_until_commit_keeps_named_buffers_separate(monkeypatch):
+    fake_transaction = FakeTransaction()
+    monkeypatch.setattr(utils, "transaction", fake_transaction)
+    first, second = MagicMock(), MagicMock()
+
+    utils.buffer_until_commit("first", "a", first)
+    utils.buffer_until_commit("second", "b", second)
+    fake_transaction.commit()
+
+    first.assert_called_once_with(["a"])
+    second.assert_called_once_with(["b"])
+
+
+# ---------------------------------------------------------------------------
+# AssignedObjectTypeRegistry
+# ---------------------------------------------------------------------------
+
+
+def _make_registry(monkeypatch, type_ids, generation=0):
+    state = {"generation": generation}
+    monkeypatch.setattr(utils, "get_shared_generation", lambda name: state["generation"])
+    monkeypatch.setattr(utils, "transaction", FakeTransaction(in_atomic_block=False))
+    loader = MagicMock(side_effect=lambda: list(type_ids))
+    return utils.AssignedObjectTypeRegistry(loader), loader, state
+
+
+def test_registry_loads_once_and_answers_from_memory(monkeypatch):
+    registry, loader, _ = _make_registry(monkeypatch, [1, 2])
+
+    assert registry.may_have_assignments(1) is True
+    assert registry.may_have_assignments(3) is False
+    assert registry.may_have_assignments(2) is True
+
+    loader.assert_called_once()
+    assert registry.stats()["short_circuited"] == 1
+
+
+def test_registry_add_is_visible_without_reload_and_bumps_generation(monkeypatch):
+    registry, loader, _ = _make_registry(monkeypatch, [1])
+    bump = MagicMock()
+    monkeypatch.setattr(utils, "bump_shared_generation", bump)
+    registry.may_have_assignments(1)
+
+    registry.add(7)
+
+    assert registry.may_have_assignments(7) is True
+    loader.assert_called_once()
+    # Once before the new row is committed and once after
+    assert bump.call_args_list == [((registry.generation_name,),)] * 2
+
+
+def test_registry_add_bumps_without_loading_the_set(monkeypatch):
+    """Loaded inside the writing transaction, the set would already hold the uncommitted type."""
+    registry, loader, _ = _make_registry(monkeypatch, [1])
+    bump = MagicMock()
+    monkeypatch.setattr(utils, "bump_shared_generation", bump)
+    monkeypatch.setattr(utils, "transaction", FakeTransaction())
+
+    registry.add(1)
+
+    loader.assert_not_called()
+    bump.assert_called_once_with(registry.generation_name)
+
+
+def test_registry_add_skips_the_bump_for_types_loaded_at_the_current_generation(monkeypatch):
+    registry, loader, state = _make_registry(monkeypatch, [1])
+    bump = MagicMock()
+    monkeypatch.setattr(utils, "bump_shared_generation", bump)
+    registry.may_have_assignments(1)
+
+    registry.add(1)
+    bump.assert_not_called()
+
+    # An assignment was deleted since the set was loaded, so type 1 may be unknown elsewhere
+    state["generation"] += 1
+    registry.add(1)
+    bump.assert_called_once_with(registry.generation_name)
+
+
+def test_registry_falls_back_to_the_cleanup_query_while_the_generation_is_unknown(monkeypatch):
+    registry, loader, state = _make_registry(monkeypatch, [1], generation=None)
+
+    assert registry.may_have_assignments(7) is True
+    assert registry.may_have_assignments(8) is True
+    loader.assert_not_called()
+    assert registry.stats()["short_circuited"] == 0
+
+
+@pytest.fixture
+def shared_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_evicted_generation_never_matches_an_earlier_value(shared_cache):
+    before = utils.get_shared_generation("test")
+    assert before is not None
+    assert utils.get_shared_generation("test") == before
+
+    cache.clear()
+
+    assert utils.get_shared_generation("test") != before
+
+
+def _commit_on_success(committed, rows):
+    """Makes rows written in the current transaction visible to other workers once it commits."""
+    transaction.on_commit(lambda: committed.extend(rows))
+
+
+def test_registry_tells_a_worker_that_loaded_before_the_first_assignment(shared_cache):
+    committed = [1]
+    pending = []
+    worker_a = utils.AssignedObjectTypeRegistry(lambda: committed + pending)
+    worker_b = utils.AssignedObjectTypeRegistry(lambda: list(committed))
+    assert worker_b.may_have_assignments(7) is False
+
+    with transaction.atomic():
+        _commit_on_success(committed, pending)
+        pending.append(7)
+        worker_a.add(7)
+        # Not committed yet, so worker B cannot see the row
+        assert worker_b.may_have_assignments(7) is False
+
+    assert worker_b.may_have_assignments(7) is True
+
+
+def test_registry_tells_other_workers_about_a_type_it_still_holds_after_deletion(shared_cache):
+    committed = [1, 7]
+    worker_a = utils.AssignedObjectTypeRegistry(lambda: list(committed))
+    worker_b = utils.AssignedObjectTypeRegistry(lambda: list(committed))
+    worker_c = utils.AssignedObjectTypeRegistry(lambda: list(committed))
+    assert worker_a.may_have_assignments(7) is True
+
+    # Worker C deletes the last assignment of type 7; worker B reloads without it
+    with transaction.atomic():
+        committed.remove(7)
+        worker_c.discard_hint()
+    assert worker_b.may_have_assignments(7) is False
+
+    # Worker A still holds type 7 in its set and assigns it again
+    with transaction.atomic():
+        _commit_on_success(committed, [7])
+        worker_a.add(7)
+
+    assert worker_b.may_have_assignments(7) is True
+
+
+def test_registry_answers_known_types_without_reading_the_generation(monkeypatch):
+    registry, loader, _ = _make_registry(monkeypatch, [1])
+    registry.may_have_assignments(1)
+    generation = MagicMock(return_value=0)
+    monkeypatch.setattr(utils, "get_shared_generation", generation)
+
+    assert registry.may_have_assignments(1) is True
+    generation.assert_not_called()
+    assert registry.may_have_assignments(2) is False
+    generation.assert_called_once()
+
+
+def test_registry_reloads_when_shared_generation_changes(monkeypatch):
+    type_ids = [1]
+    registry, loader, state = _make_registry(monkeypatch, type_ids)
+    assert registry.may_have_assignments(7) is False
+
+    # Another worker assigned a new type and bumped the generation
+    type_ids.append(7)
+    state["generation"] += 1
+
+    assert registry.may_have_assignments(7) is True
+    assert loader.call_count == 2
+
+
+def test_registry_shrinks_after_discard_hint(monkeypatch):
+    type_ids = [1, 2]
+    registry, loader, _ = _make_registry(monkeypatch, type_ids)
+    assert registry.may_have_assignments(2) is True
+
+    type_ids.remove(2)
+    registry.discard_hint()
+
+    assert registry.may_have_assignments(2) is False
+    assert loader.call_count == 2
+
+
+def test_registry_fails_open_when_database_is_unavailable(monkeypatch):
+    registry, loader, _ = _make_registry(monkeypatch, [])
+    loader.side_effect = utils.DatabaseError("relation does not exist")
+
+    assert registry.may_have_assignments(1) is True
+    assert registry.stats()["short_circuited"] == 0
+
+
+def test_registry_loads_in_a_savepoint(monkeypatch):
+    """A failing load must not abort the transaction of the deletion that triggered it."""
+    monkeypatch.setattr(utils, "get_shared_generation", lambda name: 0)
+    savepoints = []
+    registry = utils.AssignedObjectTypeRegistry(lambda: savepoints.append(list(connection.savepoint_ids)) or [])
+
+    with transaction.atomic():
+        registry.may_have_assignments(1)
 
-    FakeObjectType = MagicMock()
-    FakeObjectType.DoesNotExist = _FakeDoesNotExist
-    FakeObjectType.objects.get_for_model.return_value = fake_ot
+    assert len(savepoints) == 1 and savepoints[0]
 
-    mock_qs = MagicMock()
-    mock_qs.delete.side_effect = TypeError("Field expected a number")
-    FakeAssignment = MagicMock()
-    FakeAssignment.objects.filter.return_value = mock_qs
 
-    handler = _make_handler(FakeObjectType, FakeAssignment, own_models=())
+def test_registry_logs_its_counters(monkeypatch, caplog):
+    registry, _, _ = _make_registry(monkeypatch, [1])
+    registry.report_every = 2
 
-    instance = make_fake_instance(pk="not-an-int")
-    handler(sender=object, instance=instance)  # must not raise
+    with caplog.at_level("INFO", logger=utils.logger.name):
+        registry.may_have_assignments(1)
+        registry.may_have_assignments(2)
 
-    FakeObjectType.objects.get_for_model.assert_called_once_with(instance)
-    FakeAssignment.objects.filter.assert_called_once_with(object_type_id=5, object_id="not-an-int")
-    mock_qs.delete.assert_called_once()
+    assert "skipped 1 of 2 deletions" in caplog.text
@@ -0,0 +1,132 @@
+"""Unit tests for the sharded upload layout, the file copies used to migrate to it and the
+removal of its directories.
+
+copy_stored_file() and delete_stored_file() only talk to a storage backend, so
+they are run against a temporary directory through stubs for a local and a
+remote storage backend — no Django settings are needed.
+"""
+
+import os
+import re
+
+import pytest
+from django.core.files.storage import Storage
+
+from netbox_attachments import utils
+from netbox_attachments.storage import copy_stored_file, delete_stored_file
+
+
+class FakeInstance:
+    def __init__(self, name):
+        self.name = name
+
+
+class LocalStorage(Storage):
+    def __init__(self, root):
+        self.root = root
+        self.saved = []
+
+    def path(self, name):
+        return self._local(name)
+
+    def _local(self, name):
+        return os.path.join(self.root, name)
+
+    def _open(self, name, mode="rb"):
+        return open(self._local(name), mode)
+
+    def _save(self, name, content):
+        self.saved.append(name)
+        os.makedirs(os.path.dirname(self._local(name)), exist_ok=True)
+        with open(self._local(name), "wb") as file:
+            for chunk in content.chunks():
+                file.write(chunk)
+        return name
+
+    def exists(self, name):
+        return os.path.exists(self._local(name))
+
+    def delete(self, name):
+        os.remove(self._local(name))
+
+
+class RemoteStorage(LocalStorage):
+    def path(self, name):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def sharded(monkeypatch):
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"upload_layout": "sharded"})
+
+
+def test_sharded_upload_path_fans_out_by_key():
+    assert utils.sharded_upload_path("datasheet.pdf", key="abcdef01" * 4) == (
+        "netbox-attachments/ab/cd/abcdef01abcdef01abcdef01abcdef01/datasheet.pdf"
+    )
+
+
+def test_attachment_upload_uses_unique_sharded_directories(sharded):
+    first = utils.attachment_upload(FakeInstance("datasheet"), "upload.pdf")
+    second = utils.attachment_upload(FakeInstance("datasheet"), "upload.pdf")
+
+    assert re.fullmatch(r"netbox-attachments/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{28}/datasheet\.pdf", first)
+    assert first != second
+    assert not utils.is_flat_upload_name(first)
+
+
+def test_upload_layout_falls_back_to_flat_on_invalid_values(monkeypatch):
+    monkeypatch.setattr(utils, "_get_plugin_settings", lambda: {"upload_layout": "nested"})
+
+    assert utils.get_upload_layout() == "flat"
+    assert utils.attachment_upload(FakeInstance("datasheet.pdf"), "datasheet.pdf") == "netbox-attachments/datasheet.pdf"
+
+
+def test_is_flat_upload_name():
+    assert utils.is_flat_upload_name("netbox-attachments/datasheet.pdf")
+    assert not utils.is_flat_upload_name("netbox-attachments/cas/ab/abcd")
+    assert not utils.is_flat_upload_name("netbox-attachments/")
+    assert not utils.is_flat_upload_name("other/datasheet.pdf")
+
+
+def test_sharded_upload_directory():
+    key = "abcdef01" * 4
+    assert utils.sharded_upload_directory(utils.sharded_upload_path("a.pdf", key=key)) == (
+        f"netbox-attachments/ab/cd/{key}"
+    )
+    assert utils.sharded_upload_directory("netbox-attachments/datasheet.pdf") is None
+    assert utils.sharded_upload_directory("netbox-attachments/cas/ab/" + "ab" * 32) is None
+    assert utils.sharded_upload_directory(f"netbox-attachments/ff/cd/{key}/a.pdf") is None
+
+
+@pytest.mark.parametrize("storage_class", [LocalStorage, RemoteStorage])
+def test_delete_stored_file_removes_the_empty_upload_directory(tmp_path, storage_class):
+    storage = storage_class(str(tmp_path))
+    names = [utils.sharded_upload_path(filename, key="ab" * 16) for filename in ("a.pdf", "b.pdf")]
+    for name in names:
+        os.makedirs(os.path.dirname(tmp_path / name), exist_ok=True)
+        (tmp_path / name).write_bytes(b"pdf")
+    directory = tmp_path / os.path.dirname(names[0])
+
+    delete_stored_file(storage, names[0])
+    assert directory.is_dir()
+
+    delete_stored_file(storage, names[1])
+    # Remote storage has no directories to remove; the shard directories are shared
+    assert directory.exists() is (storage_class is RemoteStorage)
+    assert (tmp_path / "netbox-attachments/ab/ab").is_dir()
+
+
+@pytest.mark.parametrize("storage_class", [LocalStorage, RemoteStorage])
+def test_copy_stored_file_keeps_original(tmp_path, storage_class):
+    (tmp_path / "netbox-attachments").mkdir()
+    (tmp_path / "netbox-attachments/datasheet.pdf").write_bytes(b"pdf")
+    storage = storage_class(str(tmp_path))
+    new_name = utils.sharded_upload_path("datasheet.pdf", key="ab" * 16)
+
+    assert copy_stored_file(storage, "netbox-attachments/datasheet.pdf", new_name) == new_name
+
+    assert (tmp_path / new_name).read_bytes() == b"pdf"
+    assert (tmp_path / "netbox-attachments/datasheet.pdf").exists()
+    # Local storage links the file instead of copying its content
+    assert storage.saved == ([] if storage_class is LocalStorage else [new_name])
@@ -0,0 +1,102 @@
+"""Unit tests for the streaming ZIP archives behind "Download All" and "Download Selected".
+
+iter_zip_archive() only needs entries with a file opener, so archives are
+built from in-memory files and read back with zipfile — no Django settings
+are needed.
+"""
+
+import io
+import zipfile
+
+from netbox_attachments.archive import iter_zip_archive, unique_archive_name
+
+DATE = (2024, 5, 17, 12, 30, 0)
+
+
+class TrackedFile(io.BytesIO):
+    """Records when it is opened relative to the archive output."""
+
+    def __init__(self, content, events, name):
+        super().__init__(content)
+        self.events, self.name = events, name
+        events.append(f"open {name}")
+
+    def close(self):
+        if not self.closed:
+            self.events.append(f"close {self.name}")
+        super().close()
+
+
+def _read_archive(chunks):
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+def test_archive_streams_members_in_chunks():
+    content = bytes(range(256)) * 1024
+    entries = [("firmware.bin", DATE, len(content), lambda: io.BytesIO(content))]
+
+    chunks = list(iter_zip_archive(entries, chunk_size=8192))
+
+    assert len(chunks) > 1
+    archive = _read_archive(chunks)
+    assert archive.testzip() is None
+    assert archive.read("firmware.bin") == content
+    assert archive.getinfo("firmware.bin").date_time == DATE
+
+
+def test_archive_opens_each_file_only_while_it_is_written():
+    events = []
+    entries = (
+        (name, DATE, 3, lambda name=name: TrackedFile(b"abc", events, name)) for name in ["a.txt", "b.txt", "c.txt"]
+    )
+
+    for _ in iter_zip_archive(entries):
+        events.append("chunk")
+
+    opened = [event for event in events if event != "chunk"]
+    assert opened == ["open a.txt", "close a.txt", "open b.txt", "close b.txt", "open c.txt", "close c.txt"]
+
+
+def test_archive_renames_duplicates_and_skips_unreadable_files():
+    def missing():
+        raise FileNotFoundError("gone")
+
+    entries = [
+        ("Manual.pdf", DATE, 1, lambda: io.BytesIO(b"1")),
+        ("missing.txt", DATE, 1, missing),
+        ("manual.pdf", DATE, 1, lambda: io.BytesIO(b"2")),
+        ("config", (1970, 1, 1, 0, 0, 0), None, lambda: io.BytesIO(b"3")),
+    ]
+
+    archive = _read_archive(iter_zip_archive(entries))
+
+    assert archive.namelist() == ["Manual.pdf", "manual (2).pdf", "config"]
+    assert archive.read("manual (2).pdf") == b"2"
+    assert archive.getinfo("config").date_time == (1980, 1, 1, 0, 0, 0)
+
+
+def test_archive_stores_compressed_formats_and_deflates_the_rest():
+    entries = [
+        ("photo.jpg", DATE, 4, lambda: io.BytesIO(b"jpeg")),
+        ("export.csv", DATE, 4, lambda: io.BytesIO(b"a,b\n")),
+    ]
+
+    archive = _read_archive(iter_zip_archive(entries))
+
+    assert archive.getinfo("photo.jpg").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("export.csv").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_empty_archive_is_valid():
+    assert _read_archive(iter_zip_archive([])).namelist() == []
+
+
+def test_unique_archive_name():
+    used = set()
+
+    assert [unique_archive_name(name, used) for name in ["a.txt", "A.TXT", "a.txt", "b"]] == [
+        "a.txt",
+        "A (2).TXT",
+        "a (3).txt",
+        "b",
+    ]
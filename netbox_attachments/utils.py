@@ -1,7 +1,23 @@
+import base64
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
 from pathlib import Path
 
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.core.cache import cache
+from django.core.exceptions import AppRegistryNotReady, ImproperlyConfigured, ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+_COMMIT_BUFFERS_ATTR = "_netbox_attachments_commit_buffers"
 
 
 def _get_plugin_settings():
@@ -56,9 +72,560 @@ def attachment_upload(instance, filename):
         extension = "".join(Path(filename).suffixes)
         filename = "".join([Path(instance.name).name, extension])  # strip dir components
 
+    if get_upload_layout() == "sharded":
+        return sharded_upload_path(Path(filename).name)
+
     return "{}{}".format(path, Path(filename).name)
 
 
+UPLOAD_LAYOUTS = ("flat", "sharded")
+
+
+def get_upload_layout():
+    value = _get_plugin_settings().get("upload_layout", "flat")
+    if value not in UPLOAD_LAYOUTS:
+        logger.warning("Invalid upload_layout value %r, defaulting to flat", value)
+        return "flat"
+    return value
+
+
+def sharded_upload_path(filename, key=None):
+    """
+    Return netbox-attachments/<ab>/<cd>/<key>/<filename> for a random (or given) hex key.
+
+    Every upload gets a directory of its own, so names never collide and directories stay
+    small: the two levels of two hex characters spread files over 65536 directories.
+    """
+    key = key or uuid.uuid4().hex
+    return f"netbox-attachments/{key[:2]}/{key[2:4]}/{key}/{filename}"
+
+
+def sharded_upload_directory(name):
+    """
+    Return the directory a sharded upload has to itself, netbox-attachments/<ab>/<cd>/<key>,
+    or None for a file in a shared directory.
+    """
+    parts = name.split("/")
+    if len(parts) != 5 or parts[0] != "netbox-attachments":
+        return None
+    key = parts[3]
+    if len(key) != 32 or key.strip("0123456789abcdef") or (parts[1], parts[2]) != (key[:2], key[2:4]):
+        return None
+    return "/".join(parts[:4])
+
+
+def is_flat_upload_name(name):
+    """True for files stored directly in netbox-attachments/, the original layout."""
+    directory, _, filename = name.rpartition("/")
+    return directory == "netbox-attachments" and bool(filename)
+
+
+# Directory holding deduplicated blobs, each named after the SHA-256 digest of its content
+CONTENT_ADDRESSED_PREFIX = "netbox-attachments/cas/"
+
+
+def deduplicate_files_enabled():
+    value = _get_plugin_settings().get("deduplicate_files", False)
+    if not isinstance(value, bool):
+        logger.warning("Invalid deduplicate_files value, defaulting to False")
+        return False
+    return value
+
+
+def content_addressed_name(digest):
+    """Return the storage path of the blob with the given hex digest, fanned out by its first two characters."""
+    return f"{CONTENT_ADDRESSED_PREFIX}{digest[:2]}/{digest}"
+
+
+def is_content_addressed_name(name):
+    return bool(name) and name.startswith(CONTENT_ADDRESSED_PREFIX)
+
+
+# Fixed-length digests only; the shake_* algorithms need an explicit length
+CHECKSUM_ALGORITHMS = ("md5", "sha1", "sha224", "sha256", "sha384", "sha512", "sha3_256", "sha3_512", "blake2b")
+
+
+def get_checksum_algorithm():
+    value = _get_plugin_settings().get("checksum_algorithm", "sha256")
+    if value not in CHECKSUM_ALGORITHMS:
+        logger.warning("Invalid checksum_algorithm value %r, defaulting to sha256", value)
+        return "sha256"
+    return value
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items from iterable, consuming it lazily."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_changes_lookback():
+    """Return how far the changes feed reaches back before the requested timestamp, as a timedelta."""
+    value = _get_plugin_settings().get("changes_lookback", 60)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        logger.warning("Invalid changes_lookback value %r, defaulting to 60", value)
+        value = 60
+    return timedelta(seconds=value)
+
+
+def get_tombstone_retention():
+    """Return how long deletions are kept for the changes feed, as a timedelta."""
+    value = _get_plugin_settings().get("tombstone_retention_days", 90)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        logger.warning("Invalid tombstone_retention_days value %r, defaulting to 90", value)
+        value = 90
+    return timedelta(days=value)
+
+
+def encode_cursor(values):
+    """Return an opaque, URL-safe cursor for the ordering values of the last row of a page."""
+    data = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """
+    Return the ordering values stored in a cursor, or None for an empty cursor (the first page).
+
+    Raises ValueError if the cursor was not produced by encode_cursor() for length fields.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if (
+        not isinstance(values, list)
+        or len(values) != length
+        or not all(isinstance(value, (int, str)) and not isinstance(value, bool) for value in values)
+    ):
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+
+def clean_cursor_values(model, fields, values):
+    """
+    Convert decoded cursor values to the types of the model fields they were taken from.
+
+    Raises ValueError if a value does not fit its field, e.g. a string or an out-of-range
+    number for an integer key, so that a tampered cursor never reaches the database.
+    """
+    cleaned = []
+    for name, value in zip(fields, values):
+        field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        field = getattr(field, "target_field", field)
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except ValidationError as exc:
+            raise ValueError("Invalid cursor") from exc
+        cleaned.append(value)
+    return tuple(cleaned)
+
+
+def keyset_filter(fields, values):
+    """
+    Return a Q matching the rows that sort after values when ordered ascending by fields.
+
+    Expands the row comparison (a, b, c) > (x, y, z) into a disjunction; the leading a >= x
+    term lets the database walk the index on the ordering fields instead of scanning.
+    """
+    condition = Q()
+    for index, (field, value) in enumerate(zip(fields, values)):
+        condition |= Q(**dict(zip(fields[:index], values[:index])), **{f"{field}__gt": value})
+    if len(fields) == 1:
+        return condition
+    return Q(**{f"{fields[0]}__gte": values[0]}) & condition
+
+
+class _CommitBuffer:
+    """Items collected in one savepoint of a transaction, handed to flush() once it commits."""
+
+    def __init__(self, flush):
+        self.flush = flush
+        self.items = {}  # insertion-ordered set
+
+    def __call__(self):
+        self.flush(list(self.items))
+
+
+def buffer_until_commit(name, item, flush, using=None):
+    """
+    Add an item to a per-transaction buffer and call flush(items) once when it commits.
+
+    The buffer is scoped to the current savepoint of the given connection: rolling back a
+    transaction or savepoint discards the buffers started inside it together with their
+    on_commit() hooks, so items added there are never flushed. Each savepoint level that adds
+    items gets its own buffer and flush() call. Outside an atomic block the item is flushed
+    immediately, like on_commit() itself.
+
+    Args:
+        name: Identifies the buffer, so unrelated callers never share items.
+        item: A hashable item; duplicates within one transaction are collapsed.
+        flush: Callable receiving the list of buffered items.
+        using: Database alias, defaults to the default connection.
+    """
+    connection = transaction.get_connection(using)
+    buffers = connection.__dict__.setdefault(_COMMIT_BUFFERS_ATTR, {})
+    # on_commit() tags each hook with the savepoints open when it was queued, and a savepoint
+    # rollback drops the hooks tagged with it; a buffer is only shared within the same savepoints
+    savepoint_ids = set(connection.savepoint_ids)
+    key = (name, tuple(connection.savepoint_ids))
+    buffer = buffers.get(key)
+
+    # Reuse the buffer only while its hook is still queued for the current savepoints.
+    if buffer is not None and any(
+        entry[1] is buffer and entry[0] == savepoint_ids for entry in connection.run_on_commit
+    ):
+        buffer.items[item] = None
+        return
+
+    if not connection.run_on_commit:
+        # A new transaction; forget the buffers of earlier ones
+        buffers.clear()
+    buffer = buffers[key] = _CommitBuffer(flush)
+    buffer.items[item] = None
+    transaction.on_commit(buffer, using=using)
+
+
+def _new_generation():
+    return random.randrange(1 << 48)
+
+
+def get_shared_generation(name):
+    """
+    Return the current value of a cross-process generation counter kept in Django's cache.
+
+    A counter that is missing, never set or evicted, is created with a random value, so it does
+    not match a generation read before the eviction. Returns None when the cache backend is
+    unavailable, which callers treat as "unknown".
+    """
+    key = f"netbox_attachments:generation:{name}"
+    try:
+        generation = cache.get(key)
+        if generation is None:
+            cache.add(key, _new_generation(), timeout=None)
+            generation = cache.get(key)
+        return generation
+    except Exception as exc:  # cache backends raise their own connection errors
+        logger.debug("Could not read shared generation %r: %s", name, exc)
+        return None
+
+
+def bump_shared_generation(name):
+    """Increment a cross-process generation counter so other workers drop their local caches."""
+    key = f"netbox_attachments:generation:{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing or evicted; any new value differs from what other workers read
+        cache.set(key, _new_generation(), timeout=None)
+    except Exception as exc:
+        logger.warning("Could not bump shared generation %r: %s", name, exc)
+
+
+class AssignedObjectTypeRegistry:
+    """
+    In-process set of the object type IDs that have at least one attachment assignment.
+
+    The set is loaded lazily with a single ``SELECT DISTINCT object_type_id`` and kept up to
+    date by the assignment save and delete hooks. Other processes learn about changes through
+    a shared generation counter in Django's cache, bumped whenever an assignment is deleted
+    and whenever one is saved for a type that other processes may not know about. A type
+    found in the set is answered from memory; before answering that a type has no
+    assignments, the generation is read again, so a type assigned by another worker is never
+    skipped. While the generation cannot be read, unknown types are answered with True and the
+    caller runs its cleanup query. The set may temporarily contain types that no longer have
+    assignments; that only costs a no-op cleanup and is corrected on the next reload.
+    """
+
+    generation_name = "assigned_object_types"
+
+    # Log the counters once every this many lookups
+    report_every = 10000
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._type_ids = None
+        self._generation = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.short_circuited = 0
+        self.reloads = 0
+
+    def _reload(self, generation):
+        try:
+            # A savepoint keeps a failing query from aborting the caller's transaction
+            with transaction.atomic():
+                self._type_ids = frozenset(self._loader())
+        except DatabaseError as exc:
+            # Tables not migrated yet: fail open so no cleanup is ever skipped
+            logger.debug("Could not load assigned object types: %s", exc)
+            self._type_ids = None
+            return
+        self._generation = generation
+        self._dirty = False
+        self.reloads += 1
+
+    def _refresh(self):
+        """
+        Reload the set if it is missing, locally outdated or another process changed it.
+
+        Returns None, without loading, when the shared generation is unknown: a set loaded
+        then could never be told about types assigned by other processes.
+        """
+        generation = get_shared_generation(self.generation_name)
+        if generation is None:
+            return None
+        with self._lock:
+            if self._type_ids is None or self._dirty or generation != self._generation:
+                self._reload(generation)
+        return self._type_ids
+
+    def may_have_assignments(self, object_type_id):
+        """
+        Return False only when no assignment can exist for the given object type.
+
+        Counts the call in ``short_circuited`` when it returns False.
+        """
+        self.lookups += 1
+        type_ids = self._type_ids
+        if type_ids is None or self._dirty or object_type_id not in type_ids:
+            type_ids = self._refresh()
+        found = type_ids is None or object_type_id in type_ids
+        if not found:
+            self.short_circuited += 1
+        if self.lookups % self.report_every == 0:
+            logger.info(
+                "Assignment cleanup skipped %d of %d deletions without database access (%d reloads)",
+                self.short_circuited,
+                self.lookups,
+                self.reloads,
+            )
+        return found
+
+    def add(self, object_type_id, using=None):
+        """
+        Record an assigned object type, telling other processes unless they all know it already.
+
+        The set is never loaded here: inside the transaction writing the assignment it would
+        already contain the new type, although other processes cannot see it yet.
+        """
+        type_ids = self._type_ids
+        if type_ids is not None and not self._dirty and object_type_id in type_ids:
+            # The type had a committed assignment when the set was loaded. Unless the generation
+            # moved since (an assignment was deleted, or this process added the type itself), no
+            # process can have loaded a set without it.
+            buffer_until_commit("assigned_object_types_check", self._generation, self._bump_unless_current, using=using)
+            return
+        if type_ids is not None:
+            self._type_ids = type_ids | {object_type_id}
+        # Bumping before the commit makes every process that can see the new row re-read the
+        # generation first; bumping again afterwards makes processes that reloaded in between,
+        # before the row was visible to them, reload once more.
+        bump_shared_generation(self.generation_name)
+        buffer_until_commit("assigned_object_types_bump", None, self._bump_and_refresh, using=using)
+
+    def _bump_unless_current(self, generations):
+        if any(generation != get_shared_generation(self.generation_name) for generation in generations):
+            self._bump_and_refresh()
+
+    def _bump_and_refresh(self, _items=None):
+        bump_shared_generation(self.generation_name)
+        # Committed now, so the reloaded set includes the new rows and later adds need no bump
+        self._refresh()
+
+    def discard_hint(self, using=None):
+        """An assignment was removed; shrink the set on the next lookup, here and in other processes."""
+        self._dirty = True
+        buffer_until_commit(
+            "assigned_object_types_discard",
+            None,
+            lambda _items: bump_shared_generation(self.generation_name),
+            using=using,
+        )
+
+    def invalidate(self):
+        self._type_ids = None
+
+    def stats(self):
+        return {
+            "lookups": self.lookups,
+            "short_circuited": self.short_circuited,
+            "reloads": self.reloads,
+            "assigned_object_types": None if self._type_ids is None else len(self._type_ids),
+        }
+
+
+# Seconds an unrestricted per-object attachment count stays cached; writes invalidate it earlier
+ATTACHMENT_COUNT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_attachment_count_cache_key(object_type_id, object_id):
+    """Return the cache key of an object's count version; the count is stored under key:version."""
+    return f"netbox_attachments:count:{object_type_id}:{object_id}"
+
+
+def invalidate_attachment_counts(pairs):
+    """
+    Drop the cached attachment counts of the given objects.
+
+    Deletes their count versions, so a count computed from data read before the invalidation
+    is stored under a version that is no longer read, even if it is written afterwards.
+
+    Args:
+        pairs: An iterable of (object_type_id, object_id) tuples.
+    """
+    keys = [get_attachment_count_cache_key(object_type_id, object_id) for object_type_id, object_id in pairs]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception as exc:  # cache backends raise their own connection errors
+        logger.warning("Could not invalidate %d cached attachment count(s): %s", len(keys), exc)
+
+
+def get_cached_attachment_count(object_type_id, object_id, counter):
+    """
+    Return the cached attachment count of an object, calling counter() to fill a cache miss.
+
+    The count is cached under the object's current count version, read before counter() runs,
+    so an invalidation that races with the count is never overwritten by a stale value.
+
+    Only valid for users whose view permission is unconstrained; see has_unconstrained_permission().
+    """
+    version_key = get_attachment_count_cache_key(object_type_id, object_id)
+    try:
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, _new_generation(), ATTACHMENT_COUNT_CACHE_TIMEOUT)
+            version = cache.get(version_key)
+        if version is None:
+            return counter()
+        key = f"{version_key}:{version}"
+        count = cache.get(key)
+    except Exception as exc:
+        logger.debug("Attachment count cache unavailable: %s", exc)
+        return counter()
+
+    if count is None:
+        count = counter()
+        try:
+            cache.set(key, count, ATTACHMENT_COUNT_CACHE_TIMEOUT)
+        except Exception as exc:
+            logger.debug("Could not cache attachment count: %s", exc)
+    return count
+
+
+def has_unconstrained_permission(user, permission):
+    """
+    Return True when restrict(user, ...) cannot filter out any object for the given permission.
+
+    That is the case for superusers and for users holding the permission through at least one
+    ObjectPermission without constraints. Anyone else must be served by a restricted query.
+    """
+    if user is None or not getattr(user, "is_authenticated", False):
+        return False
+    if getattr(user, "is_superuser", False):
+        return True
+    if permission not in user.get_all_permissions():
+        return False
+    # Populated by NetBox's ObjectPermissionBackend alongside get_all_permissions()
+    constraints = getattr(user, "_object_perm_cache", {}).get(permission, ())
+    return any(not constraint for constraint in constraints)
+
+
+def get_cached_parent(assignment):
+    """
+    Return the (found, parent) pair cached on an assignment by prefetch_assignment_parents().
+
+    The cache is keyed by the assignment's current (object_type_id, object_id) pair so that
+    re-targeting an instance never returns a stale parent.
+    """
+    cached = getattr(assignment, "_parent_cache", None)
+    if cached is None or cached[0] != (assignment.object_type_id, assignment.object_id):
+        return False, None
+    return True, cached[1]
+
+
+def set_cached_parent(assignment, parent):
+    assignment._parent_cache = ((assignment.object_type_id, assignment.object_id), parent)
+
+
+def prefetch_assignment_parents(assignments, user=None):
+    """
+    Resolve the parent object of many assignments using one query per object type.
+
+    Assignments are grouped by object_type_id and each model's parents are loaded with a
+    single in_bulk() call. When a user is given, the lookup is restricted to objects the
+    user may view; parents that are missing or hidden resolve to None. The result is cached
+    on each assignment so subsequent ``parent`` accesses do not hit the database.
+
+    Args:
+        assignments: An iterable of NetBoxAttachmentAssignment instances. Their object_type
+                     should already be loaded (select_related/prefetch_related).
+        user: Optional user used to restrict() each parent queryset.
+
+    Returns:
+        The list of assignments that was processed.
+    """
+    assignments = list(assignments)
+    by_type = defaultdict(list)
+
+    for assignment in assignments:
+        if get_cached_parent(assignment)[0]:
+            continue
+        if not (assignment.object_type_id and assignment.object_id):
+            set_cached_parent(assignment, None)
+            continue
+        by_type[assignment.object_type_id].append(assignment)
+
+    for type_assignments in by_type.values():
+        model = type_assignments[0].object_type.model_class()
+        if model is None:
+            # Model was probably deleted or uninstalled
+            parents = {}
+        else:
+            queryset = model._default_manager.all()
+            if user is not None and hasattr(queryset, "restrict"):
+                queryset = queryset.restrict(user, "view")
+            parents = queryset.in_bulk({assignment.object_id for assignment in type_assignments})
+
+        for assignment in type_assignments:
+            set_cached_parent(assignment, parents.get(assignment.object_id))
+
+    return assignments
+
+
+def parse_object_reference(value):
+    """
+    Parse an "<object type>:<object ID>" reference, as accepted by the assigned_to filter.
+
+    The object type is either a numeric ObjectType ID or an "app_label.model" name.
+
+    Returns:
+        (object_type, object_id) where object_type is an int ID or an (app_label, model) tuple,
+        or None when the value is malformed.
+    """
+    object_type, sep, object_id = str(value).strip().rpartition(":")
+    if not sep or not object_id.isdigit():
+        return None
+    if object_type.isdigit():
+        return int(object_type), int(object_id)
+    app_label, sep, model = object_type.partition(".")
+    if not sep or not app_label or not model:
+        return None
+    return (app_label, model.lower()), int(object_id)
+
+
 def is_custom_object_model(model):
     """
     Determines if a model is a NetBox Custom Objects dynamic model.
@@ -84,33 +651,120 @@ def is_custom_object_model(model):
         return False
 
 
-def validate_object_type(model):
+class CustomObjectTypeNames:
     """
-    Determines if a Django model is permitted to have attachments.
+    Maps CustomObjectType IDs to names, loaded with one query per resolution pass.
 
-    This function uses a unified filtering approach for both standard models and custom objects.
-    It checks the model against the plugin's scope_filter configuration.
+    The map is dropped when a custom object type is created, renamed or deleted, in this
+    process through custom_object_types_changed() and in other processes through a shared
+    generation counter, checked at most once every ``check_interval`` seconds.
+    """
 
-    For custom objects, the function uses CustomObjectType names in the format:
-    'netbox_custom_objects.{CustomObjectType.name}' (e.g., 'netbox_custom_objects.attachment')
+    generation_name = "custom_object_types"
 
-    When applied_scope='model', the function supports mixed mode filtering:
-    - App label entries (e.g., 'dcim') enable ALL models from that app
-    - Specific model entries (e.g., 'dcim.device') enable only that model
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._installed = None
+        self._names = None
+        self._generation = 0
+        self._checked_at = 0.0
 
-    Args:
-        model: A Django model class or instance with a _meta attribute that contains
-               'app_label' and 'model_name'.
+    def is_installed(self):
+        if self._installed is None:
+            from django.apps import apps
 
-    Returns:
-        bool: True if the model is allowed to have attachments; False otherwise.
+            try:
+                self._installed = apps.is_installed("netbox_custom_objects")
+            except (AppRegistryNotReady, ImproperlyConfigured):
+                return False
+        return self._installed
+
+    def generation(self):
+        """Return the shared generation; values only change when custom object types change."""
+        if not self.is_installed():
+            return 0
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            generation = get_shared_generation(self.generation_name)
+            if generation is not None and generation != self._generation:
+                self._generation = generation
+                self._names = None
+            self._checked_at = now
+        return self._generation
+
+    def get(self, custom_object_type_id):
+        """Return the name of a custom object type, or None if it does not exist."""
+        if self._names is None:
+            from netbox_custom_objects.models import CustomObjectType
+
+            self._names = dict(CustomObjectType.objects.values_list("id", "name"))
+        return self._names.get(custom_object_type_id)
+
+    def invalidate(self):
+        self._names = None
+
+
+custom_object_type_names = CustomObjectTypeNames()
+
+
+def custom_object_types_changed(**kwargs):
     """
+    Signal handler for CustomObjectType saves and deletions.
+
+    Drops the local name map and scope decisions immediately and tells other processes
+    to do the same once the change is committed.
+    """
+    custom_object_type_names.invalidate()
+    clear_scope_cache()
+    transaction.on_commit(lambda: bump_shared_generation(CustomObjectTypeNames.generation_name))
+
+
+class _ScopeState:
+    """Scope decisions memoized for one (applied_scope, scope_filter) configuration."""
+
+    def __init__(self, key):
+        self.key = key
+        self.decisions = {}
+        self.type_ids = None
+        # Independent of the scope itself, but goes stale on the same events (migrations, custom object types)
+        self.broken_type_ids = None
+
+
+_scope_state = _ScopeState(None)
+
+
+def _get_scope_key():
     plugin_settings = _get_plugin_settings()
     applied_scope = choice_default(plugin_settings.get("applied_scope"), ("app", "model"), "app")
     scope_filter = plugin_settings.get("scope_filter")
     if scope_filter is None or not isinstance(scope_filter, (list, tuple, set)):
         scope_filter = []
+    return (
+        applied_scope,
+        frozenset(entry for entry in scope_filter if isinstance(entry, str)),
+        custom_object_type_names.generation(),
+    )
+
+
+def _get_scope_state():
+    """Return the memoized scope state, starting a new one whenever the plugin settings change."""
+    global _scope_state
 
+    key = _get_scope_key()
+    state = _scope_state
+    if state.key != key:
+        state = _scope_state = _ScopeState(key)
+    return state
+
+
+def clear_scope_cache():
+    """Forget all memoized scope decisions, e.g. after migrations add new object types."""
+    global _scope_state
+
+    _scope_state = _ScopeState(None)
+
+
+def _resolve_object_type(model, applied_scope, scope_filter, custom_generation=None):
     app_label = model._meta.app_label
 
     if applied_scope == "app":
@@ -122,15 +776,15 @@ def validate_object_type(model):
         if app_label in scope_filter:
             return True
         # Need model_identifier for the specific-model check.
-        # For custom objects, resolve the identifier via DB (only when necessary).
+        # For custom objects, resolve the identifier from the batched name map (only when necessary).
         if is_custom_object_model(model):
             try:
-                from netbox_custom_objects.models import CustomObjectType
-
-                cot = CustomObjectType.objects.get(id=model.custom_object_type_id)
-                model_identifier = f"{model._meta.app_label}.{cot.name}"
-            except (ImportError, AttributeError, ObjectDoesNotExist):
+                name = custom_object_type_names.get(model.custom_object_type_id)
+            except (ImportError, AttributeError):
                 return False
+            if name is None:
+                return False
+            model_identifier = f"{model._meta.app_label}.{name}"
         else:
             model_identifier = f"{model._meta.app_label}.{model._meta.model_name}"
         return model_identifier in scope_filter
@@ -138,45 +792,117 @@ def validate_object_type(model):
     return False
 
 
-def get_enabled_object_type_queryset():
+def validate_object_type(model):
     """
-    Returns an ObjectType queryset limited to models enabled in the plugin config.
-    Used by the link form to restrict the object type picker to valid choices.
+    Determines if a Django model is permitted to have attachments.
+
+    This function uses a unified filtering approach for both standard models and custom objects.
+    It checks the model against the plugin's scope_filter configuration.
+
+    For custom objects, the function uses CustomObjectType names in the format:
+    'netbox_custom_objects.{CustomObjectType.name}' (e.g., 'netbox_custom_objects.attachment')
+
+    When applied_scope='model', the function supports mixed mode filtering:
+    - App label entries (e.g., 'dcim') enable ALL models from that app
+    - Specific model entries (e.g., 'dcim.device') enable only that model
+
+    Decisions are memoized per model for the current scope settings, so repeated calls
+    are a dictionary lookup.
+
+    Args:
+        model: A Django model class or instance with a _meta attribute that contains
+               'app_label' and 'model_name'.
+
+    Returns:
+        bool: True if the model is allowed to have attachments; False otherwise.
     """
-    from functools import reduce
-    from operator import or_
+    state = _get_scope_state()
+    model_key = (
+        model._meta.app_label,
+        model._meta.model_name,
+        getattr(model, "custom_object_type_id", None),
+    )
+    try:
+        return state.decisions[model_key]
+    except KeyError:
+        decision = state.decisions[model_key] = _resolve_object_type(model, *state.key)
+        return decision
 
-    from django.apps import apps
-    from django.db.models import Q
 
-    from core.models.object_types import ObjectType
+def _iter_candidate_models():
+    """Yield every installed model once, including NetBox Custom Objects dynamic models."""
+    from django.apps import apps
 
-    q_filters = []
     seen = set()
+    models = list(apps.get_models())
+    # Custom objects (gracefully absent if plugin not installed)
+    try:
+        models.extend(apps.get_app_config("netbox_custom_objects").get_models())
+    except (LookupError, ImportError):
+        pass
 
-    # Standard models
-    for model in apps.get_models():
+    for model in models:
         key = f"{model._meta.app_label}.{model._meta.model_name}"
         if key in seen:
             continue
         seen.add(key)
-        if validate_object_type(model):
-            q_filters.append(Q(app_label=model._meta.app_label, model=model._meta.model_name))
+        yield model
 
-    # Custom objects (gracefully absent if plugin not installed)
-    try:
-        custom_app = apps.get_app_config("netbox_custom_objects")
-        for model in custom_app.get_models():
-            key = f"{model._meta.app_label}.{model._meta.model_name}"
-            if key in seen:
-                continue
-            seen.add(key)
-            if validate_object_type(model):
-                q_filters.append(Q(app_label=model._meta.app_label, model=model._meta.model_name))
-    except (LookupError, ImportError):
-        pass
 
-    if not q_filters:
+def get_enabled_object_type_ids():
+    """
+    Returns the frozenset of ObjectType IDs enabled in the plugin config.
+
+    Computed once per scope configuration: enabled models are collected from the app
+    registry and matched against a single ObjectType query.
+    """
+    from core.models.object_types import ObjectType
+
+    state = _get_scope_state()
+    if state.type_ids is None:
+        enabled = {
+            (model._meta.app_label, model._meta.model_name)
+            for model in _iter_candidate_models()
+            if validate_object_type(model)
+        }
+        state.type_ids = frozenset(
+            pk
+            for pk, app_label, model_name in ObjectType.objects.values_list("pk", "app_label", "model")
+            if (app_label, model_name) in enabled
+        )
+    return state.type_ids
+
+
+def get_broken_object_type_ids():
+    """
+    Returns the frozenset of ObjectType IDs whose model is no longer installed.
+
+    Computed once per process and recomputed after migrations or custom object type changes.
+    ObjectType rows matching an installed model are recognised from the app registry without
+    calling model_class(); only the remaining rows are checked individually.
+    """
+    from core.models.object_types import ObjectType
+
+    state = _get_scope_state()
+    if state.broken_type_ids is None:
+        installed = {(model._meta.app_label, model._meta.model_name) for model in _iter_candidate_models()}
+        state.broken_type_ids = frozenset(
+            object_type.pk
+            for object_type in ObjectType.objects.only("id", "app_label", "model").iterator()
+            if (object_type.app_label, object_type.model) not in installed and object_type.model_class() is None
+        )
+    return state.broken_type_ids
+
+
+def get_enabled_object_type_queryset():
+    """
+    Returns an ObjectType queryset limited to models enabled in the plugin config.
+    Used by the link form to restrict the object type picker to valid choices.
+    """
+    from core.models.object_types import ObjectType
+
+    type_ids = get_enabled_object_type_ids()
+    if not type_ids:
         return ObjectType.objects.none()
 
-    return ObjectType.objects.filter(reduce(or_, q_filters))
+    return ObjectType.objects.filter(pk__in=type_ids)
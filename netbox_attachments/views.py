@@ -1,11 +1,36 @@
-from django.db.models import Count
-from django.shortcuts import get_object_or_404
-from django.utils.http import url_has_allowed_host_and_scheme
+import mimetypes
+from functools import partial
+
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+    url_has_allowed_host_and_scheme,
+)
+from django.utils.timezone import localtime
+from django.views.generic import View
 
 from netbox.views import generic
-from utilities.views import register_model_view
+from utilities.permissions import get_permission_for_model
+from utilities.views import ObjectPermissionRequiredMixin, register_model_view
 
 from netbox_attachments import filtersets, forms, models, tables
+from netbox_attachments.archive import iter_zip_archive
+from netbox_attachments.compression import accepts_encoding, open_decompressed
+from netbox_attachments.downloads import (
+    DOWNLOAD_CHUNK_SIZE,
+    get_download_internal_prefix,
+    get_download_mode,
+    get_offload_header,
+    iter_file_range,
+    parse_range_header,
+)
 from netbox_attachments.utils import get_enabled_object_type_queryset
 
 
@@ -27,6 +52,276 @@ class NetBoxAttachmentView(generic.ObjectView):
         }
 
 
+@register_model_view(models.NetBoxAttachment, name="download", detail=True)
+class NetBoxAttachmentDownloadView(generic.ObjectView):
+    """
+    Stream the attachment's file under the attachment's own filename.
+
+    Responses carry an ETag and Last-Modified so clients can revalidate with a 304, and a
+    single byte range may be requested to resume or seek (206). Compressed files are
+    decompressed on the fly unless the client accepts their encoding.
+    """
+
+    queryset = models.NetBoxAttachment.objects.all()
+
+    @staticmethod
+    def get_etag(instance, encoded=False):
+        if instance.checksum:
+            etag = f"{instance.checksum_algorithm}-{instance.checksum}"
+        else:
+            etag = f"{instance.pk}-{int(instance.last_updated.timestamp())}-{instance.size}"
+        # The compressed representation is a different sequence of bytes and needs its own tag
+        return f'"{etag}-{instance.encoding}"' if encoded else f'"{etag}"'
+
+    @staticmethod
+    def if_range_matches(request, etag, last_modified):
+        """Return False when an If-Range precondition says the client's partial copy is stale."""
+        if_range = request.headers.get("If-Range")
+        if not if_range:
+            return True
+        if if_range.startswith(("W/", '"')):
+            return if_range == etag  # only strong validators may be used with If-Range
+        return parse_http_date_safe(if_range) == last_modified
+
+    @staticmethod
+    def serves_encoded(request, instance):
+        """Compressed files are sent as stored when the client accepts the encoding and wants the whole file."""
+        return (
+            bool(instance.encoding)
+            and not request.headers.get("Range")
+            and accepts_encoding(request.headers.get("Accept-Encoding"), instance.encoding)
+        )
+
+    def get(self, request, **kwargs):
+        instance = self.get_object(**kwargs)
+        encoded = self.serves_encoded(request, instance)
+        etag = self.get_etag(instance, encoded)
+        last_modified = int(instance.last_updated.timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.get_file_response(request, instance, etag, last_modified, encoded)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Accept-Ranges"] = "bytes"
+        if instance.encoding:
+            patch_vary_headers(response, ("Accept-Encoding",))
+        # Permission-restricted content: browsers may keep it but must revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_file_response(self, request, instance, etag, last_modified, encoded=False):
+        content_type = mimetypes.guess_type(instance.filename)[0] or "application/octet-stream"
+        disposition = content_disposition_header(True, instance.filename)
+        offload = get_offload_header(
+            get_download_mode(),
+            instance.file.storage,
+            instance.file.name,
+            get_download_internal_prefix(),
+        )
+        if offload is not None and not instance.encoding:
+            # The web server sends the file, including any Range handling
+            response = HttpResponse(content_type=content_type)
+            response[offload[0]] = offload[1]
+            response["Content-Disposition"] = disposition
+            return response
+
+        try:
+            file = instance.file.open("rb")
+            size = instance.file.size
+        except (OSError, ValueError):
+            raise Http404("Attachment file not found")
+
+        if encoded:
+            # The client decompresses the stored bytes itself
+            response = FileResponse(file, content_type=content_type)
+            response.block_size = DOWNLOAD_CHUNK_SIZE
+            response["Content-Encoding"] = instance.encoding
+            response["Content-Disposition"] = disposition
+            return response
+
+        if instance.encoding:
+            try:
+                file = open_decompressed(file, instance.encoding)
+            except ValueError:
+                raise Http404("Attachment file cannot be decompressed")
+            size = instance.size
+
+        byte_range = None
+        if self.if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range_header(request.headers.get("Range"), size)
+            except ValueError:
+                file.close()
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        if byte_range is None and not instance.encoding:
+            response = FileResponse(file, as_attachment=True, filename=instance.filename)
+            response.block_size = DOWNLOAD_CHUNK_SIZE
+            return response
+
+        if byte_range is None:
+            # Decompressed while streaming; FileResponse would decompress the file twice to measure it
+            response = StreamingHttpResponse(iter_file_range(file, 0, size - 1), content_type=content_type)
+            response["Content-Length"] = str(size)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(iter_file_range(file, start, end), status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        response["Content-Disposition"] = disposition
+        return response
+
+
+@register_model_view(models.NetBoxAttachment, name="bulk_download", path="download", detail=False)
+class NetBoxAttachmentBulkDownloadView(ObjectPermissionRequiredMixin, View):
+    """
+    Stream a ZIP archive of several attachments, built from storage while it is sent.
+
+    GET with object_type_id and object_id archives every attachment of that object ("Download
+    All" on the attachment tab); POST with pk (or _all and the list filters) archives the
+    attachments selected in the attachment list.
+    """
+
+    queryset = models.NetBoxAttachment.objects.all()
+    filterset = filtersets.NetBoxAttachmentFilterSet
+
+    def get_required_permission(self):
+        return get_permission_for_model(self.queryset.model, "view")
+
+    def get(self, request):
+        try:
+            object_type_id = int(request.GET.get("object_type_id", ""))
+            object_id = int(request.GET.get("object_id", ""))
+        except ValueError:
+            raise Http404("object_type_id and object_id are required")
+
+        object_type = get_object_or_404(get_enabled_object_type_queryset(), pk=object_type_id)
+        model = object_type.model_class()
+        if model is None:
+            raise Http404("Unknown object type")
+        get_object_or_404(model.objects.restrict(request.user, "view"), pk=object_id)
+
+        attachments = self.queryset.filter(
+            attachment_assignments__object_type=object_type,
+            attachment_assignments__object_id=object_id,
+        )
+        return self.get_archive_response(attachments, f"{object_type.model}-{object_id}-attachments.zip")
+
+    def post(self, request):
+        if request.POST.get("_all"):
+            attachments = self.filterset(request.GET, self.queryset).qs
+        else:
+            pks = [pk for pk in request.POST.getlist("pk") if pk.isdigit()]
+            attachments = self.queryset.filter(pk__in=pks)
+
+        if not attachments.exists():
+            messages.warning(request, "No attachments were selected for download.")
+            return redirect("plugins:netbox_attachments:netboxattachment_list")
+        return self.get_archive_response(attachments, "attachments.zip")
+
+    @staticmethod
+    def get_archive_response(attachments, filename):
+        attachments = attachments.only("pk", "file", "original_filename", "size", "encoding", "last_updated")
+        entries = (
+            (
+                attachment.filename,
+                localtime(attachment.last_updated).timetuple()[:6],
+                attachment.size,
+                partial(open_attachment_content, attachment),
+            )
+            for attachment in attachments.order_by("pk").iterator(chunk_size=models.BULK_QUERY_CHUNK_SIZE)
+        )
+        response = StreamingHttpResponse(iter_zip_archive(entries), content_type="application/zip")
+        response["Content-Disposition"] = content_disposition_header(True, filename)
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+
+def open_attachment_content(attachment):
+    """Open an attachment's original content for reading, decompressing it if needed."""
+    return open_decompressed(attachment.file.storage.open(attachment.file.name, "rb"), attachment.encoding)
+
+
+@register_model_view(models.NetBoxAttachment, name="bulk_upload", path="upload", detail=False)
+class NetBoxAttachmentBulkUploadView(ObjectPermissionRequiredMixin, View):
+    """
+    Upload many files in one request, creating one attachment per file.
+
+    With object_type and object_id query parameters, every new attachment is linked to that
+    object, as with the "Add Attachment" button.
+    """
+
+    queryset = models.NetBoxAttachment.objects.all()
+    form = forms.NetBoxAttachmentBulkUploadForm
+    template_name = "netbox_attachments/netboxattachment_bulk_upload.html"
+
+    def get_required_permission(self):
+        return get_permission_for_model(self.queryset.model, "add")
+
+    @staticmethod
+    def get_target(request):
+        """Return the (object type, object) the uploads are linked to, or (None, None)."""
+        try:
+            object_type_id = int(request.GET.get("object_type", ""))
+            object_id = int(request.GET.get("object_id", ""))
+        except ValueError:
+            return None, None
+        object_type = get_object_or_404(get_enabled_object_type_queryset(), pk=object_type_id)
+        model = object_type.model_class()
+        if model is None:
+            raise Http404("Unknown object type")
+        return object_type, get_object_or_404(model.objects.restrict(request.user, "view"), pk=object_id)
+
+    @staticmethod
+    def get_return_url(request, obj):
+        return_url = request.GET.get("return_url")
+        if return_url and url_has_allowed_host_and_scheme(
+            return_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+        ):
+            return return_url
+        if obj is not None:
+            return obj.get_absolute_url()
+        return reverse("plugins:netbox_attachments:netboxattachment_list")
+
+    def render_form(self, request, form, obj):
+        return render(
+            request,
+            self.template_name,
+            {"form": form, "object": obj, "return_url": self.get_return_url(request, obj)},
+        )
+
+    def get(self, request):
+        _, obj = self.get_target(request)
+        return self.render_form(request, self.form(), obj)
+
+    def post(self, request):
+        object_type, obj = self.get_target(request)
+        form = self.form(request.POST, request.FILES)
+        if form.is_valid():
+            attachments = [
+                models.NetBoxAttachment(file=upload, description=form.cleaned_data["description"])
+                for upload in form.cleaned_data["files"]
+            ]
+            try:
+                models.bulk_create_attachments(
+                    attachments,
+                    object_type=object_type,
+                    object_id=obj.pk if obj is not None else None,
+                    user=request.user,
+                    request_id=getattr(request, "id", None),
+                )
+            except PermissionDenied as exc:
+                form.add_error(None, str(exc))
+            else:
+                messages.success(request, f"Uploaded {len(attachments)} attachment(s)")
+                return redirect(self.get_return_url(request, obj))
+        return self.render_form(request, form, obj)
+
+
 @register_model_view(models.NetBoxAttachment, name="list", path="", detail=False)
 class NetBoxAttachmentListView(generic.ObjectListView):
     template_name = "netbox_attachments/netboxattachment_list.html"
@@ -39,7 +334,7 @@ class NetBoxAttachmentListView(generic.ObjectListView):
     queryset = models.NetBoxAttachment.objects.prefetch_related(
         "attachment_assignments",
         "attachment_assignments__object_type",
-    ).annotate(assignment_count=Count("attachment_assignments", distinct=True))
+    )
     table = tables.NetBoxAttachmentTable
     filterset = filtersets.NetBoxAttachmentFilterSet
     filterset_form = forms.NetBoxAttachmentFilterForm
@@ -92,9 +387,7 @@ class NetBoxAttachmentDeleteView(generic.ObjectDeleteView):
 
 @register_model_view(models.NetBoxAttachment, "bulk_edit", path="edit", detail=False)
 class NetBoxAttachmentBulkEditView(generic.BulkEditView):
-    queryset = models.NetBoxAttachment.objects.prefetch_related("attachment_assignments__object_type").annotate(
-        assignment_count=Count("attachment_assignments", distinct=True)
-    )
+    queryset = models.NetBoxAttachment.objects.prefetch_related("attachment_assignments__object_type")
     filterset = filtersets.NetBoxAttachmentFilterSet
     table = tables.NetBoxAttachmentTable
     form = forms.NetBoxAttachmentBulkEditForm
@@ -102,9 +395,7 @@ class NetBoxAttachmentBulkEditView(generic.BulkEditView):
 
 @register_model_view(models.NetBoxAttachment, "bulk_delete", path="delete", detail=False)
 class NetBoxAttachmentBulkDeleteView(generic.BulkDeleteView):
-    queryset = models.NetBoxAttachment.objects.prefetch_related("attachment_assignments__object_type").annotate(
-        assignment_count=Count("attachment_assignments", distinct=True)
-    )
+    queryset = models.NetBoxAttachment.objects.prefetch_related("attachment_assignments__object_type")
     filterset = filtersets.NetBoxAttachmentFilterSet
     table = tables.NetBoxAttachmentTable
     default_return_url = "plugins:netbox_attachments:netboxattachment_list"
@@ -188,13 +479,9 @@ class NetBoxAttachmentPanelListView(generic.ObjectListView):
     to scope the table to a single object — mirrors what AttachmentTabView does for the tab mode.
     """
 
-    queryset = (
-        models.NetBoxAttachmentAssignment.objects.select_related("attachment")
-        .prefetch_related(
-            "tags",
-            "attachment__tags",
-        )
-        .annotate(attachment_link_count=Count("attachment__attachment_assignments", distinct=True))
+    queryset = models.NetBoxAttachmentAssignment.objects.select_related("attachment").prefetch_related(
+        "tags",
+        "attachment__tags",
     )
     table = tables.NetBoxAttachmentForObjectTable
     filterset = filtersets.NetBoxAttachmentAssignmentFilterSet